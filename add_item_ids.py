@@ -4,8 +4,11 @@ Add item IDs from database to item_cache.yaml
 """
 
 import subprocess
-import yaml
 import re
+from calculate_prices import save_cache_to_file
+from lazy_imports import lazy_import
+
+yaml = lazy_import('yaml')
 
 def run_database_query(query):
     """Run a SQL query against the Dual Universe database"""
@@ -17,7 +20,7 @@ def run_database_query(query):
         
         result = subprocess.run(cmd, capture_output=True, text=True, check=True)
         return result.stdout.strip()
-    except subprocess.CalledProcessError as e:
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
         print(f"Database query failed: {e}")
         return None
 
@@ -72,30 +75,24 @@ def extract_item_ids_and_names(table_name):
     print(f"Extracted {len(items)} items with IDs")
     return items
 
-def add_ids_to_cache():
-    """Add item IDs to the existing item_cache.yaml"""
-    
-    print("Loading item cache...")
-    
-    # Load existing cache
-    with open('item_cache.yaml', 'r') as f:
-        cache = yaml.safe_load(f)
-    
-    print(f"Loaded {len(cache)} items from cache")
+def fetch_item_ids():
+    """{item name: id} from the database, or None if it can't be read"""
     
     # Find the item table
     table_name = find_item_id_table()
     if not table_name:
         print("Could not find item table in database")
-        return
+        return None
     
     # Extract item IDs
     db_items = extract_item_ids_and_names(table_name)
     if not db_items:
         print("Could not extract items from database")
-        return
-    
-    # Match and add IDs
+        return None
+    return db_items
+
+def apply_item_ids(cache, db_items):
+    """Add database IDs to matching cache entries; returns the number matched"""
     matched = 0
     for item_name, price in cache.items():
         if item_name in db_items:
@@ -109,12 +106,30 @@ def add_ids_to_cache():
                     'id': db_items[item_name]
                 }
             matched += 1
+    return matched
+
+def add_ids_to_cache():
+    """Add item IDs to the existing item_cache.yaml"""
+    
+    print("Loading item cache...")
+    
+    # Load existing cache
+    with open('item_cache.yaml', 'r') as f:
+        cache = yaml.safe_load(f)
+    
+    print(f"Loaded {len(cache)} items from cache")
+    
+    db_items = fetch_item_ids()
+    if not db_items:
+        return
+    
+    # Match and add IDs
+    matched = apply_item_ids(cache, db_items)
     
     print(f"Matched {matched} items with database IDs")
     
-    # Save updated cache
-    with open('item_cache.yaml', 'w') as f:
-        yaml.dump(cache, f, default_flow_style=False)
+    # Save updated cache (and its lookup index)
+    save_cache_to_file(cache)
     
     print("Updated item_cache.yaml with IDs")
 
@@ -1,26 +1,37 @@
 #!/usr/bin/env python3
 """
 Analyze rare item distribution across planets
+
+Reads the market strategy saved by generate_all_markets.py (one pass over items).
+Falls back to scanning the planet CSVs when the strategy is missing or the CSVs
+were edited after it was written.
+
+Usage:
+    python analyze_rare_items.py [--scan]
 """
 
+import argparse
 import csv
 import os
 import re
+from item_classification import *
+from market_strategy import STRATEGY_FILE, iter_item_planets, load_strategy
 
-def analyze_rare_items():
-    """Analyze the distribution of rare items across planets"""
-    
-    market_orders_dir = "market_orders_generated"
-    
-    if not os.path.exists(market_orders_dir):
-        print(f"Directory {market_orders_dir} not found.")
-        return
-    
-    # Collect data
-    plasma_items = {}
-    warp_items = {}
-    core_items = {}
-    rare_items = {}
+def collect_from_strategy(artifact):
+    """Rare items per report group, straight from the strategy artifact"""
+    found = {GROUP_PLASMA: {}, GROUP_WARP: {}, GROUP_CORE: {}, GROUP_OTHER_RARE: {}}
+    for item, _, sellers, buyers in iter_item_planets(artifact):
+        group = classify_group(item)
+        if group == GROUP_NONE:
+            continue
+        planets = sellers + [p for p in buyers if p not in sellers]
+        if planets:
+            found[group][item] = sorted(planets, key=artifact['planets'].index)
+    return found, len(artifact['planets'])
+
+def collect_from_csv(market_orders_dir):
+    """Rare items per report group, by scanning every planet CSV"""
+    found = {GROUP_PLASMA: {}, GROUP_WARP: {}, GROUP_CORE: {}, GROUP_OTHER_RARE: {}}
     
     planet_files = []
     for filename in os.listdir(market_orders_dir):
@@ -29,7 +40,8 @@ def analyze_rare_items():
             planet_file = os.path.join(market_orders_dir, filename)
             planet_files.append((planet_id, planet_file))
     
-    print(f"Analyzing rare items across {len(planet_files)} planets...")
+    # Classify each distinct item name once
+    groups = {}
     
     for planet_id, planet_file in planet_files:
         with open(planet_file, 'r') as f:
@@ -42,33 +54,44 @@ def analyze_rare_items():
                         sell_orders = int(sell_orders) if sell_orders else 0
                         buy_orders = int(buy_orders) if buy_orders else 0
                         
-                        # Check for plasma items
-                        if 'plasma' in item.lower():
-                            if item not in plasma_items:
-                                plasma_items[item] = []
-                            plasma_items[item].append(planet_id)
-                        
-                        # Check for warp items
-                        elif 'warp' in item.lower():
-                            if item not in warp_items:
-                                warp_items[item] = []
-                            warp_items[item].append(planet_id)
-                        
-                        # Check for core items
-                        elif 'core' in item.lower():
-                            if item not in core_items:
-                                core_items[item] = []
-                            core_items[item].append(planet_id)
+                        group = groups.get(item)
+                        if group is None:
+                            group = groups[item] = classify_group(item)
                         
-                        # Check for other rare items (high price or special names)
-                        elif any(indicator in item for indicator in ['Beacon', 'Drive', 'Cell', 'Engine', 'Thruster']):
-                            if item not in rare_items:
-                                rare_items[item] = []
-                            rare_items[item].append(planet_id)
+                        # Plasma, warp, core and other rare items (high price or special names)
+                        if group != GROUP_NONE:
+                            found[group].setdefault(item, []).append(planet_id)
                     
                     except (ValueError, IndexError):
                         continue
     
+    return found, len(planet_files)
+
+def analyze_rare_items(market_orders_dir="market_orders_generated", scan=False):
+    """Analyze the distribution of rare items across planets"""
+    
+    if not os.path.exists(market_orders_dir):
+        print(f"Directory {market_orders_dir} not found.")
+        return
+    
+    artifact = None if scan else load_strategy(market_orders_dir)
+    if artifact is not None:
+        print(f"Analyzing rare items from {STRATEGY_FILE} ({len(artifact['planets'])} planets)...")
+        found, planet_count = collect_from_strategy(artifact)
+    else:
+        print(f"Analyzing rare items by scanning {market_orders_dir}/...")
+        found, planet_count = collect_from_csv(market_orders_dir)
+    
+    write_rare_report(found, planet_count)
+
+def write_rare_report(found, planet_count):
+    """Write rare_items_report.md from rare items per report group"""
+    
+    plasma_items = found[GROUP_PLASMA]
+    warp_items = found[GROUP_WARP]
+    core_items = found[GROUP_CORE]
+    rare_items = found[GROUP_OTHER_RARE]
+    
     # Generate report
     report_lines = []
     report_lines.append("# Rare Items Distribution Report")
@@ -129,7 +152,7 @@ def analyze_rare_items():
     report_lines.append(f"- **Warp Items**: {len(warp_items)}")
     report_lines.append(f"- **Core Items**: {len(core_items)}")
     report_lines.append(f"- **Other Rare Items**: {len(rare_items)}")
-    report_lines.append(f"- **Total Planets**: {len(planet_files)}")
+    report_lines.append(f"- **Total Planets**: {planet_count}")
     report_lines.append("")
     
     # Save report
@@ -156,5 +179,9 @@ def analyze_rare_items():
             print(f"   {item}: {', '.join(planets)}")
 
 if __name__ == "__main__":
-    analyze_rare_items()
+    parser = argparse.ArgumentParser(description="Analyze rare item distribution across planets")
+    parser.add_argument('--market-dir', default="market_orders_generated")
+    parser.add_argument('--scan', action='store_true', help="scan the CSVs even if a strategy file exists")
+    args = parser.parse_args()
+    analyze_rare_items(args.market_dir, args.scan)
 
@@ -1,22 +1,253 @@
-import yaml
+import json
+import sys
 from collections import defaultdict
+from lazy_imports import lazy_import
+
+yaml = lazy_import('yaml')
 
 # Configuration constants
 TIME_COST_FACTOR = 2.0  # Cost per minute of production (adjust as needed)
 DEBUG = True  # Enable debugging to see what's happening
 
+# Optional per-industry cost per minute and speed multiplier
+# Industries not listed there fall back to TIME_COST_FACTOR at normal speed
+INDUSTRY_SETTINGS_FILE = "industries.yaml"
+
+# Append every run's prices to the local history store (price_history.py)
+RECORD_HISTORY = True
+
 # Catalysts are reusable - they don't add to cost
 CATALYSTS = {
     'Catalyst1', 'Catalyst2', 'Catalyst3', 'Catalyst4', 'Catalyst5',
     'Catalyst6', 'Catalyst7', 'Catalyst8', 'Catalyst9', 'Catalyst10'
 }
 
+# Industries recipes may use (tiers 1-4); industries.yaml can add more
+INDUSTRY_FAMILIES = [
+    '3DPrinter', 'AssemblyXS', 'AssemblyS', 'AssemblyM', 'AssemblyL', 'AssemblyXL', 'Chemical',
+    'Electronics', 'Glass', 'Honeycomber', 'Metalwork', 'Recycler', 'Refiner', 'Smelter'
+]
+KNOWN_INDUSTRIES = {f"Industry{family}{tier}" for family in INDUSTRY_FAMILIES for tier in ('', '2', '3', '4')}
+
+class RecipeSchemaError(ValueError):
+    """Raised once per recipe file with every schema problem found in it"""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} recipe problems: {'; '.join(errors[:10])}"
+                         f"{'...' if len(errors) > 10 else ''}")
+        self.errors = errors
+
+def safe_loader():
+    """libyaml's safe loader when PyYAML was built with it (same results, much faster)"""
+    return getattr(yaml, 'CSafeLoader', None) or yaml.SafeLoader
+
 def load_yaml_file(filename):
     with open(filename, 'r') as f:
-        data = list(yaml.safe_load_all(f))
+        data = list(yaml.load_all(f, Loader=safe_loader()))
     return data
 
-def calculate_cost(item, ore_prices, recipes, cache, visited=None):
+def iter_documents(filename):
+    """(location, document, parse error) for every document in a recipe file
+
+    .jsonl files hold one JSON recipe per line; anything else is read as
+    multi-document YAML. location is "file: document N (line L)" for YAML and
+    "file: line L" for JSONL. A YAML syntax error ends the stream; a bad JSON
+    line only loses that line.
+    """
+    with open(filename, 'r') as f:
+        if filename.endswith('.jsonl'):
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                location = f"{filename}: line {number}"
+                try:
+                    yield location, json.loads(line), None
+                except ValueError as e:
+                    yield location, None, f"invalid JSON: {e}"
+            return
+
+        loader = safe_loader()(f)
+        number = 0
+        try:
+            while True:
+                try:
+                    if not loader.check_node():
+                        break
+                    node = loader.get_node()
+                except yaml.YAMLError as e:
+                    mark = getattr(e, 'problem_mark', None)
+                    line = f" (line {mark.line + 1})" if mark is not None else ""
+                    yield f"{filename}: document {number + 1}{line}", None, f"invalid YAML: {getattr(e, 'problem', e)}"
+                    return
+                number += 1
+                location = f"{filename}: document {number} (line {node.start_mark.line + 1})"
+                try:
+                    document = loader.construct_document(node)
+                except yaml.YAMLError as e:
+                    # Parsed but not constructible (e.g. an unknown tag): only this document is lost
+                    yield location, None, f"invalid YAML: {getattr(e, 'problem', e)}"
+                    continue
+                yield location, document, None
+        finally:
+            loader.dispose()
+
+def normalize_entries(recipe, field, problems):
+    """[{name: qty}, ...] for a recipe's 'in' or 'out', recording schema problems"""
+    value = recipe.get(field)
+    if value is None:
+        return []
+    if isinstance(value, dict):
+        value = [{name: qty} for name, qty in value.items()]
+    if not isinstance(value, list):
+        problems.append(f"'{field}' is not a list")
+        return []
+
+    entries = []
+    for entry in value:
+        if not isinstance(entry, dict) or not entry:
+            problems.append(f"'{field}' entry {entry!r} is not a {{name: quantity}} mapping")
+            continue
+        for name, qty in entry.items():
+            if not isinstance(name, str):
+                problems.append(f"'{field}' item {name!r} is not a name")
+            elif isinstance(qty, bool) or not isinstance(qty, (int, float)):
+                problems.append(f"quantity of {name} in '{field}' is not a number: {qty!r}")
+            elif qty <= 0:
+                problems.append(f"{'zero' if qty == 0 else 'negative'} quantity of {name} in '{field}'")
+            else:
+                entries.append({name: qty})
+    return entries
+
+def validate_recipe(document, known_industries):
+    """(normalized recipe or None, [problems]) for one recipe document
+
+    The normalized recipe has 'in' and 'out' as lists of single-item
+    {name: qty} entries, a numeric 'time' and an 'industries' list; other keys
+    are kept as they are.
+    """
+    if not isinstance(document, dict):
+        return None, [f"recipe is not a mapping: {document!r}"]
+
+    problems = []
+    recipe = dict(document)
+    recipe['in'] = normalize_entries(document, 'in', problems)
+    recipe['out'] = normalize_entries(document, 'out', problems)
+    if not document.get('out'):
+        problems.append("missing or empty 'out'")
+
+    recipe_time = document.get('time', 0)
+    if isinstance(recipe_time, bool) or not isinstance(recipe_time, (int, float)) or recipe_time < 0:
+        problems.append(f"'time' is not a non-negative number: {recipe_time!r}")
+    recipe['time'] = recipe_time
+
+    industries = document.get('industries') or []
+    if isinstance(industries, str):
+        industries = [industries]
+    if not isinstance(industries, list) or not all(isinstance(name, str) for name in industries):
+        problems.append(f"'industries' is not a list of names: {industries!r}")
+    else:
+        unknown = [name for name in industries if name not in known_industries]
+        if unknown:
+            problems.append(f"unknown industries: {', '.join(unknown)}")
+    recipe['industries'] = industries
+
+    return (None if problems else recipe), problems
+
+def load_recipes(filename, errors=None, known_industries=None):
+    """Stream validated, normalized recipes one document at a time
+
+    Every document is checked as it is read (missing 'out', zero or negative
+    quantities, non-numeric time, unknown industries) and only valid recipes are
+    yielded, so the result can feed build_recipe_index or compile_recipes
+    directly. Each problem is reported with its location (see iter_documents).
+    With an `errors` list, problems are appended to it and invalid documents
+    skipped; without one, a single RecipeSchemaError listing every problem is
+    raised after the whole file has been read.
+    known_industries defaults to KNOWN_INDUSTRIES plus the ones in industries.yaml.
+    """
+    if known_industries is None:
+        known_industries = KNOWN_INDUSTRIES | set(load_industry_settings())
+    found = [] if errors is None else errors
+
+    for location, document, parse_error in iter_documents(filename):
+        if parse_error:
+            found.append(f"{location}: {parse_error}")
+            continue
+        if document is None:
+            continue  # Empty document (e.g. a trailing '---')
+        recipe, problems = validate_recipe(document, known_industries)
+        found.extend(f"{location}: {problem}" for problem in problems)
+        if recipe is not None:
+            yield recipe
+
+    if errors is None and found:
+        raise RecipeSchemaError(found)
+
+def print_recipe_errors(errors, filename="recipes.yaml"):
+    print(f"❌ Found {len(errors)} problems in {filename}:")
+    for error in errors:
+        print(f"  {error}")
+    print("   Fix them (or add custom industries to industries.yaml) and run again.")
+
+def load_recipes_or_exit(filename="recipes.yaml"):
+    """Validated recipe list for command-line tools: every problem is printed and the tool exits"""
+    errors = []
+    recipes = list(load_recipes(filename, errors))
+    if errors:
+        print_recipe_errors(errors, filename)
+        sys.exit(1)
+    return recipes
+
+def build_recipe_index(recipes):
+    """Map every output item to the recipes that produce it, in file order"""
+    index = defaultdict(list)
+    for r in recipes:
+        for out in r.get('out', []):
+            for name in out.keys():
+                # An item listed twice in one recipe only needs the recipe once
+                if not index[name] or index[name][-1] is not r:
+                    index[name].append(r)
+    return dict(index)
+
+def load_industry_settings(filename=INDUSTRY_SETTINGS_FILE):
+    """Load per-industry cost per minute and speed multiplier"""
+    try:
+        with open(filename, 'r') as f:
+            data = yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        return {}
+    
+    settings = {}
+    for industry, values in data.items():
+        values = values or {}
+        settings[industry] = {
+            'cost_per_minute': float(values.get('cost_per_minute', TIME_COST_FACTOR)),
+            'speed': float(values.get('speed', 1.0))
+        }
+    return settings
+
+def calculate_time_cost(recipe, industry_settings=None):
+    """Return (time_cost, industry) for the cheapest allowed industry of a recipe"""
+    recipe_time = recipe.get('time', 0)
+    
+    # No industry configuration: flat cost per minute on the first allowed industry
+    if not industry_settings:
+        return recipe_time * TIME_COST_FACTOR, (recipe.get('industries') or [None])[0]
+    
+    default = industry_settings.get('default', {'cost_per_minute': TIME_COST_FACTOR, 'speed': 1.0})
+    best_cost = None
+    best_industry = None
+    
+    for industry in recipe.get('industries') or [None]:
+        settings = industry_settings.get(industry, default)
+        time_cost = recipe_time / settings['speed'] * settings['cost_per_minute']
+        if best_cost is None or time_cost < best_cost:
+            best_cost = time_cost
+            best_industry = industry
+    
+    return best_cost, best_industry
+
+def calculate_cost(item, ore_prices, recipes, cache, visited=None, industry_settings=None, choices=None):
     # If already calculated
     if item in cache:
         cached_value = cache[item]
@@ -52,12 +283,16 @@ def calculate_cost(item, ore_prices, recipes, cache, visited=None):
         return ore_prices[item]
     
     # Find ALL recipes that output this item
-    possible_recipes = []
-    for r in recipes:
-        for output in r.get('out', []):
-            if item in output:
-                possible_recipes.append(r)
-                break
+    # recipes may be the raw list or an index from build_recipe_index
+    if isinstance(recipes, dict):
+        possible_recipes = recipes.get(item, [])
+    else:
+        possible_recipes = []
+        for r in recipes:
+            for output in r.get('out', []):
+                if item in output:
+                    possible_recipes.append(r)
+                    break
     
     if not possible_recipes:
         if DEBUG:
@@ -68,6 +303,7 @@ def calculate_cost(item, ore_prices, recipes, cache, visited=None):
     
     # Choose the recipe with the lowest cost per unit
     best_recipe = None
+    best_industry = None
     best_cost = float('inf')
     
     for recipe in possible_recipes:
@@ -83,7 +319,8 @@ def calculate_cost(item, ore_prices, recipes, cache, visited=None):
                         print(f"🔄 Skipping catalyst {name} (reusable)")
                     continue
                     
-                sub_cost = calculate_cost(name, ore_prices, recipes, cache, visited.copy())
+                sub_cost = calculate_cost(name, ore_prices, recipes, cache, visited.copy(),
+                                          industry_settings, choices)
                 if sub_cost is None:
                     missing_dependencies.append(name)
                     if DEBUG:
@@ -101,13 +338,14 @@ def calculate_cost(item, ore_prices, recipes, cache, visited=None):
         main_product_quantity = list(first_output.values())[0]
         cost_per_unit = total_input_cost / main_product_quantity
         
-        # Add time-based cost
-        time_cost = recipe.get('time', 0) * TIME_COST_FACTOR
+        # Add time-based cost using the cheapest allowed industry
+        time_cost, industry = calculate_time_cost(recipe, industry_settings)
         final_cost = cost_per_unit + time_cost
         
         if final_cost < best_cost:
             best_cost = final_cost
             best_recipe = recipe
+            best_industry = industry
     
     if not best_recipe:
         if DEBUG:
@@ -119,6 +357,10 @@ def calculate_cost(item, ore_prices, recipes, cache, visited=None):
     # Use the best cost we calculated
     final_cost = best_cost
 
+    # Remember which recipe and industry won, for planners and reports
+    if choices is not None:
+        choices[item] = {'recipe': best_recipe.get('id'), 'industry': best_industry}
+
     cache[item] = final_cost
     visited.remove(item)  # Remove from visited before returning
     return final_cost
@@ -134,10 +376,12 @@ def identify_problematic_recipes(recipes, ore_prices):
     return problematic
 
 def save_cache_to_file(cache, filename="item_cache.yaml"):
-    """Save calculated prices to a cache file"""
+    """Save calculated prices to a cache file and refresh its lookup index (price_index.py)"""
+    from price_index import index_file_for, write_price_index
     with open(filename, 'w') as f:
         yaml.dump(cache, f, default_flow_style=False, sort_keys=True)
-    print(f"Saved {len(cache)} items to {filename}")
+    write_price_index(cache, filename)
+    print(f"Saved {len(cache)} items to {filename} (index: {index_file_for(filename)})")
 
 def load_cache_from_file(filename="item_cache.yaml"):
     """Load previously calculated prices from cache file"""
@@ -172,13 +416,56 @@ def identify_independent_items(recipes, ore_prices):
     independent = all_inputs - all_outputs - set(ore_prices.keys())
     return independent
 
+def price_catalog(recipes, ore_prices, cache, industry_settings=None, choices=None):
+    """Price every recipe output that is not a base material
+
+    Prices are computed on the compiled recipe model (same results as
+    calculate_cost) and written back to cache. With a `choices` dict, the
+    recipe and industry behind every price are recorded in it, as
+    calculate_cost does.
+    Returns ({item: price rounded to 2 decimals}, [items that failed]).
+    """
+    from recipe_model import compile_recipes, price_items, recipe_choices
+    
+    # Collect all possible output items
+    all_outputs = set()
+    for r in recipes:
+        for out in r.get('out', []):
+            all_outputs.update(out.keys())
+    
+    book = compile_recipes(recipes, industry_settings)
+    # Skip base materials that are in ore_prices
+    costs = price_items(book, [item for item in all_outputs if item not in ore_prices], ore_prices, cache)
+    if choices is not None:
+        choices.update(recipe_choices(book, cache, ore_prices))
+    calculated_prices = {}
+    failed_items = []
+    
+    for item, cost in costs.items():
+        if cost:
+            calculated_prices[item] = round(cost, 2)
+        else:
+            failed_items.append(item)
+    return calculated_prices, failed_items
+
+def save_independent_items(independent_items, filename="independent_items.yaml"):
+    """Write independent items (no recipe) with empty prices for manual pricing"""
+    independent_data = {item: None for item in independent_items}
+    with open(filename, 'w') as f:
+        yaml.dump(independent_data, f, default_flow_style=False, sort_keys=True)
+
 def main():
     # Load base ore prices
     with open("ore_prices.yaml", "r") as f:
         ore_prices = yaml.safe_load(f)
 
-    # Load recipes
-    recipes = load_yaml_file("recipes.yaml")
+    # Load recipes, reporting every schema problem before anything is priced
+    recipes = load_recipes_or_exit("recipes.yaml")
+    
+    # Load per-industry time costs (optional)
+    industry_settings = load_industry_settings()
+    if industry_settings:
+        print(f"Loaded time cost settings for {len(industry_settings)} industries")
     
     # Load existing cache
     cache = load_cache_from_file()
@@ -208,30 +495,18 @@ def main():
         print(f"  ... and {len(independent_items) - 10} more")
     print()
 
-    # Collect all possible output items
-    all_outputs = set()
-    for r in recipes:
-        for out in r.get('out', []):
-            all_outputs.update(out.keys())
-
-    # Calculate prices for all items
-    calculated_prices = {}
-    failed_items = []
-    
-    for item in all_outputs:
-        # Skip base materials that are in ore_prices
-        if item in ore_prices:
-            continue
-            
-        cost = calculate_cost(item, ore_prices, recipes, cache)
-        if cost:
-            calculated_prices[item] = round(cost, 2)
-        else:
-            failed_items.append(item)
+    # Calculate prices for all items on the compiled recipe model (same results as calculate_cost)
+    choices = {}
+    calculated_prices, failed_items = price_catalog(recipes, ore_prices, cache, industry_settings, choices)
 
     # Save cache for future use
     save_cache_to_file(cache)
 
+    if RECORD_HISTORY:
+        from price_history import HISTORY_FILE, record_run
+        run_id = record_run(cache, ore_prices, choices)
+        print(f"Recorded run {run_id} in {HISTORY_FILE}")
+
     # Sort and print
     print("\n=== Calculated Prices ===")
     for k, v in sorted(calculated_prices.items()):
@@ -246,9 +521,7 @@ def main():
     
     # Save independent items to a separate file for manual pricing
     if independent_items:
-        independent_data = {item: None for item in independent_items}
-        with open("independent_items.yaml", 'w') as f:
-            yaml.dump(independent_data, f, default_flow_style=False, sort_keys=True)
+        save_independent_items(independent_items)
         print(f"\nSaved {len(independent_items)} independent items to independent_items.yaml")
         print("   You can manually add prices for these items in that file")
 
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Craft-vs-buy profitability index per planet
+
+For every planet and crafted item: the cost of buying the chosen recipe's inputs
+at that planet's sell quotes (plus time cost) versus the planet's buy quote for
+the product. The bill of materials is precomputed once as a sparse matrix and
+joined against all planets at once with NumPy.
+
+Usage:
+    python craft_profitability.py [--planet 2] [--item Warp] [--min-margin 0.05] [--top 30]
+"""
+
+import argparse
+import time
+
+import calculate_prices
+from calculate_prices import load_recipes_or_exit, load_industry_settings, load_manual_prices
+from market_snapshot import DEFAULT_MARKET_DIR, load_market_snapshot
+from market_writer import write_csv_atomic
+from production_planner import build_production_graph
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+yaml = lazy_import('yaml')
+
+def build_bom_matrix(graph):
+    """Sparse per-unit bill of materials of every crafted item (one recipe level)
+
+    Returns products, the input item list, and COO arrays (row, col, qty) with
+    rows sorted, plus the per-unit time cost of each product.
+    """
+    products = sorted(graph['nodes'])
+    inputs = sorted({name for node in graph['nodes'].values() for name, _ in node['inputs']})
+    input_index = {name: i for i, name in enumerate(inputs)}
+
+    rows, cols, quantities = [], [], []
+    time_costs = np.zeros(len(products))
+    for row, item in enumerate(products):
+        node = graph['nodes'][item]
+        time_costs[row] = node['time_cost']
+        for name, qty in node['inputs']:
+            rows.append(row)
+            cols.append(input_index[name])
+            quantities.append(qty / node['output_qty'])
+
+    return {
+        'products': products,
+        'inputs': inputs,
+        'row': np.array(rows, dtype=np.int64),
+        'col': np.array(cols, dtype=np.int64),
+        'qty': np.array(quantities, dtype=float),
+        'time_cost': time_costs
+    }
+
+def quote_matrix(snapshot, planets, items, side):
+    """planets x items matrix of sell (side=1) or buy (side=3) prices, NaN where absent"""
+    matrix = np.full((len(planets), len(items)), np.nan)
+    item_index = {item: i for i, item in enumerate(items)}
+    for p, planet_id in enumerate(planets):
+        for item, quote in snapshot[planet_id].items():
+            i = item_index.get(item)
+            if i is not None and quote[side - 1] > 0 and quote[side] > 0:
+                matrix[p, i] = quote[side]
+    return matrix
+
+def craft_profitability(snapshot, bom):
+    """Input cost, product buy price and margin for every (planet, product)
+
+    Returns planets x products arrays; an item whose inputs are not all sold on
+    the planet gets NaN input cost.
+    """
+    planets = list(snapshot.keys())
+    asks = quote_matrix(snapshot, planets, bom['inputs'], 1)
+    bids = quote_matrix(snapshot, planets, bom['products'], 3)
+
+    n_products = len(bom['products'])
+    input_cost = np.zeros((len(planets), n_products))
+    if bom['row'].size:
+        # One vectorized join: every BOM entry priced on every planet, summed per product
+        contributions = asks[:, bom['col']] * bom['qty']
+        present = np.unique(bom['row'])
+        starts = np.searchsorted(bom['row'], present)
+        input_cost[:, present] = np.add.reduceat(contributions, starts, axis=1)
+
+    unit_cost = input_cost + bom['time_cost']
+    profit = bids - unit_cost
+    with np.errstate(divide='ignore', invalid='ignore'):
+        margin = profit / unit_cost
+
+    return {
+        'planets': planets,
+        'products': bom['products'],
+        'input_cost': input_cost,
+        'time_cost': bom['time_cost'],
+        'buy_price': bids,
+        'profit': profit,
+        'margin': margin
+    }
+
+def ranked_rows(result, planet=None, item_filter=None, min_margin=None):
+    """Flatten the matrices into rows sorted by margin, applying filters"""
+    margin = result['margin']
+    mask = np.isfinite(margin)
+    if min_margin is not None:
+        mask &= margin >= min_margin
+    if planet is not None:
+        planet_mask = np.array([p == planet for p in result['planets']])
+        mask &= planet_mask[:, None]
+    if item_filter:
+        needle = item_filter.lower()
+        item_mask = np.array([needle in item.lower() for item in result['products']])
+        mask &= item_mask[None, :]
+
+    planet_idx, item_idx = np.nonzero(mask)
+    order = np.argsort(-margin[planet_idx, item_idx], kind='stable')
+
+    rows = []
+    for k in order:
+        p, i = planet_idx[k], item_idx[k]
+        rows.append({
+            'planet': result['planets'][p],
+            'item': result['products'][i],
+            'input_cost': result['input_cost'][p, i],
+            'time_cost': result['time_cost'][i],
+            'buy_price': result['buy_price'][p, i],
+            'profit': result['profit'][p, i],
+            'margin': margin[p, i]
+        })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank craft-vs-buy profitability per planet")
+    parser.add_argument('--market-dir', default=DEFAULT_MARKET_DIR)
+    parser.add_argument('--planet', help="only this planet id")
+    parser.add_argument('--item', help="only items whose name contains this text")
+    parser.add_argument('--min-margin', type=float, help="only rows with at least this margin (fraction)")
+    parser.add_argument('--top', type=int, default=30)
+    parser.add_argument('--output', default="craft_profitability.csv")
+    args = parser.parse_args()
+
+    calculate_prices.DEBUG = False
+
+    snapshot = load_market_snapshot(args.market_dir)
+    if not snapshot:
+        print(f"❌ No market files found in {args.market_dir}. Run generate_all_markets.py first.")
+        return
+
+    with open("ore_prices.yaml", "r") as f:
+        ore_prices = yaml.safe_load(f)
+    graph = build_production_graph(load_recipes_or_exit("recipes.yaml"), ore_prices,
+                                   load_industry_settings(), load_manual_prices())
+    bom = build_bom_matrix(graph)
+
+    start = time.perf_counter()
+    result = craft_profitability(snapshot, bom)
+    rows = ranked_rows(result, args.planet, args.item, args.min_margin)
+    elapsed = time.perf_counter() - start
+
+    table = [['planet', 'item', 'input_cost', 'time_cost', 'buy_price', 'profit', 'margin_pct']]
+    for row in rows:
+        table.append([
+            row['planet'], row['item'],
+            f"{row['input_cost']:.2f}", f"{row['time_cost']:.2f}", f"{row['buy_price']:.2f}",
+            f"{row['profit']:.2f}", f"{row['margin'] * 100:.2f}"
+        ])
+    write_csv_atomic(args.output, table)
+
+    print(f"Scored {len(bom['products'])} recipes on {len(result['planets'])} planets in {elapsed:.3f}s")
+    print(f"{len(rows)} craftable (planet, item) pairs saved to: {args.output}")
+    print(f"\n{'Planet':>8}  {'Item':30} {'Inputs':>12} {'Buy':>12} {'Margin':>8}")
+    for row in rows[:args.top]:
+        print(f"{row['planet']:>8}  {row['item']:30} {row['input_cost'] + row['time_cost']:>12.2f} "
+              f"{row['buy_price']:>12.2f} {row['margin'] * 100:>7.1f}%")
+
+if __name__ == "__main__":
+    main()
@@ -5,11 +5,22 @@ Creates realistic interplanetary trading opportunities while preventing arbitrag
 """
 
 import csv
-import yaml
 import os
-import random
 import math
+import time
+import argparse
+import random
 from calculate_prices import *
+from market_writer import WriteStats, format_market_row
+from item_classification import *
+from recipe_model import RecipeBook, compile_recipes, recipe_info
+import market_rules
+import market_strategy
+import rare_placement
+from lazy_imports import lazy_import
+
+yaml = lazy_import('yaml')
+np = lazy_import('numpy')
 
 # Regional price variation settings
 REGIONAL_VARIATION = {
@@ -18,28 +29,63 @@ REGIONAL_VARIATION = {
     'trade_profit_range': (0.05, 0.15)  # 5-15% profit potential between planets
 }
 
-# Basic ores that should only have buy orders (no sell orders)
-BASIC_ORES = {
-    'carbonore', 'siliconore', 'aluminiumore', 'ironore', 
-    'sodiumore', 'calciumore', 'chromiumore', 'copperore'
+# Order-book mode: N price levels per side instead of a single quote
+ORDER_BOOK = {
+    'levels': 1,             # 1 = classic single quote per item
+    'quantity_decay': 0.7,   # Each deeper level has 70% of the previous level's orders
+    'price_step': 0.02       # Each deeper level is 2% further from the top price
 }
 
+# Plasma / ultra-rare placement (see rare_placement.py)
+RARE_PLACEMENT = {
+    'mode': 'balanced',           # 'balanced' = constraint solver, 'random' = per-item shuffle
+    'max_rare_per_planet': None,  # None = even share plus 25% headroom
+    'min_trade_distance': 0       # Minimum seller/buyer distance for ultra-rare items
+}
+
+# Market role codes stored in the items x planets role matrix
+ROLE_NONE = 0
+ROLE_SELL_ONLY = 1
+ROLE_BUY_ONLY = 2
+ROLE_BOTH_SAME_PRICE = 3
+
+ROLE_NAMES = ['none', 'sell_only', 'buy_only', 'both_same_price']
+ROLE_CODES = {name: code for code, name in enumerate(ROLE_NAMES)}
+
+VARIATION_SEEDS = 10000  # Regional variation and strategy shuffles use hash(...) % VARIATION_SEEDS
+_variation_draws = []    # seed -> first random.random() after random.seed(seed)
+
+def prices_from_cache(cache, ore_prices=None):
+    """Flat {item: price} table from an item cache and ore prices
+
+    Cache entries may be plain prices or dicts with a 'price' (and 'id');
+    ore prices are mapped under both their original and lowercase names.
+    """
+    prices = {}
+    for item, price_data in cache.items():
+        if isinstance(price_data, dict):
+            price = price_data.get('price')
+        else:
+            price = price_data
+        
+        if price is not None and price > 0:
+            prices[item] = price
+    
+    for item, price in (ore_prices or {}).items():
+        if price > 0:
+            # Map both original case and lowercase versions
+            prices[item] = price
+            prices[item.lower()] = price
+    return prices
+
 def load_calculated_prices():
     """Load calculated prices from cache and ore prices"""
-    prices = {}
     
     # Load main item cache
     try:
         with open('item_cache.yaml', 'r') as f:
             cache = yaml.safe_load(f) or {}
-            for item, price_data in cache.items():
-                if isinstance(price_data, dict):
-                    price = price_data.get('price')
-                else:
-                    price = price_data
-                
-                if price is not None and price > 0:
-                    prices[item] = price
+        prices = prices_from_cache(cache)
         print(f"Loaded {len(prices)} prices from item cache")
     except FileNotFoundError:
         print("⚠️  No item cache found")
@@ -49,11 +95,7 @@ def load_calculated_prices():
     try:
         with open('ore_prices.yaml', 'r') as f:
             ore_prices = yaml.safe_load(f) or {}
-            for item, price in ore_prices.items():
-                if price > 0:
-                    # Map both original case and lowercase versions
-                    prices[item] = price
-                    prices[item.lower()] = price
+            prices.update(prices_from_cache({}, ore_prices))
         print(f"Loaded {len(ore_prices)} ore prices")
     except FileNotFoundError:
         print("⚠️  No ore prices found")
@@ -83,21 +125,37 @@ def get_planet_ids():
     
     return sorted(planet_ids)
 
-def calculate_regional_variation(base_price, planet_id, item_name):
+def variation_draws():
+    """First random.random() after random.seed(seed) for every variation seed
+
+    Seeding is the expensive part of a draw and there are only VARIATION_SEEDS
+    seeds, so the draws are tabulated once instead of reseeding per row.
+    """
+    if not _variation_draws:
+        for seed in range(VARIATION_SEEDS):
+            random.seed(seed)
+            _variation_draws.append(random.random())
+    return _variation_draws
+
+def calculate_regional_variation(base_price, planet_id, item_name, flags=None):
     """Calculate regional price variation for a specific planet and item"""
     
+    if flags is None:
+        flags = classify_flags(item_name)
+    
     # Create a deterministic but varied seed based on planet and item
-    seed = hash(f"{planet_id}_{item_name}") % 10000
-    random.seed(seed)
+    seed = hash(f"{planet_id}_{item_name}") % VARIATION_SEEDS
     
-    # Base variation
-    variation = random.uniform(REGIONAL_VARIATION['min_variation'], REGIONAL_VARIATION['max_variation'])
+    # Base variation (random.uniform after random.seed(seed), from the draw table)
+    min_variation = REGIONAL_VARIATION['min_variation']
+    max_variation = REGIONAL_VARIATION['max_variation']
+    variation = min_variation + (max_variation - min_variation) * variation_draws()[seed]
     
     # Adjust for item type (some items are more/less affected by regional differences)
-    if any(ore in item_name.lower() for ore in ['ore', 'pure']):
+    if flags & FLAG_ORE:
         # Raw materials have less variation
         variation = 1.0 + (variation - 1.0) * 0.5
-    elif any(high_end in item_name for high_end in ['Warp', 'CoreUnit', 'Antimatter']):
+    elif flags & FLAG_HIGH_END:
         # High-end items have more variation
         variation = 1.0 + (variation - 1.0) * 1.5
     
@@ -106,62 +164,11 @@ def calculate_regional_variation(base_price, planet_id, item_name):
     
     return base_price * variation
 
-def calculate_order_counts(item, calculated_price, recipe_time=0, recipe_complexity=1, planet_id=None):
-    """Calculate realistic order counts with regional adjustments"""
-    
-    # Base factors
-    base_sell_orders = 1000
-    base_buy_orders = 10000
-    
-    # Adjust based on price tier
-    if calculated_price < 100:
-        price_tier = 1.0
-    elif calculated_price < 1000:
-        price_tier = 0.8
-    elif calculated_price < 10000:
-        price_tier = 0.6
-    elif calculated_price < 100000:
-        price_tier = 0.4
-    else:
-        price_tier = 0.2
-    
-    # Adjust based on production time (longer = rarer)
-    time_factor = max(0.1, 1.0 / (1.0 + recipe_time / 1000))
-    
-    # Adjust based on complexity (more complex = rarer)
-    complexity_factor = max(0.1, 1.0 / recipe_complexity)
-    
-    # Regional adjustments based on planet
-    if planet_id:
-        # Create deterministic but varied regional factors
-        seed = hash(str(planet_id)) % 1000
-        random.seed(seed)
-        regional_factor = random.uniform(0.5, 1.5)
-    else:
-        regional_factor = 1.0
-    
-    # Special cases for high-end items
-    if 'WarpBeacon' in item:
-        sell_orders = max(1, int(base_sell_orders * 0.01 * price_tier * regional_factor))
-        buy_orders = max(10, int(base_buy_orders * 0.1 * price_tier * regional_factor))
-    elif 'WarpDrive' in item or 'WarpCell' in item:
-        sell_orders = max(5, int(base_sell_orders * 0.05 * price_tier * regional_factor))
-        buy_orders = max(50, int(base_buy_orders * 0.3 * price_tier * regional_factor))
-    elif 'CoreUnit' in item:
-        sell_orders = max(10, int(base_sell_orders * 0.1 * price_tier * regional_factor))
-        buy_orders = max(100, int(base_buy_orders * 0.5 * price_tier * regional_factor))
-    else:
-        sell_orders = max(10, int(base_sell_orders * price_tier * time_factor * complexity_factor * regional_factor))
-        buy_orders = max(100, int(base_buy_orders * price_tier * time_factor * complexity_factor * regional_factor))
-    
-    # Cap at maximum
-    sell_orders = min(sell_orders, 200000000)
-    buy_orders = min(buy_orders, 200000000)
-    
-    return sell_orders, buy_orders
-
 def get_recipe_info(item, recipes):
     """Get recipe information for an item"""
+    # recipes may be the raw list or a compiled RecipeBook
+    if isinstance(recipes, RecipeBook):
+        return recipe_info(recipes, item)
     for r in recipes:
         for out in r.get('out', []):
             if item in out:
@@ -172,161 +179,143 @@ def get_recipe_info(item, recipes):
 
 def is_ore_item(item_name):
     """Check if an item is an ore"""
-    ore_indicators = ['ore', 'pure']
-    return any(ore in item_name.lower() for ore in ore_indicators)
+    return bool(classify_flags(item_name) & FLAG_ORE)
 
 def is_basic_ore(item_name):
     """Check if an item is a basic ore (buy orders only)"""
-    return item_name.lower() in BASIC_ORES
+    return bool(classify_flags(item_name) & FLAG_BASIC_ORE)
 
 def is_plasma_item(item_name):
     """Check if an item is plasma"""
-    return 'plasma' in item_name.lower()
+    return bool(classify_flags(item_name) & FLAG_PLASMA)
 
 def is_ultra_rare_item(item_name, price):
     """Check if an item is ultra rare (high price, special items)"""
-    # High-end items that should be very rare
-    ultra_rare_indicators = [
-        'WarpBeacon', 'WarpDrive', 'WarpCell', 'CoreUnit', 'Antimatter',
-        'Warp', 'Beacon', 'Drive', 'Cell', 'Core'
-    ]
-    
-    # Check for ultra rare indicators or very high price
-    has_ultra_rare_indicator = any(indicator in item_name for indicator in ultra_rare_indicators)
-    is_very_expensive = price > 50000  # Very high price threshold
-    
-    return has_ultra_rare_indicator or is_very_expensive
+    return bool(ULTRA_RARE_PATTERN.search(item_name)) or price > ULTRA_RARE_PRICE
 
 def is_rare_item(item_name, price):
     """Check if an item is rare (medium-high price, special items)"""
-    # Medium-high end items that should be somewhat rare
-    rare_indicators = [
-        'Engine', 'Thruster', 'Shield', 'Weapon', 'Advanced',
-        'Large', 'Medium', 'Small', 'XtraSmall'
-    ]
-    
-    # Check for rare indicators or high price
-    has_rare_indicator = any(indicator in item_name for indicator in rare_indicators)
-    is_expensive = price > 10000  # High price threshold
-    
-    return has_rare_indicator or is_expensive
+    return bool(RARE_PATTERN.search(item_name)) or price > RARE_PRICE
 
-def create_global_trading_strategy(all_items, planet_ids, calculated_prices):
-    """Create a global trading strategy for all items across all planets"""
+def shuffled_strategy(category, seed, planet_ids):
+    """Strategy for a plasma, ultra-rare, rare, basic ore or common item drawn from its seed"""
+    random.seed(seed)
+    available_planets = planet_ids.copy()
+    random.shuffle(available_planets)
+    
+    # Plasma items: ULTRA RARE - only one type per planet
+    if category == CATEGORY_PLASMA:
+        # Only 1-2 planets have each plasma type
+        num_planets = random.randint(1, 2)
+        plasma_planets = available_planets[:num_planets]
+        
+        return {
+            'type': 'ultra_rare_plasma',
+            'planets': plasma_planets
+        }
+    
+    # Ultra rare items: very limited distribution
+    if category == CATEGORY_ULTRA_RARE:
+        # Ultra rare items appear on only 2-4 planets
+        num_planets = random.randint(2, 4)
+        rare_planets = available_planets[:num_planets]
+        
+        # Split into buyers and sellers
+        num_sellers = max(1, num_planets // 2)
+        num_buyers = max(1, num_planets - num_sellers)
+        
+        seller_planets = rare_planets[:num_sellers]
+        buyer_planets = rare_planets[num_sellers:num_sellers + num_buyers]
+        
+        return {
+            'type': 'ultra_rare_trade',
+            'seller_planets': seller_planets,
+            'buyer_planets': buyer_planets
+        }
+    
+    # Rare items: limited distribution
+    if category == CATEGORY_RARE:
+        # Rare items appear on 30-50% of planets
+        num_planets = max(2, int(len(available_planets) * random.uniform(0.3, 0.5)))
+        rare_planets = available_planets[:num_planets]
+        
+        # Split into buyers and sellers
+        num_sellers = max(1, num_planets // 2)
+        num_buyers = max(1, num_planets - num_sellers)
+        
+        seller_planets = rare_planets[:num_sellers]
+        buyer_planets = rare_planets[num_sellers:num_sellers + num_buyers]
+        
+        return {
+            'type': 'rare_trade',
+            'seller_planets': seller_planets,
+            'buyer_planets': buyer_planets
+        }
+    
+    # Basic ores: only buy orders, distributed across planets (no sell orders)
+    if category == CATEGORY_BASIC_ORE:
+        # Each basic ore appears on 60-80% of planets as buy orders
+        num_planets = max(1, int(len(available_planets) * random.uniform(0.6, 0.8)))
+        buy_planets = available_planets[:num_planets]
+        
+        return {
+            'type': 'basic_ore_buy_only',
+            'buy_planets': buy_planets
+        }
+    
+    # Common manufactured items: split into buyers and sellers
+    num_planets = len(available_planets)
+    num_sellers = max(1, num_planets // 2)
+    num_buyers = max(1, num_planets - num_sellers)
+    
+    seller_planets = available_planets[:num_sellers]
+    buyer_planets = available_planets[num_sellers:num_sellers + num_buyers]
+    
+    return {
+        'type': 'multi_planet_trade',
+        'seller_planets': seller_planets,
+        'buyer_planets': buyer_planets
+    }
+
+def create_global_trading_strategy(all_items, planet_ids, calculated_prices, classes=None, placement=None):
+    """Create a global trading strategy for all items across all planets
+
+    placement: optional {item: strategy} from rare_placement.place_rare_items,
+    used for plasma and ultra-rare items instead of a random shuffle.
+    A shuffle depends only on the item's category and seed, so items sharing
+    both share one strategy dict (at most VARIATION_SEEDS shuffles per
+    category however large the catalog); callers must not modify them.
+    """
+    
+    if classes is None:
+        classes = get_classification_table(calculated_prices)
+    categories = classes['category']
     
     item_strategy = {}
+    shuffled = {}  # (category, seed) -> strategy
+    
+    # Other ore items (Pure, etc.): same price on each planet, but different between planets
+    ore_strategy = {
+        'type': 'ore_interplanetary',
+        'planets': planet_ids
+    }
     
     for item in all_items:
         if item not in calculated_prices:
             continue
         
-        price = calculated_prices[item]
-        
-        # Plasma items: ULTRA RARE - only one type per planet
-        if is_plasma_item(item):
-            # Each plasma type appears on only 1-2 planets
-            random.seed(hash(item) % 10000)
-            available_planets = planet_ids.copy()
-            random.shuffle(available_planets)
-            
-            # Only 1-2 planets have each plasma type
-            num_planets = random.randint(1, 2)
-            plasma_planets = available_planets[:num_planets]
-            
-            item_strategy[item] = {
-                'type': 'ultra_rare_plasma',
-                'planets': plasma_planets
-            }
-        
-        # Ultra rare items: very limited distribution
-        elif is_ultra_rare_item(item, price):
-            # Ultra rare items appear on only 2-4 planets
-            random.seed(hash(item) % 10000)
-            available_planets = planet_ids.copy()
-            random.shuffle(available_planets)
-            
-            num_planets = random.randint(2, 4)
-            rare_planets = available_planets[:num_planets]
-            
-            # Split into buyers and sellers
-            num_sellers = max(1, num_planets // 2)
-            num_buyers = max(1, num_planets - num_sellers)
-            
-            seller_planets = rare_planets[:num_sellers]
-            buyer_planets = rare_planets[num_sellers:num_sellers + num_buyers]
-            
-            item_strategy[item] = {
-                'type': 'ultra_rare_trade',
-                'seller_planets': seller_planets,
-                'buyer_planets': buyer_planets
-            }
-        
-        # Rare items: limited distribution
-        elif is_rare_item(item, price):
-            # Rare items appear on 30-50% of planets
-            random.seed(hash(item) % 10000)
-            available_planets = planet_ids.copy()
-            random.shuffle(available_planets)
-            
-            num_planets = max(2, int(len(available_planets) * random.uniform(0.3, 0.5)))
-            rare_planets = available_planets[:num_planets]
-            
-            # Split into buyers and sellers
-            num_sellers = max(1, num_planets // 2)
-            num_buyers = max(1, num_planets - num_sellers)
-            
-            seller_planets = rare_planets[:num_sellers]
-            buyer_planets = rare_planets[num_sellers:num_sellers + num_buyers]
-            
-            item_strategy[item] = {
-                'type': 'rare_trade',
-                'seller_planets': seller_planets,
-                'buyer_planets': buyer_planets
-            }
+        category = categories[item]
         
-        # Basic ores: only buy orders, distributed across planets
-        elif is_basic_ore(item):
-            # Distribute buy orders across planets (no sell orders)
-            random.seed(hash(item) % 10000)
-            available_planets = planet_ids.copy()
-            random.shuffle(available_planets)
-            
-            # Each basic ore appears on 60-80% of planets as buy orders
-            num_planets = max(1, int(len(available_planets) * random.uniform(0.6, 0.8)))
-            buy_planets = available_planets[:num_planets]
-            
-            item_strategy[item] = {
-                'type': 'basic_ore_buy_only',
-                'buy_planets': buy_planets
-            }
-        
-        # Other ore items (Pure, etc.): same price on each planet, but different between planets
-        elif is_ore_item(item):
-            item_strategy[item] = {
-                'type': 'ore_interplanetary',
-                'planets': planet_ids
-            }
-        
-        # Common manufactured items: normal distribution
+        if placement and item in placement:
+            item_strategy[item] = placement[item]
+        elif category == CATEGORY_ORE:
+            item_strategy[item] = ore_strategy
         else:
-            # Create buy/sell distribution across planets
-            random.seed(hash(item) % 10000)
-            available_planets = planet_ids.copy()
-            random.shuffle(available_planets)
-            
-            # Split into buyers and sellers
-            num_planets = len(available_planets)
-            num_sellers = max(1, num_planets // 2)
-            num_buyers = max(1, num_planets - num_sellers)
-            
-            seller_planets = available_planets[:num_sellers]
-            buyer_planets = available_planets[num_sellers:num_sellers + num_buyers]
-            
-            item_strategy[item] = {
-                'type': 'multi_planet_trade',
-                'seller_planets': seller_planets,
-                'buyer_planets': buyer_planets
-            }
+            seed = hash(item) % VARIATION_SEEDS
+            strategy = shuffled.get((category, seed))
+            if strategy is None:
+                strategy = shuffled[(category, seed)] = shuffled_strategy(category, seed, planet_ids)
+            item_strategy[item] = strategy
     
     return item_strategy
 
@@ -379,142 +368,329 @@ def determine_market_role(planet_id, item_name, item_strategy):
     
     return 'none'
 
-def generate_planet_market(planet_id, calculated_prices, item_strategy, recipes):
-    """Generate market data for a single planet"""
+def build_role_matrix(item_strategy, planet_ids, items):
+    """Precompute the market role of every item on every planet
+
+    Returns {'items': {item: column}, 'matrix': planets x items uint8 array,
+    'rows': {planet_id: matrix row}} where each planet row holds one ROLE_*
+    code per item, so generating a planet is a single row read instead of
+    list membership tests per (planet, item). Items sharing a strategy dict
+    are assigned in one array operation.
+    """
+    item_index = {item: i for i, item in enumerate(items)}
+    planet_index = {planet_id: i for i, planet_id in enumerate(planet_ids)}
+    matrix = np.zeros((len(planet_index), len(item_index)), dtype=np.uint8)
+    
+    shared = {}  # id(strategy) -> (strategy, columns)
+    for item, strategy in item_strategy.items():
+        column = item_index.get(item)
+        if column is not None:
+            shared.setdefault(id(strategy), (strategy, []))[1].append(column)
+    
+    def assign(planets, columns, role):
+        rows = [planet_index[planet_id] for planet_id in planets if planet_id in planet_index]
+        if rows:
+            matrix[np.ix_(rows, columns)] = role
+    
+    for strategy, columns in shared.values():
+        if strategy['type'] in ('ultra_rare_plasma', 'ore_interplanetary'):
+            assign(strategy['planets'], columns, ROLE_BOTH_SAME_PRICE)
+        elif strategy['type'] == 'basic_ore_buy_only':
+            assign(strategy['buy_planets'], columns, ROLE_BUY_ONLY)
+        else:
+            # Sellers win if a planet is listed on both sides
+            assign(strategy['buyer_planets'], columns, ROLE_BUY_ONLY)
+            assign(strategy['seller_planets'], columns, ROLE_SELL_ONLY)
     
-    market_data = []
+    rows = {planet_id: matrix[i] for planet_id, i in planet_index.items()}
+    return {'items': item_index, 'matrix': matrix, 'rows': rows}
+
+def strategy_planets(role_matrix, planet_ids, categories):
+    """{item: (category, seller planets, buyer planets)} exactly as the role matrix assigns them"""
+    matrix = role_matrix['matrix']
+    both = matrix == ROLE_BOTH_SAME_PRICE
+    # Item-major copies so every item's planets are one contiguous row
+    sells = np.ascontiguousarray(((matrix == ROLE_SELL_ONLY) | both).T)
+    buys = np.ascontiguousarray(((matrix == ROLE_BUY_ONLY) | both).T)
+    planets = np.array(planet_ids, dtype=object)
+    return {
+        item: (categories.get(item, CATEGORY_COMMON), planets[sells[column]].tolist(), planets[buys[column]].tolist())
+        for item, column in role_matrix['items'].items()
+    }
+
+def market_plan(calculated_prices, recipes, classes=None):
+    """Per-item arrays shared by every planet's quotes, built once per catalog
+
+    Item order follows calculated_prices, like the role matrix columns.
+    """
+    if classes is None:
+        classes = get_classification_table(calculated_prices)
+    if not isinstance(recipes, RecipeBook):
+        recipes = compile_recipes(recipes)
+    items = list(calculated_prices)
+    flags = [classes['flags'][item] for item in items]
+    info = {item: get_recipe_info(item, recipes) for item in items}
+    return {
+        'names': np.array(items, dtype=object),
+        'prices': np.array(list(calculated_prices.values()), dtype=float),
+        'ore': np.array([bool(f & FLAG_ORE) for f in flags], dtype=bool),
+        'high_end': np.array([bool(f & FLAG_HIGH_END) for f in flags], dtype=bool),
+        'profiles': market_rules.profile_arrays(market_rules.load_market_rules(), items, classes['category'], info)
+    }
+
+def generate_planet_quotes(planet_id, calculated_prices, item_strategy, recipes, classes=None, role_matrix=None,
+                           plan=None):
+    """Generate the top-of-book quote for every item traded on a planet
+
+    Returns compact tuples (item, sell_orders, sell_price, buy_orders, buy_price)
+    with numeric prices; a side without orders has count and price 0.
+    Rows are computed as arrays over the planet's traded items with the same
+    arithmetic as calculate_regional_variation and market_rules.order_counts;
+    pass a market_plan to reuse the per-item arrays across planets.
+    """
+    
+    if plan is None:
+        plan = market_plan(calculated_prices, recipes, classes)
+    if role_matrix is None:
+        role_matrix = build_role_matrix(item_strategy, [planet_id], calculated_prices.keys())
+    roles = role_matrix['rows'][planet_id]
+    
+    # Items with 'none' role are not included in the market
+    traded = np.flatnonzero(roles)
+    names = plan['names'][traded].tolist()
+    
+    # Regional variation, as calculate_regional_variation computes it per row
+    prefix = f"{planet_id}_"
+    seeds = np.fromiter((hash(prefix + item) % VARIATION_SEEDS for item in names), dtype=np.int64, count=len(names))
+    min_variation = REGIONAL_VARIATION['min_variation']
+    max_variation = REGIONAL_VARIATION['max_variation']
+    variation = min_variation + (max_variation - min_variation) * np.asarray(variation_draws())[seeds]
+    # Raw materials have less variation, high-end items more
+    variation = np.where(plan['ore'][traded], 1.0 + (variation - 1.0) * 0.5,
+                         np.where(plan['high_end'][traded], 1.0 + (variation - 1.0) * 1.5, variation))
+    variation = np.maximum(0.7, np.minimum(1.5, variation))
+    regional_prices = plan['prices'][traded] * variation
+    
+    # Order counts and spreads come from market_rules.yaml
+    rules = market_rules.load_market_rules()
+    sell_orders, buy_orders = market_rules.order_counts_array(rules, plan['profiles'], regional_prices,
+                                                              market_rules.planet_factor(rules, planet_id), traded)
+    sell_prices = regional_prices * rules['sell_spread']
+    buy_prices = regional_prices * rules['buy_spread']
     
-    for item, base_price in calculated_prices.items():
-        # Calculate regional variation
-        regional_price = calculate_regional_variation(base_price, planet_id, item)
-        
-        # Get recipe info for order count calculation
-        recipe_time, complexity = get_recipe_info(item, recipes)
-        
-        # Determine market role for this item on this planet
-        market_role = determine_market_role(planet_id, item, item_strategy)
-        
-        if market_role == 'both_same_price':
-            # Ore items: both buy and sell at EXACTLY the same price
-            new_sell_orders, new_buy_orders = calculate_order_counts(
-                item, regional_price, recipe_time, complexity, planet_id
-            )
-            
-            # CRITICAL: Same price for both (no profit margin possible)
-            same_price = regional_price
-            
-            market_data.append([
-                item,
-                int(new_sell_orders),
-                f"{same_price:.2f}",
-                int(new_buy_orders),
-                f"{same_price:.2f}"
-            ])
-            
-        elif market_role == 'sell_only':
-            # This planet sells this item
-            new_sell_orders, _ = calculate_order_counts(
-                item, regional_price, recipe_time, complexity, planet_id
-            )
-            
-            # Sell price with markup
-            sell_price = regional_price * 1.1
-            
-            market_data.append([
-                item,
-                int(new_sell_orders),
-                f"{sell_price:.2f}",
-                0,  # No buy orders
-                "0.00"
-            ])
-            
-        elif market_role == 'buy_only':
-            # This planet buys this item
-            _, new_buy_orders = calculate_order_counts(
-                item, regional_price, recipe_time, complexity, planet_id
-            )
-            
-            # Buy price with discount
-            buy_price = regional_price * 0.9
-            
-            market_data.append([
-                item,
-                0,  # No sell orders
-                "0.00",
-                int(new_buy_orders),
-                f"{buy_price:.2f}"
-            ])
-        
-        # Items with 'none' role are not included in the market
+    market_data = []
+    for item, market_role, regional_price, sells, sell_price, buys, buy_price in zip(
+            names, roles[traded].tolist(), regional_prices.tolist(), sell_orders.tolist(), sell_prices.tolist(),
+            buy_orders.tolist(), buy_prices.tolist()):
+        if market_role == ROLE_BOTH_SAME_PRICE:
+            # Ore items: both buy and sell at EXACTLY the same price (no profit margin possible)
+            market_data.append((item, sells, regional_price, buys, regional_price))
+        elif market_role == ROLE_SELL_ONLY:
+            # This planet sells this item, with markup and no buy orders
+            market_data.append((item, sells, sell_price, 0, 0))
+        elif market_role == ROLE_BUY_ONLY:
+            # This planet buys this item, at a discount and no sell orders
+            market_data.append((item, 0, 0, buys, buy_price))
     
     return market_data
 
-def main():
-    print("Generating all market files from scratch...")
-    
-    # Load calculated prices
-    calculated_prices = load_calculated_prices()
-    if not calculated_prices:
-        print("❌ No calculated prices found. Run calculate_prices.py first.")
-        return
-    
-    # Get planet IDs
-    planet_ids = get_planet_ids()
-    if not planet_ids:
-        print("❌ No planet IDs found. Check market_orders directory.")
-        return
-    
-    print(f"Found {len(planet_ids)} planets: {', '.join(planet_ids[:10])}{'...' if len(planet_ids) > 10 else ''}")
-    
-    # Load recipes
-    recipes = load_yaml_file('recipes.yaml')
+def generate_planet_market(planet_id, calculated_prices, item_strategy, recipes, classes=None, role_matrix=None):
+    """Generate market data for a single planet"""
+    quotes = generate_planet_quotes(planet_id, calculated_prices, item_strategy, recipes, classes, role_matrix)
+    return [format_market_row(*quote) for quote in quotes]
+
+def expand_order_book(quotes, levels=None, quantity_decay=None, price_step=None):
+    """Stream formatted CSV rows with `levels` price levels per side for each quote
+
+    Level 0 is the classic quote. Deeper levels shrink the order count by
+    quantity_decay and move sell prices up / buy prices down by price_step, so
+    each item yields `levels` rows and the work stays linear in the output.
+    """
+    levels = levels or ORDER_BOOK['levels']
+    quantity_decay = ORDER_BOOK['quantity_decay'] if quantity_decay is None else quantity_decay
+    price_step = ORDER_BOOK['price_step'] if price_step is None else price_step
+    
+    # Per-level multipliers are computed once, not per row
+    quantity_factors = [quantity_decay ** level for level in range(levels)]
+    sell_factors = [1.0 + price_step * level for level in range(levels)]
+    buy_factors = [max(0.0, 1.0 - price_step * level) for level in range(levels)]
+    
+    for item, sell_orders, sell_price, buy_orders, buy_price in quotes:
+        for level in range(levels):
+            quantity_factor = quantity_factors[level]
+            if sell_orders:
+                level_sell_orders = max(1, int(sell_orders * quantity_factor))
+                level_sell_price = sell_price * sell_factors[level]
+            else:
+                level_sell_orders, level_sell_price = 0, 0
+            if buy_orders:
+                level_buy_orders = max(1, int(buy_orders * quantity_factor))
+                level_buy_price = buy_price * buy_factors[level]
+            else:
+                level_buy_orders, level_buy_price = 0, 0
+            yield format_market_row(item, level_sell_orders, level_sell_price, level_buy_orders, level_buy_price)
+
+def balanced_placement(planet_ids, calculated_prices, categories, settings):
+    """Solve plasma / ultra-rare placement and report how evenly it spread"""
+    plasma_items = [item for item, category in categories.items() if category == CATEGORY_PLASMA]
+    ultra_rare_items = [item for item, category in categories.items() if category == CATEGORY_ULTRA_RARE]
+    
+    start = time.perf_counter()
+    placement, stats = rare_placement.place_rare_items(plasma_items, ultra_rare_items, planet_ids,
+                                                       calculated_prices, settings)
+    elapsed = time.perf_counter() - start
+    
+    loads = stats['loads'].values()
+    print(f"   Rare placement: {stats['placements']} slots for {len(placement)} items in {elapsed * 1000:.1f}ms, "
+          f"load {min(loads, default=0)}-{max(loads, default=0)} per planet (cap {stats['cap']})")
+    relaxed = {name: count for name, count in stats['relaxed'].items() if count}
+    if relaxed:
+        print(f"   ⚠️  Relaxed constraints: {', '.join(f'{name} x{count}' for name, count in relaxed.items())}")
+    return placement
+
+def generate_markets(calculated_prices, planet_ids, recipes, output_dir, placement=None,
+                     levels=1, quantity_decay=None, price_step=None, keep_quotes=True, save_artifact=True):
+    """Build the trading strategy and write every planet's market file
+
+    recipes may be the raw list or a compiled RecipeBook; placement is a
+    RARE_PLACEMENT-style dict. Also writes planet_ids.txt and, with
+    save_artifact, the strategy artifact. Returns {'quotes': {planet: quotes}
+    (None unless keep_quotes), 'artifact', 'rows', 'arbitrage_prevented',
+    'write_stats', 'seconds'}. Large catalogs should pass keep_quotes=False so
+    only one planet's quotes are in memory at a time.
+    """
+    placement = dict(RARE_PLACEMENT, **(placement or {}))
+    if not isinstance(recipes, RecipeBook):
+        recipes = compile_recipes(recipes)
+    
+    # Classify every item once
+    classes = get_classification_table(calculated_prices)
     
     # Create global trading strategy
     print("Creating global trading strategy...")
-    item_strategy = create_global_trading_strategy(calculated_prices.keys(), planet_ids, calculated_prices)
+    rare_strategies = None
+    if placement['mode'] == 'balanced':
+        rare_strategies = balanced_placement(planet_ids, calculated_prices, classes['category'], {
+            'max_rare_per_planet': placement['max_rare_per_planet'],
+            'min_trade_distance': placement['min_trade_distance']
+        })
+    item_strategy = create_global_trading_strategy(calculated_prices.keys(), planet_ids, calculated_prices,
+                                                   classes, rare_strategies)
+    role_matrix = build_role_matrix(item_strategy, planet_ids, calculated_prices.keys())
+    plan = market_plan(calculated_prices, recipes, classes)
     
     # Create output directory
-    output_dir = "market_orders_generated"
     os.makedirs(output_dir, exist_ok=True)
     
     # Generate market files for each planet
+    planet_quotes = {}
     total_items = 0
     total_arbitrage_prevented = 0
+    write_stats = WriteStats()
+    run_start = time.perf_counter()
     
     for planet_id in planet_ids:
         print(f"Generating market for planet {planet_id}...")
         
-        # Generate market data
-        market_data = generate_planet_market(planet_id, calculated_prices, item_strategy, recipes)
+        # Generate compact top-of-book quotes
+        quotes = generate_planet_quotes(planet_id, calculated_prices, item_strategy, recipes, classes, role_matrix,
+                                        plan)
+        if keep_quotes:
+            planet_quotes[planet_id] = quotes
         
-        # Write to file
+        # Write to file (temp file + atomic rename), streaming order-book levels
         output_file = os.path.join(output_dir, f"{planet_id}.csv")
-        with open(output_file, 'w', newline='') as f:
-            writer = csv.writer(f)
-            for row in market_data:
-                writer.writerow(row)
+        if levels > 1:
+            rows = expand_order_book(quotes, levels, quantity_decay, price_step)
+        else:
+            rows = [format_market_row(*quote) for quote in quotes]
+        rows_written = write_stats.write(output_file, rows)
         
-        # Count items and arbitrage prevention
-        items_count = len(market_data)
-        arbitrage_prevented = sum(1 for row in market_data if (row[1] == '0' and row[3] != '0') or (row[1] != '0' and row[3] == '0'))
+        # Count items and arbitrage prevention (one-sided quotes)
+        items_count = len(quotes)
+        arbitrage_prevented = sum(1 for quote in quotes if (quote[1] == 0) != (quote[3] == 0))
         
-        total_items += items_count
+        total_items += rows_written
         total_arbitrage_prevented += arbitrage_prevented
         
-        print(f"   Generated {items_count} items, {arbitrage_prevented} arbitrage prevented")
+        print(f"   Generated {items_count} items ({rows_written} rows), {arbitrage_prevented} arbitrage prevented")
     
-    print(f"\nSummary:")
-    print(f"   Total items generated: {total_items}")
-    print(f"   Arbitrage prevented: {total_arbitrage_prevented}")
-    print(f"   Output saved to: {output_dir}/")
-    print(f"   Planets: {len(planet_ids)}")
+    run_seconds = time.perf_counter() - run_start
     
     # Save planet IDs for reference
     with open("planet_ids.txt", "w") as f:
         for planet_id in planet_ids:
             f.write(f"{planet_id}\n")
     
+    # Persist the strategy so reports don't have to rescan the CSVs
+    artifact = None
+    if save_artifact:
+        items = strategy_planets(role_matrix, planet_ids, classes['category'])
+        artifact = market_strategy.strategy_artifact(items, planet_ids, output_dir)
+        market_strategy.save_strategy(artifact)
+    
+    return {
+        'quotes': planet_quotes if keep_quotes else None,
+        'artifact': artifact,
+        'rows': total_items,
+        'arbitrage_prevented': total_arbitrage_prevented,
+        'write_stats': write_stats,
+        'seconds': run_seconds
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate all market files from scratch")
+    parser.add_argument('--levels', type=int, default=ORDER_BOOK['levels'],
+                        help="price levels per side (order-book mode when > 1)")
+    parser.add_argument('--quantity-decay', type=float, default=ORDER_BOOK['quantity_decay'])
+    parser.add_argument('--price-step', type=float, default=ORDER_BOOK['price_step'])
+    parser.add_argument('--placement', choices=['balanced', 'random'], default=RARE_PLACEMENT['mode'],
+                        help="plasma / ultra-rare placement across planets")
+    parser.add_argument('--max-rare-per-planet', type=int, default=RARE_PLACEMENT['max_rare_per_planet'])
+    parser.add_argument('--min-trade-distance', type=float, default=RARE_PLACEMENT['min_trade_distance'])
+    args = parser.parse_args()
+    order_book_mode = args.levels > 1
+    
+    print("Generating all market files from scratch...")
+    
+    # Load calculated prices
+    calculated_prices = load_calculated_prices()
+    if not calculated_prices:
+        print("❌ No calculated prices found. Run calculate_prices.py first.")
+        return
+    
+    # Get planet IDs
+    planet_ids = get_planet_ids()
+    if not planet_ids:
+        print("❌ No planet IDs found. Check market_orders directory.")
+        return
+    
+    print(f"Found {len(planet_ids)} planets: {', '.join(planet_ids[:10])}{'...' if len(planet_ids) > 10 else ''}")
+    
+    # Load recipes, compiled once so per-item recipe lookups are a dict hit
+    recipes = compile_recipes(load_recipes_or_exit('recipes.yaml'))
+    
+    output_dir = "market_orders_orderbook" if order_book_mode else "market_orders_generated"
+    if order_book_mode:
+        print(f"Order-book mode: {args.levels} levels per side")
+    placement = {
+        'mode': args.placement,
+        'max_rare_per_planet': args.max_rare_per_planet,
+        'min_trade_distance': args.min_trade_distance
+    }
+    result = generate_markets(calculated_prices, planet_ids, recipes, output_dir, placement,
+                              args.levels, args.quantity_decay, args.price_step)
+    write_stats = result['write_stats']
+    
+    print(f"\nSummary:")
+    print(f"   Total rows generated: {result['rows']}")
+    print(f"   Arbitrage prevented: {result['arbitrage_prevented']}")
+    print(f"   Output saved to: {output_dir}/")
+    print(f"   Planets: {len(planet_ids)}")
+    print(f"   {write_stats.summary()}")
+    print(f"   Full run: {result['rows'] / result['seconds']:,.0f} rows/s ({result['seconds']:.2f}s)")
     print(f"   Planet IDs saved to: planet_ids.txt")
+    print(f"   Market strategy saved to: {market_strategy.STRATEGY_FILE}")
     
     print(f"\nReady to copy files from {output_dir}/ to your server!")
     print(f"Arbitrage protection: Basic ores buy-only, other items buy/sell distributed")
@@ -4,11 +4,14 @@ Generate a comprehensive trading report for all market opportunities
 """
 
 import csv
-import yaml
 import os
-import random
 import math
+import random
 from calculate_prices import *
+from item_classification import FLAG_ORE, FLAG_HIGH_END, classify_flags, get_classification_table
+from lazy_imports import lazy_import
+
+yaml = lazy_import('yaml')
 
 def load_calculated_prices():
     """Load calculated prices from cache and ore prices"""
@@ -42,16 +45,19 @@ def load_calculated_prices():
     
     return prices
 
-def calculate_regional_variation(base_price, planet_id, item_name):
+def calculate_regional_variation(base_price, planet_id, item_name, flags=None):
     """Calculate regional price variation for a specific planet and item"""
+    if flags is None:
+        flags = classify_flags(item_name)
+    
     seed = hash(f"{planet_id}_{item_name}") % 10000
     random.seed(seed)
     
     variation = random.uniform(0.85, 1.25)
     
-    if any(ore in item_name.lower() for ore in ['ore', 'pure']):
+    if flags & FLAG_ORE:
         variation = 1.0 + (variation - 1.0) * 0.5
-    elif any(high_end in item_name for high_end in ['Warp', 'CoreUnit', 'Antimatter']):
+    elif flags & FLAG_HIGH_END:
         variation = 1.0 + (variation - 1.0) * 1.5
     
     variation = max(0.7, min(1.5, variation))
@@ -59,28 +65,16 @@ def calculate_regional_variation(base_price, planet_id, item_name):
 
 def is_ore_item(item_name):
     """Check if an item is an ore"""
-    ore_indicators = ['ore', 'pure']
-    return any(ore in item_name.lower() for ore in ore_indicators)
+    return bool(classify_flags(item_name) & FLAG_ORE)
 
-def analyze_planet_markets():
-    """Analyze all planet markets and find trading opportunities"""
-    
-    calculated_prices = load_calculated_prices()
-    market_orders_dir = "market_orders_output"
-    
-    if not os.path.exists(market_orders_dir):
-        print(f"❌ Output directory {market_orders_dir} not found. Run the market update script first.")
-        return
-    
-    # Collect all planet data
+def load_planet_data(market_orders_dir):
+    """Parse every planet CSV into {planet: {item: {sell_orders, sell_price, buy_orders, buy_price}}}"""
     planet_data = {}
-    planet_files = []
     
     for filename in os.listdir(market_orders_dir):
         if filename.endswith('.csv'):
             planet_id = os.path.splitext(filename)[0]
             planet_file = os.path.join(market_orders_dir, filename)
-            planet_files.append(planet_file)
             
             planet_data[planet_id] = {}
             
@@ -105,11 +99,43 @@ def analyze_planet_markets():
                             }
                         except (ValueError, IndexError):
                             continue
+    return planet_data
+
+def planet_data_from_snapshot(snapshot):
+    """Convert a market snapshot (see market_snapshot.py) to the planet_data layout"""
+    return {
+        planet_id: {
+            item: {'sell_orders': sell_orders, 'sell_price': sell_price,
+                   'buy_orders': buy_orders, 'buy_price': buy_price}
+            for item, (sell_orders, sell_price, buy_orders, buy_price) in quotes.items()
+        }
+        for planet_id, quotes in snapshot.items()
+    }
+
+def analyze_planet_markets():
+    """Analyze all planet markets and find trading opportunities"""
+    
+    calculated_prices = load_calculated_prices()
+    market_orders_dir = "market_orders_output"
+    
+    if not os.path.exists(market_orders_dir):
+        print(f"❌ Output directory {market_orders_dir} not found. Run the market update script first.")
+        return
+    
+    # Collect all planet data
+    planet_data = load_planet_data(market_orders_dir)
     
     print(f"Analyzed {len(planet_data)} planets")
     
+    opportunities = find_opportunities(planet_data, calculated_prices)
+    return opportunities, planet_data, calculated_prices
+
+def find_opportunities(planet_data, calculated_prices):
+    """Interplanetary trading opportunities in a set of planet markets"""
+    
     # Find trading opportunities
     opportunities = []
+    item_flags = get_classification_table(calculated_prices)['flags']
     
     # Get all unique items
     all_items = set()
@@ -151,7 +177,7 @@ def analyze_planet_markets():
         buy_opportunities = [p for p in item_prices if p['type'] == 'buy']
         
         # For ore items, look for price differences between planets
-        if is_ore_item(item) and len(sell_opportunities) >= 2:
+        if item_flags[item] & FLAG_ORE and len(sell_opportunities) >= 2:
             # Find cheapest and most expensive planets
             cheapest = min(sell_opportunities, key=lambda x: x['price'])
             most_expensive = max(sell_opportunities, key=lambda x: x['price'])
@@ -196,14 +222,18 @@ def analyze_planet_markets():
                                 'sell_orders': buy_opp['orders']
                             })
     
-    return opportunities, planet_data, calculated_prices
+    return opportunities
+
+def generate_detailed_report(analysis=None):
+    """Generate a comprehensive trading report
 
-def generate_detailed_report():
-    """Generate a comprehensive trading report"""
+    analysis is an optional (opportunities, planet_data, calculated_prices)
+    computed in memory; by default market_orders_output/ is analyzed.
+    """
     
     print("Generating comprehensive trading report...")
     
-    opportunities, planet_data, calculated_prices = analyze_planet_markets()
+    opportunities, planet_data, calculated_prices = analysis or analyze_planet_markets()
     
     # Sort opportunities by profit percentage
     opportunities.sort(key=lambda x: x['profit_percent'], reverse=True)
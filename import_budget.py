@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Startup import-time budget for every entry point
+
+Each script is imported in a fresh interpreter with `python -X importtime` and its
+cumulative import time is compared against IMPORT_BUDGET_MS. Heavy dependencies
+(yaml, numpy, asyncio, http.server) are loaded lazily through lazy_imports.py,
+so they must not show up here.
+
+Usage:
+    python import_budget.py [--runs 5]
+Exits with status 1 when an entry point is over budget.
+"""
+
+import argparse
+import compileall
+import os
+import subprocess
+import sys
+
+# Milliseconds, best of --runs, measured on a quiet machine with warm .pyc files
+IMPORT_BUDGET_MS = {
+    'calculate_prices': 20,
+    'production_planner': 25,
+    'recipe_model': 30,
+    'recipe_diff': 30,
+    'sensitivity': 35,
+    'scenario_runner': 50,
+    'price_query': 15,
+    'price_server': 45,
+    'price_history': 35,
+    'generate_all_markets': 50,
+    'update_market_prices': 40,
+    'update_multi_market_prices': 50,
+    'generate_trading_report': 30,
+    'analyze_rare_items': 30,
+    'market_simulation': 40,
+    'trade_route_optimizer': 40,
+    'craft_profitability': 45,
+    'verify_markets': 45,
+    'add_item_ids': 35,
+    'pipeline': 45,
+    'scale_check': 40,
+    'price_index': 35
+}
+
+def measure_import(module):
+    """(cumulative import time in ms, heaviest direct dependency) for one fresh import"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+
+    total = None
+    children = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        name = name.strip()
+        if depth == 0:
+            if name == module:
+                total = int(cumulative) / 1000
+                break
+            # Children are listed before their parent: drop other top-level imports' children
+            children = []
+        elif depth == 1:
+            children.append((int(cumulative) / 1000, name))
+    heaviest = max(children, default=(0, '-'))
+    return total, heaviest
+
+def main():
+    parser = argparse.ArgumentParser(description="Check entry point import times against their budget")
+    parser.add_argument('--runs', type=int, default=5, help="imports per module (best is kept)")
+    args = parser.parse_args()
+
+    # Budgets assume warm .pyc files; a stale one (e.g. with PYTHONDONTWRITEBYTECODE) is recompiled on every import
+    compileall.compile_dir(os.path.dirname(os.path.abspath(__file__)), maxlevels=0, quiet=1)
+
+    over = []
+    print(f"{'Entry point':28} {'Import':>8} {'Budget':>8}  Heaviest dependency")
+    for module, budget in IMPORT_BUDGET_MS.items():
+        best = None
+        for _ in range(args.runs):
+            total, heaviest = measure_import(module)
+            if best is None or total < best[0]:
+                best = (total, heaviest)
+        total, (child_ms, child) = best
+        status = "✅" if total <= budget else "❌"
+        if total > budget:
+            over.append(module)
+        print(f"{module:28} {total:>6.1f}ms {budget:>6}ms  {status} {child} ({child_ms:.1f}ms)")
+
+    if over:
+        print(f"\n❌ {len(over)} entry points over budget: {', '.join(over)}")
+        sys.exit(1)
+    print("\n✅ All entry points within their import budget")
+
+if __name__ == "__main__":
+    main()
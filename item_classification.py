@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Item classification table: category, rarity tier and flags for every item
+
+The keyword rules used by the market generators and reports are compiled into
+regular expressions once, and each catalog is classified a single time. Callers
+read small integer ids from the table instead of re-checking item names.
+"""
+
+import re
+
+# Market categories, in the order the trading strategy checks them
+CATEGORY_COMMON = 0
+CATEGORY_ORE = 1
+CATEGORY_BASIC_ORE = 2
+CATEGORY_RARE = 3
+CATEGORY_ULTRA_RARE = 4
+CATEGORY_PLASMA = 5
+
+CATEGORY_NAMES = ['common', 'ore', 'basic_ore', 'rare', 'ultra_rare', 'plasma']
+
+# Rarity tier per category: 0 = common, 1 = rare, 2 = ultra rare
+RARITY_TIERS = [0, 0, 0, 1, 2, 2]
+
+# Flags (bitmask)
+FLAG_ORE = 1         # Name contains 'ore' or 'pure' (any case)
+FLAG_BASIC_ORE = 2   # One of the T1/T2 basic ores
+FLAG_PLASMA = 4      # Name contains 'plasma' (any case)
+FLAG_HIGH_END = 8    # Warp/CoreUnit/Antimatter: wider regional price variation
+
+# Report groups used by the rare items report
+GROUP_NONE = 0
+GROUP_PLASMA = 1
+GROUP_WARP = 2
+GROUP_CORE = 3
+GROUP_OTHER_RARE = 4
+
+GROUP_NAMES = ['none', 'plasma', 'warp', 'core', 'other_rare']
+
+# Basic ores that should only have buy orders (no sell orders)
+BASIC_ORES = {
+    'carbonore', 'siliconore', 'aluminiumore', 'ironore',
+    'sodiumore', 'calciumore', 'chromiumore', 'copperore'
+}
+
+ULTRA_RARE_PRICE = 50000  # Very high price threshold
+RARE_PRICE = 10000        # High price threshold
+
+ORE_PATTERN = re.compile(r'ore|pure', re.IGNORECASE)
+PLASMA_PATTERN = re.compile(r'plasma', re.IGNORECASE)
+HIGH_END_PATTERN = re.compile(r'Warp|CoreUnit|Antimatter')
+ULTRA_RARE_PATTERN = re.compile(r'Warp|Beacon|Drive|Cell|Core|Antimatter')
+RARE_PATTERN = re.compile(r'Engine|Thruster|Shield|Weapon|Advanced|Large|Medium|Small')
+WARP_GROUP_PATTERN = re.compile(r'warp', re.IGNORECASE)
+CORE_GROUP_PATTERN = re.compile(r'core', re.IGNORECASE)
+OTHER_RARE_GROUP_PATTERN = re.compile(r'Beacon|Drive|Cell|Engine|Thruster')
+
+TABLE_CACHE_SIZE = 4  # Price tables whose classification is kept, most recently used last
+_table_cache = []     # [(price table, item count, classification table)]
+
+def classify_flags(item_name):
+    """Flag bitmask for an item name"""
+    flags = 0
+    if ORE_PATTERN.search(item_name):
+        flags |= FLAG_ORE
+    if item_name.lower() in BASIC_ORES:
+        flags |= FLAG_BASIC_ORE
+    if PLASMA_PATTERN.search(item_name):
+        flags |= FLAG_PLASMA
+    if HIGH_END_PATTERN.search(item_name):
+        flags |= FLAG_HIGH_END
+    return flags
+
+def classify_category(item_name, price, flags=None):
+    """Market category id for an item, using the trading strategy precedence"""
+    if flags is None:
+        flags = classify_flags(item_name)
+    if flags & FLAG_PLASMA:
+        return CATEGORY_PLASMA
+    if ULTRA_RARE_PATTERN.search(item_name) or price > ULTRA_RARE_PRICE:
+        return CATEGORY_ULTRA_RARE
+    if RARE_PATTERN.search(item_name) or price > RARE_PRICE:
+        return CATEGORY_RARE
+    if flags & FLAG_BASIC_ORE:
+        return CATEGORY_BASIC_ORE
+    if flags & FLAG_ORE:
+        return CATEGORY_ORE
+    return CATEGORY_COMMON
+
+def classify_group(item_name):
+    """Rare items report group for an item name"""
+    if PLASMA_PATTERN.search(item_name):
+        return GROUP_PLASMA
+    if WARP_GROUP_PATTERN.search(item_name):
+        return GROUP_WARP
+    if CORE_GROUP_PATTERN.search(item_name):
+        return GROUP_CORE
+    if OTHER_RARE_GROUP_PATTERN.search(item_name):
+        return GROUP_OTHER_RARE
+    return GROUP_NONE
+
+def build_classification_table(prices):
+    """Classify every item of a catalog ({item: price}) once
+
+    Returns {'category': {item: id}, 'flags': {item: bitmask}, 'group': {item: id}}.
+    """
+    category = {}
+    flags = {}
+    group = {}
+    for item, price in prices.items():
+        item_flags = classify_flags(item)
+        flags[item] = item_flags
+        category[item] = classify_category(item, price or 0, item_flags)
+        group[item] = classify_group(item)
+    return {'category': category, 'flags': flags, 'group': group}
+
+def get_classification_table(prices):
+    """Classification table for a price table, computed once per table object
+
+    Tables are matched by identity (plus item count), so a lookup costs the
+    same for any catalog size; pass a new dict rather than changing prices in
+    place. The cache holds on to the last TABLE_CACHE_SIZE tables.
+    """
+    for i, (cached_prices, count, table) in enumerate(_table_cache):
+        if cached_prices is prices and count == len(prices):
+            _table_cache.append(_table_cache.pop(i))
+            return table
+
+    table = build_classification_table(prices)
+    _table_cache.append((prices, len(prices), table))
+    if len(_table_cache) > TABLE_CACHE_SIZE:
+        del _table_cache[0]
+    return table
+
+def rarity_tier(table, item):
+    """Rarity tier (0-2) of a classified item"""
+    return RARITY_TIERS[table['category'].get(item, CATEGORY_COMMON)]
@@ -0,0 +1,31 @@
+"""
+Deferred imports for heavy dependencies (yaml, numpy, asyncio, http.server)
+
+lazy_import returns the module object right away but only executes it on first
+attribute access, so scripts and subcommands that never touch a dependency never
+pay for importing it. A missing package still fails at import time.
+"""
+
+import importlib.util
+import sys
+
+def lazy_import(name):
+    """Module `name`, loaded on first use"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    parent, _, child = name.rpartition('.')
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    if parent:
+        # As the import statement does, so `import http; http.server` works afterwards
+        setattr(lazy_import(parent), child, module)
+    return module
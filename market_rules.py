@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Declarative market rules: order counts, spreads and caps for every market row
+
+The shape of the markets (price tiers, per-item overrides, recipe time and
+complexity factors, planet factors, bid/ask spread and order caps) lives in
+market_rules.yaml (see examples/market_rules_example.yaml) instead of code.
+Rules are compiled once: price tiers become a bisect table, overrides become
+one regex per rule, and every item's override is resolved once and cached, so
+evaluating a row is a table lookup plus the same arithmetic as before.
+"""
+
+from bisect import bisect_right
+import random
+import re
+from lazy_imports import lazy_import
+
+from item_classification import CATEGORY_NAMES
+
+yaml = lazy_import('yaml')
+np = lazy_import('numpy')
+
+RULES_FILE = "market_rules.yaml"
+
+# Built-in rules (the market shape used before rules were configurable)
+# market_rules.yaml is merged over these: nested settings key by key, lists (tiers, overrides) replaced whole
+DEFAULT_MARKET_RULES = {
+    'base_orders': {'sell': 1000, 'buy': 10000},
+    # [upper price bound, multiplier], checked in order; null = no upper bound
+    'price_tiers': [[100, 1.0], [1000, 0.8], [10000, 0.6], [100000, 0.4], [None, 0.2]],
+    # Longer recipes are rarer: max(min, 1 / (1 + time / time_scale))
+    'time_factor': {'time_scale': 1000, 'min': 0.1},
+    # More inputs are rarer: max(min, 1 / inputs)
+    'complexity_factor': {'min': 0.1},
+    # Deterministic per-planet factor on order counts
+    'planet_factor': {'min': 0.5, 'max': 1.5},
+    # First matching override wins; match = name substrings, category = item categories
+    'overrides': [
+        {'match': ['WarpBeacon'], 'sell': 0.01, 'buy': 0.1, 'min_sell': 1, 'min_buy': 10, 'recipe_factors': False},
+        {'match': ['WarpDrive', 'WarpCell'], 'sell': 0.05, 'buy': 0.3, 'min_sell': 5, 'min_buy': 50,
+         'recipe_factors': False},
+        {'match': ['CoreUnit'], 'sell': 0.1, 'buy': 0.5, 'min_sell': 10, 'min_buy': 100, 'recipe_factors': False}
+    ],
+    'default': {'sell': 1.0, 'buy': 1.0, 'min_sell': 10, 'min_buy': 100, 'recipe_factors': True},
+    # Sell (ask) and buy (bid) prices relative to the item price
+    'spread': {'sell': 1.1, 'buy': 0.9},
+    'max_orders': 200000000
+}
+
+_compiled_rules = {}  # filename -> compiled rules
+
+def merge_rules(base, overrides):
+    """Nested dicts merged key by key; any other value (lists included) replaces the base value"""
+    merged = dict(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            value = merge_rules(merged[key], value)
+        merged[key] = value
+    return merged
+
+def load_rules_file(filename=RULES_FILE):
+    """Rules from market_rules.yaml merged over DEFAULT_MARKET_RULES
+
+    Nested settings merge key by key, so overriding spread: {sell: 1.2} keeps
+    the default buy spread.
+    """
+    try:
+        with open(filename, 'r') as f:
+            return merge_rules(DEFAULT_MARKET_RULES, yaml.safe_load(f) or {})
+    except FileNotFoundError:
+        return dict(DEFAULT_MARKET_RULES)
+
+def compile_profile(rule, base_sell, base_buy):
+    """(sell base, buy base, min sell, min buy, use recipe factors) for one rule"""
+    # base * multiplier first, in the same order the inline formulas used
+    return (base_sell * rule.get('sell', 1.0), base_buy * rule.get('buy', 1.0),
+            rule.get('min_sell', 0), rule.get('min_buy', 0), bool(rule.get('recipe_factors', True)))
+
+def compile_rules(rules):
+    """Compile a rules dict into lookup tables for order_counts"""
+    base_sell = rules['base_orders']['sell']
+    base_buy = rules['base_orders']['buy']
+
+    overrides = []
+    for number, rule in enumerate(rules.get('overrides') or [], 1):
+        names = rule.get('match') or []
+        if isinstance(names, str):
+            names = [names]
+        pattern = re.compile('|'.join(re.escape(name) for name in names)) if names else None
+        categories = rule.get('category') or []
+        if isinstance(categories, str):
+            categories = [categories]
+        unknown = [name for name in categories if name not in CATEGORY_NAMES]
+        if unknown:
+            raise ValueError(f"market rule override {number} ({rule}): unknown categories {', '.join(unknown)}; "
+                             f"expected one of {', '.join(CATEGORY_NAMES)}")
+        category_ids = {CATEGORY_NAMES.index(name) for name in categories}
+        overrides.append((pattern, category_ids, compile_profile(rule, base_sell, base_buy)))
+
+    tiers = rules['price_tiers']
+    return {
+        'tier_bounds': [bound for bound, _ in tiers if bound is not None],
+        'tier_factors': [factor for _, factor in tiers],
+        'time_scale': rules['time_factor']['time_scale'],
+        'min_time_factor': rules['time_factor']['min'],
+        'min_complexity_factor': rules['complexity_factor']['min'],
+        'planet_range': (rules['planet_factor']['min'], rules['planet_factor']['max']),
+        'overrides': overrides,
+        'default': compile_profile(rules['default'], base_sell, base_buy),
+        'sell_spread': rules['spread']['sell'],
+        'buy_spread': rules['spread']['buy'],
+        'max_orders': rules['max_orders'],
+        'profiles': {},        # (item, category) -> profile
+        'planet_factors': {}   # planet id -> factor
+    }
+
+def load_market_rules(filename=RULES_FILE):
+    """Compiled rules for a rules file, compiled once per process"""
+    compiled = _compiled_rules.get(filename)
+    if compiled is None:
+        compiled = compile_rules(load_rules_file(filename))
+        _compiled_rules[filename] = compiled
+    return compiled
+
+def item_profile(compiled, item, category=None):
+    """Resolved override profile for an item (cached)"""
+    key = (item, category)
+    profile = compiled['profiles'].get(key)
+    if profile is None:
+        profile = compiled['default']
+        for pattern, category_ids, rule_profile in compiled['overrides']:
+            if (pattern is not None and pattern.search(item)) or category in category_ids:
+                profile = rule_profile
+                break
+        compiled['profiles'][key] = profile
+    return profile
+
+def planet_factor(compiled, planet_id):
+    """Deterministic order-count factor for a planet (1.0 without a planet)"""
+    if not planet_id:
+        return 1.0
+    factor = compiled['planet_factors'].get(planet_id)
+    if factor is None:
+        random.seed(hash(str(planet_id)) % 1000)
+        factor = random.uniform(*compiled['planet_range'])
+        compiled['planet_factors'][planet_id] = factor
+    return factor
+
+def order_counts(compiled, item, price, recipe_time=0, recipe_complexity=1, factor=1.0, category=None):
+    """(sell orders, buy orders) for one market row
+
+    factor is the planet factor (see planet_factor); category an optional
+    item category id for category overrides.
+    """
+    sell_base, buy_base, min_sell, min_buy, recipe_factors = item_profile(compiled, item, category)
+    tier = compiled['tier_factors'][bisect_right(compiled['tier_bounds'], price)]
+
+    if recipe_factors:
+        time_factor = max(compiled['min_time_factor'], 1.0 / (1.0 + recipe_time / compiled['time_scale']))
+        complexity_factor = max(compiled['min_complexity_factor'], 1.0 / recipe_complexity)
+        sell_orders = max(min_sell, int(sell_base * tier * time_factor * complexity_factor * factor))
+        buy_orders = max(min_buy, int(buy_base * tier * time_factor * complexity_factor * factor))
+    else:
+        sell_orders = max(min_sell, int(sell_base * tier * factor))
+        buy_orders = max(min_buy, int(buy_base * tier * factor))
+
+    max_orders = compiled['max_orders']
+    return min(sell_orders, max_orders), min(buy_orders, max_orders)
+
+def profile_arrays(compiled, items, categories=None, recipe_info=None):
+    """Per-item arrays for order_counts_array, resolved once per catalog
+
+    recipe_info maps item -> (recipe time, recipe complexity); the recipe
+    factors are evaluated here with the scalar formulas, so the vector pass
+    gives exactly the same counts as order_counts.
+    """
+    categories = categories or {}
+    recipe_info = recipe_info or {}
+    count = len(items)
+    sell_base = np.empty(count)
+    buy_base = np.empty(count)
+    min_sell = np.empty(count, dtype=np.int64)
+    min_buy = np.empty(count, dtype=np.int64)
+    use_recipe = np.empty(count, dtype=bool)
+    time_factor = np.ones(count)
+    complexity_factor = np.ones(count)
+
+    for i, item in enumerate(items):
+        profile = item_profile(compiled, item, categories.get(item))
+        sell_base[i], buy_base[i], min_sell[i], min_buy[i], use_recipe[i] = profile
+        if profile[4]:
+            recipe_time, recipe_complexity = recipe_info.get(item, (0, 1))
+            time_factor[i] = max(compiled['min_time_factor'], 1.0 / (1.0 + recipe_time / compiled['time_scale']))
+            complexity_factor[i] = max(compiled['min_complexity_factor'], 1.0 / recipe_complexity)
+
+    return {'sell_base': sell_base, 'buy_base': buy_base, 'min_sell': min_sell, 'min_buy': min_buy,
+            'use_recipe': use_recipe, 'time_factor': time_factor, 'complexity_factor': complexity_factor}
+
+def order_counts_array(compiled, profiles, prices, factor=1.0, index=None):
+    """(sell orders, buy orders) int64 arrays for many rows at once
+
+    profiles comes from profile_arrays; index optionally selects the items
+    that prices belong to. Same arithmetic, in the same order, as order_counts.
+    """
+    if index is not None:
+        profiles = {name: values[index] for name, values in profiles.items()}
+    tier_factors = np.asarray(compiled['tier_factors'])
+    tier = tier_factors[np.searchsorted(compiled['tier_bounds'], prices, side='right')]
+    use_recipe = profiles['use_recipe']
+    max_orders = compiled['max_orders']
+
+    counts = []
+    for base, minimum in ((profiles['sell_base'], profiles['min_sell']), (profiles['buy_base'], profiles['min_buy'])):
+        scaled = base * tier
+        with_recipe = scaled * profiles['time_factor'] * profiles['complexity_factor']
+        scaled = np.where(use_recipe, with_recipe, scaled) * factor
+        counts.append(np.minimum(np.maximum(minimum, scaled.astype(np.int64)), max_orders))
+    return counts[0], counts[1]
+
+def calculate_order_counts(item, calculated_price, recipe_time=0, recipe_complexity=1, planet_id=None):
+    """Order counts for one row under the rules in market_rules.yaml"""
+    compiled = load_market_rules()
+    return order_counts(compiled, item, calculated_price, recipe_time, recipe_complexity,
+                        planet_factor(compiled, planet_id))
+
+def spread_prices(compiled, price):
+    """(sell price, buy price) around an item price"""
+    return price * compiled['sell_spread'], price * compiled['buy_spread']
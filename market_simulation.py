@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Tick-based supply/demand simulation over generated planet markets
+
+Traders repeatedly buy each item on the cheapest selling planet and sell it on
+the highest buying planet while the margin beats min_margin. Trades drain order
+depth and move prices; between trades depth regenerates and prices revert to
+their generated values. The run shows whether routes converge to an equilibrium
+margin or get drained.
+
+Trade execution is vectorized with NumPy: every tick processes all items at once.
+
+Usage:
+    python market_simulation.py [--ticks 10000] [--market-dir market_orders_generated]
+    python market_simulation.py --benchmark
+"""
+
+import argparse
+import time
+
+from market_snapshot import DEFAULT_MARKET_DIR, load_market_snapshot, index_quotes_by_item
+from market_writer import write_csv_atomic
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+
+# Simulation settings
+SIMULATION = {
+    'ticks': 1000,
+    'trader_budget': 100000,  # Currency spent per item per tick (at least one unit)
+    'min_margin': 0.02,       # Travel and fees: routes below this margin are ignored
+    'price_impact': 0.5,      # Price move when a trade takes the full initial depth
+    'price_reversion': 0.01,  # Fraction of the gap to the generated price closed per tick
+    'depth_regen': 0.005      # Fraction of missing order depth restored per tick
+}
+
+def build_quote_arrays(snapshot, min_margin=None):
+    """Pack every tradable item's quotes into flat, per-item segmented arrays
+
+    Prices only ever revert towards their generated values, so an ask can never
+    trade below its generated price nor a bid above it. Quotes that could not
+    form a route at generation time are therefore dropped up front, along with
+    items that have no route at all.
+    """
+    if min_margin is None:
+        min_margin = SIMULATION['min_margin']
+
+    by_item = {}
+    for item, quotes in sorted(index_quotes_by_item(snapshot).items()):
+        if not quotes['sell'] or not quotes['buy']:
+            continue
+        best_bid = quotes['buy'][0][1]
+        best_ask = quotes['sell'][0][1]
+        # Quotes are sorted best first, so the usable ones form a prefix
+        sells = [q for q in quotes['sell'] if q[1] * (1.0 + min_margin) < best_bid]
+        buys = [q for q in quotes['buy'] if q[1] > best_ask * (1.0 + min_margin)]
+        if sells and buys:
+            by_item[item] = {'sell': sells, 'buy': buys}
+
+    items = list(by_item.keys())
+    planets = list(snapshot.keys())
+    planet_index = {planet_id: i for i, planet_id in enumerate(planets)}
+
+    # Ragged layout: each item's quotes are one contiguous segment of flat arrays
+    arrays = {'items': items, 'planets': planets}
+    for side, prefix in (('sell', 'ask'), ('buy', 'bid')):
+        prices, orders, planet_ids, item_ids, starts = [], [], [], [], []
+        for row, item in enumerate(items):
+            starts.append(len(prices))
+            for planet_id, price, count in by_item[item][side]:
+                prices.append(price)
+                orders.append(count)
+                planet_ids.append(planet_index[planet_id])
+                item_ids.append(row)
+        arrays[f'{prefix}_price'] = np.array(prices, dtype=float)
+        arrays[f'{prefix}_qty'] = np.array(orders, dtype=float)
+        arrays[f'{prefix}_planet'] = np.array(planet_ids, dtype=np.int32)
+        arrays[f'{prefix}_item'] = np.array(item_ids, dtype=np.int32)
+        arrays[f'{prefix}_start'] = np.array(starts, dtype=np.int64)
+    return arrays
+
+def segment_argbest(values, starts, segment_ids, best):
+    """Flat index of the minimum (best=np.minimum) or maximum (np.maximum) of every segment"""
+    segment_best = best.reduceat(values, starts)
+    candidates = np.flatnonzero(values == segment_best[segment_ids])
+    # Ties: keep the first candidate of each segment
+    _, first = np.unique(segment_ids[candidates], return_index=True)
+    return candidates[first], segment_best
+
+def best_quotes(arrays, ask_price, ask_qty, bid_price, bid_qty):
+    """Flat index and price of the cheapest available ask and highest available bid per item"""
+    effective_ask = np.where(ask_qty >= 1, ask_price, np.inf)
+    effective_bid = np.where(bid_qty >= 1, bid_price, 0.0)
+    ask_index, best_ask = segment_argbest(effective_ask, arrays['ask_start'], arrays['ask_item'], np.minimum)
+    bid_index, best_bid = segment_argbest(effective_bid, arrays['bid_start'], arrays['bid_item'], np.maximum)
+    return ask_index, bid_index, best_ask, best_bid
+
+def run_simulation(arrays, ticks=None, settings=None, track=None):
+    """Simulate `ticks` rounds of trading
+
+    Returns a dict with per-tick series (routes_open, units, profit, mean_margin),
+    per-item totals and final margins, plus a (ticks x tracked items) margin
+    series for the item names in `track`.
+    """
+    settings = dict(SIMULATION, **(settings or {}))
+    if ticks is None:
+        ticks = settings['ticks']
+
+    ask_price0, ask_qty0 = arrays['ask_price'], arrays['ask_qty']
+    bid_price0, bid_qty0 = arrays['bid_price'], arrays['bid_qty']
+    ask_price, ask_qty = ask_price0.copy(), ask_qty0.copy()
+    bid_price, bid_qty = bid_price0.copy(), bid_qty0.copy()
+
+    ask_depth = np.maximum(ask_qty0, 1.0)
+    bid_depth = np.maximum(bid_qty0, 1.0)
+
+    n_items = len(arrays['items'])
+    item_units = np.zeros(n_items)
+    item_profit = np.zeros(n_items)
+
+    series = {
+        'routes_open': np.zeros(ticks, dtype=np.int32),
+        'units': np.zeros(ticks),
+        'profit': np.zeros(ticks),
+        'mean_margin': np.zeros(ticks)
+    }
+
+    track_rows = [arrays['items'].index(item) for item in (track or []) if item in arrays['items']]
+    tracked = np.zeros((ticks, len(track_rows)))
+
+    _, _, start_ask, start_bid = best_quotes(arrays, ask_price, ask_qty, bid_price, bid_qty)
+    initial_margin = start_bid / start_ask - 1.0
+
+    revert = settings['price_reversion']
+    regen = settings['depth_regen']
+    impact = settings['price_impact']
+    min_margin = settings['min_margin']
+    budget = settings['trader_budget']
+
+    for tick in range(ticks):
+        # Recovery towards the generated market
+        ask_price += revert * (ask_price0 - ask_price)
+        bid_price += revert * (bid_price0 - bid_price)
+        ask_qty += regen * (ask_qty0 - ask_qty)
+        bid_qty += regen * (bid_qty0 - bid_qty)
+
+        ask_index, bid_index, best_ask, best_bid = best_quotes(arrays, ask_price, ask_qty, bid_price, bid_qty)
+        margin = best_bid / best_ask - 1.0
+        open_routes = margin > min_margin
+
+        # Units traded per item this tick
+        affordable = np.maximum(1.0, np.floor(budget / np.where(np.isfinite(best_ask), best_ask, np.inf)))
+        units = np.minimum(affordable, np.floor(np.minimum(ask_qty[ask_index], bid_qty[bid_index])))
+        units = np.where(open_routes, units, 0.0)
+
+        # Execute: drain depth and push prices against the trader
+        ask_qty[ask_index] -= units
+        bid_qty[bid_index] -= units
+        ask_price[ask_index] *= 1.0 + impact * units / ask_depth[ask_index]
+        bid_price[bid_index] *= 1.0 - impact * units / bid_depth[bid_index]
+
+        profit = units * np.where(open_routes, best_bid - best_ask, 0.0)
+        item_units += units
+        item_profit += profit
+
+        series['routes_open'][tick] = open_routes.sum()
+        series['units'][tick] = units.sum()
+        series['profit'][tick] = profit.sum()
+        finite_margin = margin[np.isfinite(margin)]
+        series['mean_margin'][tick] = finite_margin.mean() if finite_margin.size else 0.0
+        if track_rows:
+            tracked[tick] = margin[track_rows]
+
+    _, _, final_ask, final_bid = best_quotes(arrays, ask_price, ask_qty, bid_price, bid_qty)
+    drained = ~np.isfinite(final_ask) | (final_bid <= 0)
+    final_margin = np.where(drained, np.nan, final_bid / np.where(drained, 1.0, final_ask) - 1.0)
+
+    return {
+        'ticks': ticks,
+        'settings': settings,
+        'series': series,
+        'items': arrays['items'],
+        'initial_margin': initial_margin,
+        'final_margin': final_margin,
+        'item_units': item_units,
+        'item_profit': item_profit,
+        'tracked_items': [arrays['items'][row] for row in track_rows],
+        'tracked_margin': tracked
+    }
+
+def classify_outcome(initial_margin, final_margin, min_margin):
+    """Describe what happened to an item's best route"""
+    if not np.isfinite(final_margin):
+        return 'drained'
+    if final_margin <= min_margin * 1.5:
+        return 'converged'
+    return 'open'
+
+def write_results(result, timeseries_file="simulation_timeseries.csv", items_file="simulation_items.csv"):
+    """Write the per-tick series and per-item summary as CSV"""
+    series = result['series']
+    header = ['tick', 'routes_open', 'units', 'profit', 'mean_margin_pct']
+    header += [f"margin_pct_{item}" for item in result['tracked_items']]
+    rows = [header]
+    for tick in range(result['ticks']):
+        row = [
+            tick,
+            int(series['routes_open'][tick]),
+            int(series['units'][tick]),
+            f"{series['profit'][tick]:.2f}",
+            f"{series['mean_margin'][tick] * 100:.3f}"
+        ]
+        row += [f"{value * 100:.3f}" for value in result['tracked_margin'][tick]]
+        rows.append(row)
+    write_csv_atomic(timeseries_file, rows)
+
+    min_margin = result['settings']['min_margin']
+    rows = [['item', 'initial_margin_pct', 'final_margin_pct', 'units_traded', 'profit', 'outcome']]
+    for i, item in enumerate(result['items']):
+        initial, final = result['initial_margin'][i], result['final_margin'][i]
+        rows.append([
+            item,
+            f"{initial * 100:.3f}",
+            f"{final * 100:.3f}" if np.isfinite(final) else "",
+            int(result['item_units'][i]),
+            f"{result['item_profit'][i]:.2f}",
+            classify_outcome(initial, final, min_margin)
+        ])
+    write_csv_atomic(items_file, rows)
+
+def benchmark(arrays, ticks=10000):
+    """Time a full simulation run and return ticks per second"""
+    start = time.perf_counter()
+    run_simulation(arrays, ticks)
+    elapsed = time.perf_counter() - start
+    return ticks / elapsed, elapsed
+
+def non_negative_int(text):
+    """argparse type for tick counts: 0 is allowed, negative counts are not"""
+    value = int(text)
+    if value < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or more, got {text}")
+    return value
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate traders over generated markets")
+    parser.add_argument('--ticks', type=non_negative_int, default=SIMULATION['ticks'])
+    parser.add_argument('--market-dir', default=DEFAULT_MARKET_DIR)
+    parser.add_argument('--track', nargs='*', default=[], help="items to record a margin series for")
+    parser.add_argument('--benchmark', action='store_true', help="time 10k ticks and exit")
+    args = parser.parse_args()
+
+    snapshot = load_market_snapshot(args.market_dir)
+    if not snapshot:
+        print(f"❌ No market files found in {args.market_dir}. Run generate_all_markets.py first.")
+        return
+
+    arrays = build_quote_arrays(snapshot)
+    print(f"Loaded {len(snapshot)} planets, {len(arrays['items'])} items with trade routes")
+
+    if args.benchmark:
+        rate, elapsed = benchmark(arrays)
+        print(f"10,000 ticks in {elapsed:.2f}s ({rate:,.0f} ticks/s)")
+        return
+
+    start = time.perf_counter()
+    result = run_simulation(arrays, args.ticks, track=args.track)
+    elapsed = time.perf_counter() - start
+    write_results(result)
+
+    outcomes = {}
+    for i in range(len(result['items'])):
+        outcome = classify_outcome(result['initial_margin'][i], result['final_margin'][i],
+                                   result['settings']['min_margin'])
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    series = result['series']
+    print(f"Simulated {args.ticks} ticks in {elapsed:.2f}s")
+    if args.ticks:
+        print(f"   Open routes: {series['routes_open'][0]} → {series['routes_open'][-1]}")
+        print(f"   Mean margin: {series['mean_margin'][0] * 100:.2f}% → {series['mean_margin'][-1] * 100:.2f}%")
+    print(f"   Total profit: {series['profit'].sum():,.0f}")
+    print(f"   Outcomes: {', '.join(f'{k}: {v}' for k, v in sorted(outcomes.items()))}")
+    print(f"   Time series saved to: simulation_timeseries.csv")
+    print(f"   Item summary saved to: simulation_items.csv")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Load generated planet market CSVs into memory
+
+A snapshot maps planet id -> item -> (sell_orders, sell_price, buy_orders, buy_price).
+Order-book files contain several rows per item; only the first (top-of-book)
+row is kept.
+"""
+
+import csv
+import os
+
+DEFAULT_MARKET_DIR = "market_orders_generated"
+
+def load_planet_market(filename):
+    """Parse one planet CSV into {item: (sell_orders, sell_price, buy_orders, buy_price)}"""
+    quotes = {}
+    with open(filename, 'r', newline='') as f:
+        for row in csv.reader(f):
+            if len(row) < 5 or row[0] in quotes:
+                continue
+            try:
+                quotes[row[0]] = (
+                    int(row[1]) if row[1] else 0,
+                    float(row[2]) if row[2] else 0.0,
+                    int(row[3]) if row[3] else 0,
+                    float(row[4]) if row[4] else 0.0
+                )
+            except ValueError:
+                continue
+    return quotes
+
+def load_market_snapshot(market_dir=DEFAULT_MARKET_DIR):
+    """Load every planet CSV in a directory, keyed by planet id (sorted)"""
+    snapshot = {}
+    if not os.path.exists(market_dir):
+        return snapshot
+    for filename in sorted(os.listdir(market_dir)):
+        if filename.endswith('.csv'):
+            planet_id = os.path.splitext(filename)[0]
+            snapshot[planet_id] = load_planet_market(os.path.join(market_dir, filename))
+    return snapshot
+
+def index_quotes_by_item(snapshot):
+    """Regroup a snapshot per item
+
+    Returns {item: {'sell': [(planet, price, orders)], 'buy': [(planet, price, orders)]}}
+    with sell quotes sorted cheapest first and buy quotes highest first.
+    """
+    by_item = {}
+    for planet_id, quotes in snapshot.items():
+        for item, (sell_orders, sell_price, buy_orders, buy_price) in quotes.items():
+            entry = by_item.get(item)
+            if entry is None:
+                entry = by_item[item] = {'sell': [], 'buy': []}
+            if sell_orders > 0 and sell_price > 0:
+                entry['sell'].append((planet_id, sell_price, sell_orders))
+            if buy_orders > 0 and buy_price > 0:
+                entry['buy'].append((planet_id, buy_price, buy_orders))
+
+    for entry in by_item.values():
+        entry['sell'].sort(key=lambda quote: quote[1])
+        entry['buy'].sort(key=lambda quote: quote[1], reverse=True)
+    return by_item
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Persisted market strategy: which planets sell and buy every item
+
+generate_all_markets.py saves the strategy it used as a compact JSON artifact, so
+reports can answer "where is this item traded" in one pass over items instead of
+rescanning every planet CSV. Planets are stored once and referenced by index.
+
+Format:
+    {"market_dir": ..., "planets": [...], "categories": [...],
+     "items": {item: [category_id, [seller planet indexes], [buyer planet indexes]]}}
+"""
+
+import json
+import os
+
+from item_classification import CATEGORY_NAMES
+from market_writer import write_text_atomic
+
+STRATEGY_FILE = "market_strategy.json"
+
+def strategy_artifact(items, planet_ids, market_dir):
+    """Artifact from {item: (category id, seller planet ids, buyer planet ids)}"""
+    planet_index = {planet_id: i for i, planet_id in enumerate(planet_ids)}
+    return {
+        'market_dir': market_dir,
+        'planets': list(planet_ids),
+        'categories': list(CATEGORY_NAMES),
+        'items': {
+            item: [category, [planet_index[p] for p in sellers], [planet_index[p] for p in buyers]]
+            for item, (category, sellers, buyers) in items.items()
+        }
+    }
+
+def save_strategy(artifact, filename=STRATEGY_FILE):
+    """Write the artifact atomically"""
+    write_text_atomic(filename, json.dumps(artifact, separators=(',', ':')))
+
+def load_strategy(market_dir, filename=STRATEGY_FILE):
+    """Load the artifact for market_dir, or None if missing, for another directory, or stale
+
+    Stale means a planet CSV was modified after the artifact was written
+    (for example, edited by hand or by update_multi_market_prices.py).
+    """
+    try:
+        written = os.path.getmtime(filename)
+        with open(filename, 'r') as f:
+            artifact = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if os.path.normpath(artifact.get('market_dir', '')) != os.path.normpath(market_dir):
+        return None
+    for planet_id in artifact['planets']:
+        path = os.path.join(market_dir, f"{planet_id}.csv")
+        try:
+            if os.path.getmtime(path) > written:
+                return None
+        except OSError:
+            return None
+    return artifact
+
+def iter_item_planets(artifact):
+    """(item, category name, seller planet ids, buyer planet ids) for every item"""
+    planets = artifact['planets']
+    categories = artifact['categories']
+    for item, (category, sellers, buyers) in artifact['items'].items():
+        yield item, categories[category], [planets[i] for i in sellers], [planets[i] for i in buyers]
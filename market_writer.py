@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Market CSV output: bulk row formatting and atomic file replacement
+
+Rows are written to a temporary file in the target directory and renamed over
+the live file, so readers never see a half-written planet CSV.
+"""
+
+import csv
+import os
+import tempfile
+import time
+
+
+FSYNC_OUTPUT = False  # fsync every file before it replaces the live one
+BATCH_SIZE = 50000    # Rows per writerows call when streaming from an iterator
+
+def format_price(price):
+    """Format a price the way market CSVs expect"""
+    return f"{price:.2f}"
+
+def format_market_row(item, sell_orders, sell_price, buy_orders, buy_price):
+    """Build one market CSV row with integer counts and pre-formatted prices"""
+    return [item, int(sell_orders), format_price(sell_price), int(buy_orders), format_price(buy_price)]
+
+def output_mode(path):
+    """Mode for a file replacing `path`: the mode it has now, or 0666 minus the umask for a new file"""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+def temp_file_for(path, directory):
+    """(fd, temp path) next to `path`, with the mode a plain open() would have given it
+
+    mkstemp creates 0600 files, which other users and services can't read
+    once the temporary file is renamed over the output.
+    """
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        os.chmod(temp_path, output_mode(path))
+    except BaseException:
+        os.close(fd)
+        os.remove(temp_path)
+        raise
+    return fd, temp_path
+
+def iter_batches(rows, batch_size):
+    """Split an iterable of rows into lists of at most batch_size rows"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def write_csv_atomic(path, rows, fsync=None, batch_size=None):
+    """Write rows and atomically replace `path`
+
+    A list is written with one writerows call. Any other iterable is streamed
+    in batches of batch_size rows, so large outputs never sit in memory;
+    with fsync enabled every batch is flushed to disk.
+    Returns the number of rows written.
+    """
+    if fsync is None:
+        fsync = FSYNC_OUTPUT
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = temp_file_for(path, directory)
+    try:
+        count = 0
+        with os.fdopen(fd, 'w', newline='') as f:
+            writer = csv.writer(f)
+            batches = [rows] if isinstance(rows, list) else iter_batches(rows, batch_size or BATCH_SIZE)
+            for batch in batches:
+                writer.writerows(batch)
+                count += len(batch)
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+    if fsync and hasattr(os, 'O_DIRECTORY'):
+        # Make the rename itself durable
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    return count
+
+def write_text_atomic(path, text):
+    """Write a text file and atomically replace `path`"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = temp_file_for(path, directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+def write_bytes_atomic(path, data):
+    """Write a binary file and atomically replace `path`"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = temp_file_for(path, directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+class WriteStats:
+    """Accumulates rows and time spent writing market files"""
+
+    def __init__(self):
+        self.files = 0
+        self.rows = 0
+        self.seconds = 0.0
+
+    def write(self, path, rows, fsync=None, batch_size=None):
+        """Write one file atomically and record its throughput"""
+        start = time.perf_counter()
+        count = write_csv_atomic(path, rows, fsync, batch_size)
+        self.seconds += time.perf_counter() - start
+        self.files += 1
+        self.rows += count
+        return count
+
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self):
+        return (f"Wrote {self.rows:,} rows to {self.files} files in {self.seconds:.3f}s "
+                f"({self.rows_per_second():,.0f} rows/s)")
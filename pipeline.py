@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Market pipeline: prices -> item ids -> markets -> trading report -> rare items report
+
+Runs the production chain of calculate_prices.py, add_item_ids.py,
+generate_all_markets.py, generate_trading_report.py and analyze_rare_items.py
+in one process. Stages hand their results to the next one in memory (item cache,
+price table, market snapshot, strategy), so YAML is parsed once and no stage
+re-reads another stage's CSV output. Files are written only as final artifacts.
+
+A stage is skipped when the SHA-256 of its inputs (input files, upstream
+artifacts, settings and its own code) matches the last run recorded in
+pipeline_state.json and its artifacts are unchanged on disk.
+
+Usage:
+    python pipeline.py                    # run what changed
+    python pipeline.py --force markets    # rerun a stage even if nothing changed
+    python pipeline.py --item-ids         # include the database item id stage
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+from calculate_prices import (RECORD_HISTORY, load_cache_from_file, load_industry_settings, load_manual_prices,
+                              load_recipes, identify_independent_items, price_catalog, save_cache_to_file,
+                              save_independent_items)
+from market_writer import write_text_atomic
+from price_history import file_hash
+from lazy_imports import lazy_import
+
+yaml = lazy_import('yaml')
+
+STATE_FILE = "pipeline_state.json"
+MARKET_DIR = "market_orders_generated"
+
+# Stages in run order
+# inputs: files read, code: modules whose changes invalidate the stage,
+# after: upstream stages whose artifacts are inputs, outputs: artifacts written
+STAGES = [
+    {'name': 'prices',
+     'inputs': ['ore_prices.yaml', 'recipes.yaml', 'industries.yaml'],
+     'code': ['calculate_prices.py', 'recipe_model.py'],
+     'after': [],
+     'outputs': ['item_cache.yaml', 'item_cache.idx', 'independent_items.yaml']},
+    {'name': 'item_ids',
+     'inputs': [],
+     'code': ['add_item_ids.py'],
+     'after': ['prices'],
+     'outputs': ['item_cache.yaml', 'item_cache.idx']},
+    {'name': 'markets',
+     'inputs': ['ore_prices.yaml', 'recipes.yaml', 'market_rules.yaml', 'planet_distances.yaml'],
+     'code': ['generate_all_markets.py', 'market_rules.py', 'rare_placement.py', 'item_classification.py',
+              'market_strategy.py', 'market_writer.py', 'recipe_model.py', 'calculate_prices.py',
+              'trade_route_optimizer.py'],
+     'after': ['prices'],
+     'outputs': [MARKET_DIR, 'planet_ids.txt', 'market_strategy.json']},
+    {'name': 'trading_report',
+     'inputs': [],
+     'code': ['generate_trading_report.py'],
+     'after': ['prices', 'markets'],
+     'outputs': ['trading_report.md']},
+    {'name': 'rare_report',
+     'inputs': [],
+     'code': ['analyze_rare_items.py', 'item_classification.py'],
+     'after': ['markets'],
+     'outputs': ['rare_items_report.md']}
+]
+
+def path_hash(path):
+    """SHA-256 of a file, or of every CSV in a directory (name and bytes); None if missing"""
+    if not os.path.isdir(path):
+        return file_hash(path)
+    digest = hashlib.sha256()
+    for filename in sorted(os.listdir(path)):
+        if filename.endswith('.csv'):
+            digest.update(filename.encode())
+            digest.update(file_hash(os.path.join(path, filename)).encode())
+    return digest.hexdigest()
+
+def output_hashes(stage):
+    """{artifact path: hash} for a stage's outputs as they are on disk now"""
+    return {path: path_hash(path) for path in stage['outputs']}
+
+def stage_key(stage, settings, state):
+    """SHA-256 over everything a stage's result depends on"""
+    digest = hashlib.sha256()
+    digest.update(stage['name'].encode())
+    for path in stage['inputs'] + stage['code']:
+        digest.update(f"{path}={file_hash(path)}\n".encode())
+    for upstream in stage['after']:
+        for path, value in sorted(state.get(upstream, {}).get('outputs', {}).items()):
+            digest.update(f"{upstream}:{path}={value}\n".encode())
+    digest.update(json.dumps(settings.get(stage['name']), sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+def load_state(filename=STATE_FILE):
+    try:
+        with open(filename, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state(state, filename=STATE_FILE):
+    write_text_atomic(filename, json.dumps(state, indent=1, sort_keys=True))
+
+class Intermediates(dict):
+    """In-memory results shared between stages
+
+    A value that no stage produced in this run (because that stage was
+    skipped) is loaded from its artifact the first time it is needed.
+    """
+
+    def __missing__(self, name):
+        value = self[name] = LOADERS[name](self)
+        return value
+
+def load_recipe_list(values):
+    """Validated recipes; any schema problem fails the stage that needed them"""
+    errors = []
+    recipes = list(load_recipes("recipes.yaml", errors))
+    if errors:
+        raise RuntimeError(f"{len(errors)} problems in recipes.yaml:\n  " + "\n  ".join(errors))
+    return recipes
+
+def load_ore_prices(values):
+    with open("ore_prices.yaml", "r") as f:
+        return yaml.safe_load(f)
+
+def load_price_table(values):
+    from generate_all_markets import prices_from_cache
+    return prices_from_cache(values['cache'], values['ore_prices'])
+
+def load_planet_ids(values):
+    from generate_all_markets import get_planet_ids
+    return get_planet_ids()
+
+def load_snapshot(values):
+    from market_snapshot import load_market_snapshot
+    return load_market_snapshot(MARKET_DIR)
+
+def load_artifact(values):
+    from market_strategy import load_strategy
+    return load_strategy(MARKET_DIR)
+
+LOADERS = {
+    'recipes': load_recipe_list,
+    'ore_prices': load_ore_prices,
+    'cache': lambda values: load_cache_from_file(),
+    'prices': load_price_table,
+    'planet_ids': load_planet_ids,
+    'snapshot': load_snapshot,
+    'artifact': load_artifact
+}
+
+def run_prices(values):
+    """calculate_prices.py: price every recipe output into the item cache"""
+    recipes = values['recipes']
+    ore_prices = values['ore_prices']
+    industry_settings = load_industry_settings()
+
+    cache = load_cache_from_file()
+    cache.update(load_manual_prices())
+    choices = {}
+    calculated_prices, failed_items = price_catalog(recipes, ore_prices, cache, industry_settings, choices)
+    save_cache_to_file(cache)
+
+    if RECORD_HISTORY:
+        from price_history import HISTORY_FILE, record_run
+        run_id = record_run(cache, ore_prices, choices)
+        print(f"   Recorded run {run_id} in {HISTORY_FILE}")
+
+    independent_items = identify_independent_items(recipes, ore_prices)
+    if independent_items:
+        save_independent_items(independent_items)
+
+    values['cache'] = cache
+    values.pop('prices', None)
+    return f"{len(calculated_prices)} items priced, {len(failed_items)} failed"
+
+def run_item_ids(values):
+    """add_item_ids.py: add database item ids to the item cache"""
+    from add_item_ids import apply_item_ids, fetch_item_ids
+
+    db_items = fetch_item_ids()
+    if not db_items:
+        raise RuntimeError("item ids could not be read from the database")
+    cache = values['cache']
+    matched = apply_item_ids(cache, db_items)
+    save_cache_to_file(cache)
+    return f"{matched} items matched"
+
+def run_markets(values):
+    """generate_all_markets.py: strategy and one market CSV per planet"""
+    from generate_all_markets import generate_markets
+
+    planet_ids = values['planet_ids']
+    if not planet_ids:
+        raise RuntimeError("no planet ids found, check the market_orders directory")
+    result = generate_markets(values['prices'], planet_ids, values['recipes'], MARKET_DIR)
+
+    # Snapshot with the prices as written (2 decimals), as market_snapshot.py would read them back
+    values['snapshot'] = {
+        planet_id: {
+            item: (sell_orders, float(f"{sell_price:.2f}"), buy_orders, float(f"{buy_price:.2f}"))
+            for item, sell_orders, sell_price, buy_orders, buy_price in quotes
+        }
+        for planet_id, quotes in result['quotes'].items()
+    }
+    values['artifact'] = result['artifact']
+    return f"{result['rows']} rows for {len(planet_ids)} planets"
+
+def run_trading_report(values):
+    """generate_trading_report.py on the in-memory market snapshot"""
+    from generate_trading_report import find_opportunities, generate_detailed_report, planet_data_from_snapshot
+
+    planet_data = planet_data_from_snapshot(values['snapshot'])
+    opportunities = find_opportunities(planet_data, values['prices'])
+    generate_detailed_report((opportunities, planet_data, values['prices']))
+    return f"{len(opportunities)} opportunities"
+
+def run_rare_report(values):
+    """analyze_rare_items.py on the in-memory strategy"""
+    from analyze_rare_items import collect_from_csv, collect_from_strategy, write_rare_report
+
+    artifact = values['artifact']
+    if artifact is not None:
+        found, planet_count = collect_from_strategy(artifact)
+    else:
+        found, planet_count = collect_from_csv(MARKET_DIR)
+    write_rare_report(found, planet_count)
+    return f"{sum(len(items) for items in found.values())} rare items"
+
+RUNNERS = {
+    'prices': run_prices,
+    'item_ids': run_item_ids,
+    'markets': run_markets,
+    'trading_report': run_trading_report,
+    'rare_report': run_rare_report
+}
+
+def pipeline_settings():
+    """Module settings that change stage results without changing an input file"""
+    import calculate_prices
+    import generate_all_markets
+    return {
+        'prices': {'time_cost_factor': calculate_prices.TIME_COST_FACTOR},
+        'markets': {
+            'planets': generate_all_markets.get_planet_ids(),
+            'placement': generate_all_markets.RARE_PLACEMENT,
+            'regional_variation': generate_all_markets.REGIONAL_VARIATION
+        }
+    }
+
+def run_pipeline(force=(), item_ids=False, state_file=STATE_FILE):
+    """Run every stage whose inputs changed
+
+    Returns {stage: 'ran' | 'skipped' | 'disabled' | 'failed'}; stages after
+    a failed one are not run. A failed stage's record is dropped from the
+    state, so the next run retries it.
+    """
+    state = load_state(state_file)
+    settings = pipeline_settings()
+    values = Intermediates()
+    force = set(force)
+    status = {}
+
+    for stage in STAGES:
+        name = stage['name']
+        if name == 'item_ids' and not item_ids:
+            status[name] = 'disabled'
+            print(f"⏸️  {name:15} disabled (use --item-ids)")
+            continue
+
+        key = stage_key(stage, settings, state)
+        previous = state.get(name, {})
+        unchanged = (previous.get('key') == key and previous.get('outputs') == output_hashes(stage)
+                     and None not in previous.get('outputs', {}).values())
+        if unchanged and name not in force and 'all' not in force:
+            status[name] = 'skipped'
+            print(f"⏭️  {name:15} skipped (inputs unchanged)")
+            continue
+
+        print(f"▶️  {name:15} running...")
+        start = time.perf_counter()
+        try:
+            summary = RUNNERS[name](values)
+        except Exception as e:
+            status[name] = 'failed'
+            detail = str(e) if isinstance(e, RuntimeError) else f"{type(e).__name__}: {e}"
+            print(f"❌ {name:15} failed: {detail}")
+            state.pop(name, None)
+            save_state(state, state_file)
+            break
+        seconds = time.perf_counter() - start
+        print(f"✅ {name:15} {summary} in {seconds:.2f}s")
+
+        status[name] = 'ran'
+        state[name] = {'key': key, 'seconds': round(seconds, 3), 'outputs': output_hashes(stage)}
+        # A stage that rewrites an earlier stage's artifact keeps that stage current
+        for other in STAGES:
+            if other['name'] in state and other is not stage and set(other['outputs']) & set(stage['outputs']):
+                state[other['name']]['outputs'] = output_hashes(other)
+        save_state(state, state_file)
+
+    return status
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the market pipeline, skipping unchanged stages")
+    parser.add_argument('--force', nargs='+', default=[], metavar='STAGE',
+                        choices=[stage['name'] for stage in STAGES] + ['all'],
+                        help="rerun these stages even if their inputs are unchanged")
+    parser.add_argument('--item-ids', action='store_true', help="add database item ids (needs the game database)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    status = run_pipeline(args.force, args.item_ids)
+    ran = [name for name, result in status.items() if result == 'ran']
+    print(f"\nPipeline finished in {time.perf_counter() - start:.2f}s: "
+          f"{len(ran)} stages ran, {list(status.values()).count('skipped')} skipped")
+    if 'failed' in status.values():
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
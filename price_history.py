@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Append-only price history: every pricing run stored in a local SQLite file
+
+Each run records all item prices, ore prices, a hash of the recipe file and a
+hash of the full price breakdown (every price with the recipe and industry that
+produced it), so two runs with the same hash are known to be identical without
+comparing rows. Prices are keyed by (run, item) and indexed by
+(item, run), so run diffs and item histories are single indexed queries.
+
+Usage:
+    python price_history.py runs
+    python price_history.py diff [OLD_RUN NEW_RUN] [--min-change 0.05]
+    python price_history.py history ITEM
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+
+HISTORY_FILE = "price_history.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    recipes_hash TEXT,
+    ore_hash TEXT,
+    breakdown_hash TEXT,
+    item_count INTEGER
+);
+CREATE TABLE IF NOT EXISTS prices (
+    run_id INTEGER NOT NULL,
+    item TEXT NOT NULL,
+    price REAL,
+    PRIMARY KEY (run_id, item)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS prices_by_item ON prices (item, run_id);
+CREATE TABLE IF NOT EXISTS ore_prices (
+    run_id INTEGER NOT NULL,
+    ore TEXT NOT NULL,
+    price REAL,
+    PRIMARY KEY (run_id, ore)
+) WITHOUT ROWID;
+"""
+
+def open_history(filename=HISTORY_FILE):
+    """Open (and create if needed) the history database"""
+    conn = sqlite3.connect(filename)
+    # WAL + NORMAL sync: one cheap commit per run, readers never block the writer
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def file_hash(filename):
+    """SHA-256 of a file's bytes, or None if it doesn't exist"""
+    digest = hashlib.sha256()
+    try:
+        with open(filename, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+def prices_hash(prices):
+    """Order-independent SHA-256 of an item -> price mapping"""
+    digest = hashlib.sha256()
+    for item, price in sorted(prices.items(), key=lambda kv: str(kv[0])):
+        digest.update(f"{item}={price!r}\n".encode())
+    return digest.hexdigest()
+
+def breakdown_hash(prices, choices=None):
+    """SHA-256 over every item's price and the recipe and industry chosen for it
+
+    choices is the {item: {'recipe', 'industry'}} dict filled by
+    calculate_cost or price_catalog; items without a choice (ores, manual
+    prices) hash their price alone.
+    """
+    choices = choices or {}
+    digest = hashlib.sha256()
+    for item, price in sorted(prices.items(), key=lambda kv: str(kv[0])):
+        choice = choices.get(item) or {}
+        digest.update(f"{item}={price!r} {choice.get('recipe')!r} {choice.get('industry')!r}\n".encode())
+    return digest.hexdigest()
+
+def cache_prices(cache):
+    """item -> price for an item cache, with or without {price, id} entries"""
+    return {item: value.get('price') if isinstance(value, dict) else value for item, value in cache.items()}
+
+def record_run(prices, ore_prices, choices=None, recipes_file="recipes.yaml", filename=HISTORY_FILE):
+    """Append one pricing run and return its run id
+
+    prices may be the item cache as saved (entries can be {price, id} once
+    add_item_ids.py has run); choices feeds the breakdown hash (see
+    breakdown_hash). Everything is written in a single transaction with
+    executemany.
+    """
+    prices = cache_prices(prices)
+    conn = open_history(filename)
+    try:
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO runs (created_at, recipes_hash, ore_hash, breakdown_hash, item_count) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (datetime.now().isoformat(timespec='seconds'), file_hash(recipes_file),
+                 prices_hash(ore_prices), breakdown_hash(prices, choices), len(prices))
+            )
+            run_id = cursor.lastrowid
+            conn.executemany("INSERT INTO prices VALUES (?, ?, ?)",
+                             ((run_id, str(item), price) for item, price in prices.items()))
+            conn.executemany("INSERT INTO ore_prices VALUES (?, ?, ?)",
+                             ((run_id, str(ore), price) for ore, price in ore_prices.items()))
+    finally:
+        conn.close()
+    return run_id
+
+def list_runs(conn):
+    """All runs, oldest first"""
+    rows = conn.execute(
+        "SELECT run_id, created_at, recipes_hash, ore_hash, breakdown_hash, item_count FROM runs ORDER BY run_id"
+    ).fetchall()
+    keys = ('run_id', 'created_at', 'recipes_hash', 'ore_hash', 'breakdown_hash', 'item_count')
+    return [dict(zip(keys, row)) for row in rows]
+
+def latest_runs(conn, count=2):
+    """Ids of the most recent runs, oldest first"""
+    rows = conn.execute("SELECT run_id FROM runs ORDER BY run_id DESC LIMIT ?", (count,)).fetchall()
+    return [row[0] for row in reversed(rows)]
+
+def diff_runs(conn, old_run, new_run, min_change=0.0):
+    """Items whose price changed between two runs, plus added and removed items
+
+    Returns {'changed': [(item, old, new, change)], 'added': [(item, price)],
+    'removed': [(item, price)], 'ores': [(ore, old, new)], 'same_breakdown': bool}.
+    change is relative to the old price.
+    """
+    hashes = dict(conn.execute(
+        "SELECT run_id, breakdown_hash FROM runs WHERE run_id IN (?, ?)", (old_run, new_run)
+    ).fetchall())
+
+    changed = []
+    for item, old, new in conn.execute(
+        "SELECT a.item, a.price, b.price FROM prices a "
+        "JOIN prices b ON b.run_id = ? AND b.item = a.item "
+        "WHERE a.run_id = ? AND a.price IS NOT b.price",
+        (new_run, old_run)
+    ):
+        change = (new - old) / old if old and new is not None else float('inf')
+        if abs(change) >= min_change:
+            changed.append((item, old, new, change))
+    changed.sort(key=lambda row: abs(row[3]), reverse=True)
+
+    one_sided = (
+        "SELECT a.item, a.price FROM prices a "
+        "WHERE a.run_id = ? AND NOT EXISTS (SELECT 1 FROM prices b WHERE b.run_id = ? AND b.item = a.item) "
+        "ORDER BY a.item"
+    )
+    added = conn.execute(one_sided, (new_run, old_run)).fetchall()
+    removed = conn.execute(one_sided, (old_run, new_run)).fetchall()
+
+    ores = conn.execute(
+        "SELECT a.ore, a.price, b.price FROM ore_prices a "
+        "JOIN ore_prices b ON b.run_id = ? AND b.ore = a.ore "
+        "WHERE a.run_id = ? AND a.price IS NOT b.price ORDER BY a.ore",
+        (new_run, old_run)
+    ).fetchall()
+
+    return {
+        'changed': changed,
+        'added': added,
+        'removed': removed,
+        'ores': ores,
+        'same_breakdown': hashes.get(old_run) is not None and hashes.get(old_run) == hashes.get(new_run)
+    }
+
+def format_price(price):
+    """Price for display; a run without a price for the item shows '-'"""
+    return "-" if price is None else f"{price:,.2f}"
+
+def item_history(conn, item):
+    """[(run_id, created_at, price)] for one item, oldest first"""
+    return conn.execute(
+        "SELECT p.run_id, r.created_at, p.price FROM prices p "
+        "JOIN runs r ON r.run_id = p.run_id WHERE p.item = ? ORDER BY p.run_id",
+        (item,)
+    ).fetchall()
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the price history")
+    parser.add_argument('--db', default=HISTORY_FILE)
+    sub = parser.add_subparsers(dest='command')
+    sub.add_parser('runs', help="list recorded runs")
+    diff_parser = sub.add_parser('diff', help="compare two runs (default: the last two)")
+    diff_parser.add_argument('runs', nargs='*', type=int)
+    diff_parser.add_argument('--min-change', type=float, default=0.0, help="smallest relative change to show")
+    diff_parser.add_argument('--top', type=int, default=30)
+    history_parser = sub.add_parser('history', help="price history of one item")
+    history_parser.add_argument('item')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ No history found at {args.db}. Run calculate_prices.py first.")
+        return
+    conn = open_history(args.db)
+
+    if args.command == 'diff':
+        runs = args.runs if len(args.runs) == 2 else latest_runs(conn)
+        if len(runs) < 2:
+            print("❌ Need two runs to compare")
+            return
+        start = time.perf_counter()
+        diff = diff_runs(conn, runs[0], runs[1], args.min_change)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        print(f"Run {runs[0]} → {runs[1]} ({elapsed_ms:.1f} ms)")
+        if diff['same_breakdown']:
+            print("✅ Identical price breakdown")
+        for ore, old, new in diff['ores']:
+            print(f"   ore {ore:26} {format_price(old):>12} → {format_price(new):>12}")
+        print(f"   {len(diff['changed'])} changed, {len(diff['added'])} added, {len(diff['removed'])} removed")
+        for item, old, new, change in diff['changed'][:args.top]:
+            print(f"   {item:30} {format_price(old):>12} → {format_price(new):>12}  {change * 100:>+8.1f}%")
+        if len(diff['changed']) > args.top:
+            print(f"   ... and {len(diff['changed']) - args.top} more")
+        for label, rows in (('added', diff['added']), ('removed', diff['removed'])):
+            for item, price in rows[:args.top]:
+                print(f"   {label:7} {item:30} {format_price(price):>12}")
+            if len(rows) > args.top:
+                print(f"   ... and {len(rows) - args.top} more {label}")
+
+    elif args.command == 'history':
+        rows = item_history(conn, args.item)
+        if not rows:
+            print(f"❌ No history for {args.item}")
+            return
+        for run_id, created_at, price in rows:
+            print(f"{run_id:>6}  {created_at}  {format_price(price):>12}")
+
+    else:
+        for run in list_runs(conn):
+            print(f"{run['run_id']:>6}  {run['created_at']}  {run['item_count']:>6} items  "
+                  f"recipes {(run['recipes_hash'] or '-')[:10]}  breakdown {run['breakdown_hash'][:10]}")
+
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Sorted, fixed-record price index next to item_cache.yaml for single-item lookups
+
+calculate_prices.save_cache_to_file writes item_cache.idx every time it saves
+the YAML cache, so tools that need one price (the Lua exporter, the Discord
+bot) can memory-map the index and binary-search it instead of parsing the
+whole cache.
+
+Format (little-endian):
+    header  32 bytes: magic b'PRIX', version u16, record size u16, record count u64,
+            cache file size u64, first 8 bytes of the cache file's SHA-256
+    records 24 bytes each, sorted by hash: name hash u64, price f64 (NaN = no
+            price), item id i64 (-1 = no id)
+The name hash is 64-bit FNV-1a over the UTF-8 item name.
+
+Usage:
+    python price_index.py WarpDriveSmall IronPure    # look up items
+    python price_index.py --rebuild                  # rebuild from item_cache.yaml
+    python price_index.py --benchmark WarpDriveSmall # index lookup vs parsing the YAML
+"""
+
+import argparse
+import hashlib
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+
+from market_writer import write_bytes_atomic
+from lazy_imports import lazy_import
+
+yaml = lazy_import('yaml')
+
+INDEX_FILE = "item_cache.idx"
+CACHE_FILE = "item_cache.yaml"
+
+MAGIC = b'PRIX'
+VERSION = 1
+HEADER = struct.Struct('<4sHHQQ8s')
+RECORD = struct.Struct('<Qdq')
+HASH = struct.Struct('<Q')
+
+FNV_OFFSET = 0xcbf29ce484222325
+FNV_PRIME = 0x100000001b3
+
+class StaleIndexError(RuntimeError):
+    """The index was written for a different version of the YAML cache"""
+
+def name_hash(name):
+    """64-bit FNV-1a of an item name"""
+    value = FNV_OFFSET
+    for byte in name.encode('utf-8'):
+        value = ((value ^ byte) * FNV_PRIME) & 0xFFFFFFFFFFFFFFFF
+    return value
+
+def index_file_for(cache_file):
+    """item_cache.yaml -> item_cache.idx"""
+    return os.path.splitext(cache_file)[0] + '.idx'
+
+def cache_digest(cache_file):
+    """(size, 8-byte SHA-256 prefix) of a cache file"""
+    with open(cache_file, 'rb') as f:
+        data = f.read()
+    return len(data), hashlib.sha256(data).digest()[:8]
+
+def index_records(cache):
+    """Sorted (hash, name, price, id) for every cache entry"""
+    records = []
+    for name, cached in cache.items():
+        if isinstance(cached, dict):
+            price, item_id = cached.get('price'), cached.get('id')
+        else:
+            price, item_id = cached, None
+        records.append((name_hash(str(name)), str(name),
+                        float('nan') if price is None else float(price),
+                        -1 if item_id is None else int(item_id)))
+    records.sort()
+    for previous, record in zip(records, records[1:]):
+        if previous[0] == record[0]:
+            raise ValueError(f"name hash collision between {previous[1]} and {record[1]}")
+    return records
+
+def write_price_index(cache, cache_file=CACHE_FILE, filename=None):
+    """Write the index for a cache that was just saved to cache_file
+
+    The cache file's size and hash are stored so readers can tell when the
+    YAML was changed without the index; the same cache always gives the same
+    bytes. Returns the number of records.
+    """
+    filename = filename or index_file_for(cache_file)
+    records = index_records(cache)
+    size, digest = cache_digest(cache_file)
+
+    data = bytearray(HEADER.size + RECORD.size * len(records))
+    HEADER.pack_into(data, 0, MAGIC, VERSION, RECORD.size, len(records), size, digest)
+    for i, (key, _, price, item_id) in enumerate(records):
+        RECORD.pack_into(data, HEADER.size + i * RECORD.size, key, price, item_id)
+    write_bytes_atomic(filename, bytes(data))
+    return len(records)
+
+class PriceIndex:
+    """Read-only memory-mapped price index with binary-search lookups
+
+    Only the header and the records touched by a search are read from disk.
+    With a cache_file, opening checks that the index matches it and raises
+    StaleIndexError if not: a different size is stale, and a cache modified
+    after the index was written is compared by content hash (so a plain copy
+    still matches). A missing cache file is not checked.
+    """
+
+    def __init__(self, filename=INDEX_FILE, cache_file=CACHE_FILE):
+        with open(filename, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            written = os.fstat(f.fileno()).st_mtime_ns
+        try:
+            magic, version, record_size, count, size, digest = HEADER.unpack_from(self.map, 0)
+            if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+                raise ValueError(f"{filename} is not a version {VERSION} price index")
+            if len(self.map) != HEADER.size + count * RECORD.size:
+                raise ValueError(f"{filename} is truncated")
+            self.count = count
+            if cache_file and os.path.exists(cache_file):
+                stat = os.stat(cache_file)
+                if stat.st_size != size or (stat.st_mtime_ns > written and cache_digest(cache_file) != (size, digest)):
+                    raise StaleIndexError(f"{filename} is out of date with {cache_file}; "
+                                          f"run python price_index.py --rebuild")
+        except BaseException:
+            self.map.close()
+            raise
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.map.close()
+
+    def lookup(self, name):
+        """(price, id) for an item name, None if it is not in the index
+
+        price and id are None when the cache has no price or no id for it.
+        """
+        key = name_hash(name)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if HASH.unpack_from(self.map, HEADER.size + middle * RECORD.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.count:
+            return None
+        found, price, item_id = RECORD.unpack_from(self.map, HEADER.size + low * RECORD.size)
+        if found != key:
+            return None
+        return (None if math.isnan(price) else price), (None if item_id < 0 else item_id)
+
+def lookup_price(name, filename=INDEX_FILE, cache_file=CACHE_FILE):
+    """One-off (price, id) lookup; None if the item is unknown"""
+    with PriceIndex(filename, cache_file) as index:
+        return index.lookup(name)
+
+def rebuild(cache_file=CACHE_FILE):
+    """Rebuild the index from the YAML cache as it is on disk"""
+    from calculate_prices import load_cache_from_file
+    return write_price_index(load_cache_from_file(cache_file), cache_file)
+
+def benchmark(names, runs=20):
+    """Average seconds per lookup: open + search the index vs parse the YAML"""
+    from calculate_prices import load_cache_from_file
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        for name in names:
+            lookup_price(name)
+    index_seconds = (time.perf_counter() - start) / (runs * len(names))
+
+    yaml_runs = max(1, runs // 10)
+    start = time.perf_counter()
+    for _ in range(yaml_runs):
+        for name in names:
+            load_cache_from_file(CACHE_FILE).get(name)
+    yaml_seconds = (time.perf_counter() - start) / (yaml_runs * len(names))
+    return index_seconds, yaml_seconds
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-item price lookups from the memory-mapped price index")
+    parser.add_argument('items', nargs='*', help="item names")
+    parser.add_argument('--rebuild', action='store_true', help=f"rebuild {INDEX_FILE} from {CACHE_FILE}")
+    parser.add_argument('--benchmark', action='store_true', help="compare with parsing the YAML cache")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        count = rebuild()
+        print(f"✅ Wrote {count} records to {INDEX_FILE}")
+    if args.benchmark:
+        names = args.items or ['WarpDriveSmall']
+        index_seconds, yaml_seconds = benchmark(names)
+        print(f"Index lookup (open + search): {index_seconds * 1e6:10.1f} µs")
+        print(f"Parse {CACHE_FILE}:        {yaml_seconds * 1e6:10.1f} µs ({yaml_seconds / index_seconds:,.0f}x)")
+        return
+    if not args.items:
+        if not args.rebuild:
+            parser.print_help()
+        return
+
+    try:
+        index = PriceIndex()
+    except FileNotFoundError:
+        print(f"❌ {INDEX_FILE} not found. Run calculate_prices.py or price_index.py --rebuild first.")
+        sys.exit(1)
+    except StaleIndexError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    missing = False
+    with index:
+        for name in args.items:
+            result = index.lookup(name)
+            if result is None:
+                missing = True
+                print(f"⚠️ {name}: not in the price index")
+                continue
+            price, item_id = result
+            price_text = "no price" if price is None else f"{price:.2f}"
+            print(f"{name:30} {price_text:>14}  id {item_id if item_id is not None else '-'}")
+    if missing:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
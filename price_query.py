@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Batch price lookups by item name or database id
+
+Library use:
+
+    from price_query import batch_lookup, iter_lookup, abatch_lookup
+
+    result = batch_lookup(['WarpDriveSmall', 3292462663, 'NoSuchItem'])
+    result['prices']   # {'WarpDriveSmall': {...}, 3292462663: {...}}
+    result['unknown']  # ['NoSuchItem']
+
+The price table is loaded from item_cache.yaml once per process and reloaded
+only when the file changes.
+
+Command line:
+    python price_query.py WarpDriveSmall IronPure 3292462663
+"""
+
+import os
+import sys
+import threading
+from lazy_imports import lazy_import
+
+asyncio = lazy_import('asyncio')
+yaml = lazy_import('yaml')
+
+DEFAULT_CACHE_FILE = "item_cache.yaml"
+ASYNC_CHUNK_SIZE = 1000  # Lookups per chunk before yielding to the event loop
+
+_table_lock = threading.Lock()
+_tables = {}  # filename -> (mtime, table)
+
+class UnknownItemsError(KeyError):
+    """Raised once per batch with every name or id that has no price"""
+
+    def __init__(self, unknown):
+        super().__init__(f"{len(unknown)} unknown items: {', '.join(str(k) for k in unknown[:10])}"
+                         f"{'...' if len(unknown) > 10 else ''}")
+        self.unknown = unknown
+
+def build_price_table(cache):
+    """Index cache entries (number or {'price', 'id'}) by name and by id"""
+    by_name = {}
+    by_id = {}
+    for item, cached in cache.items():
+        if isinstance(cached, dict):
+            record = {'item': item, 'price': cached.get('price'), 'id': cached.get('id')}
+        else:
+            record = {'item': item, 'price': cached, 'id': None}
+        by_name[item] = record
+        if record['id'] is not None:
+            by_id[record['id']] = record
+    return {'by_name': by_name, 'by_id': by_id}
+
+def load_price_table(filename=DEFAULT_CACHE_FILE):
+    """Shared price table for a cache file, rebuilt only when the file changes"""
+    mtime = os.path.getmtime(filename)
+    with _table_lock:
+        cached = _tables.get(filename)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(filename, 'r') as f:
+            table = build_price_table(yaml.safe_load(f) or {})
+        _tables[filename] = (mtime, table)
+        return table
+
+def find_record(table, key):
+    """Record for a name or database id (int or numeric string), or None"""
+    record = table['by_name'].get(key)
+    if record is not None:
+        return record
+    try:
+        return table['by_id'].get(int(key))
+    except (TypeError, ValueError):
+        return None
+
+def iter_lookup(keys, table=None, unknown=None):
+    """Yield (key, record) for every known key; unknown keys are appended to `unknown`"""
+    if table is None:
+        table = load_price_table()
+    for key in keys:
+        record = find_record(table, key)
+        if record is None:
+            if unknown is not None:
+                unknown.append(key)
+        else:
+            yield key, record
+
+def batch_lookup(keys, table=None, strict=False):
+    """Look up many items at once
+
+    Returns {'prices': {key: record}, 'unknown': [keys]}. With strict=True a
+    single UnknownItemsError lists every missing key instead.
+    """
+    unknown = []
+    prices = dict(iter_lookup(keys, table, unknown))
+    if strict and unknown:
+        raise UnknownItemsError(unknown)
+    return {'prices': prices, 'unknown': unknown}
+
+async def aload_price_table(filename=DEFAULT_CACHE_FILE):
+    """Load the shared price table without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, load_price_table, filename)
+
+async def aiter_lookup(keys, table=None, unknown=None, chunk_size=ASYNC_CHUNK_SIZE):
+    """Async variant of iter_lookup that yields control every chunk_size keys"""
+    if table is None:
+        table = await aload_price_table()
+    for i, item in enumerate(iter_lookup(keys, table, unknown), 1):
+        yield item
+        if i % chunk_size == 0:
+            await asyncio.sleep(0)
+
+async def abatch_lookup(keys, table=None, strict=False, chunk_size=ASYNC_CHUNK_SIZE):
+    """Async variant of batch_lookup"""
+    unknown = []
+    prices = {}
+    async for key, record in aiter_lookup(keys, table, unknown, chunk_size):
+        prices[key] = record
+    if strict and unknown:
+        raise UnknownItemsError(unknown)
+    return {'prices': prices, 'unknown': unknown}
+
+def main():
+    keys = sys.argv[1:]
+    if not keys:
+        print(__doc__)
+        return
+
+    result = batch_lookup(keys)
+    for key, record in result['prices'].items():
+        price = record['price']
+        price_text = f"{price:>14.2f}" if price is not None else f"{'n/a':>14}"
+        print(f"{record['item']:30} {price_text}  id={record['id']}")
+
+    if result['unknown']:
+        print(f"\n⚠️ {len(result['unknown'])} unknown items: {', '.join(result['unknown'])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Local price service: keeps recipes, prices and the dependency graph in memory
+and answers JSON queries over HTTP. Source files are reloaded when they change.
+
+Usage:
+    python price_server.py [--host 127.0.0.1] [--port 8765]
+
+Endpoints:
+    GET  /health
+    GET  /price?item=WarpDriveSmall
+    GET  /prices?items=WarpDriveSmall,IronPure      POST /prices {"items": [...]}
+    GET  /breakdown?item=WarpDriveSmall
+    POST /scenario {"ore_prices": {"IronOre": 40}, "items": ["IronPure"]}
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+
+import calculate_prices
+from calculate_prices import *
+from price_query import build_price_table, find_record, batch_lookup
+from production_planner import build_production_graph
+from lazy_imports import lazy_import
+
+http_server = lazy_import('http.server')
+yaml = lazy_import('yaml')
+
+# Files that trigger a reload when their modification time changes
+WATCHED_FILES = [
+    "recipes.yaml",
+    "ore_prices.yaml",
+    "item_cache.yaml",
+    "independent_items.yaml",
+    INDUSTRY_SETTINGS_FILE
+]
+RELOAD_INTERVAL = 2.0  # Seconds between file change checks
+
+def get_file_mtimes(filenames=WATCHED_FILES):
+    """Modification times of the watched files (None if missing)"""
+    mtimes = {}
+    for filename in filenames:
+        try:
+            mtimes[filename] = os.path.getmtime(filename)
+        except OSError:
+            mtimes[filename] = None
+    return mtimes
+
+def load_price_state():
+    """Load all source files once and build the in-memory price index
+
+    Raises RecipeSchemaError listing every problem when recipes.yaml is invalid.
+    """
+    mtimes = get_file_mtimes()
+
+    with open("ore_prices.yaml", "r") as f:
+        ore_prices = yaml.safe_load(f) or {}
+    recipes = list(load_recipes("recipes.yaml"))
+    cache = load_cache_from_file()
+    manual_prices = load_manual_prices()
+    industry_settings = load_industry_settings()
+
+    graph = build_production_graph(recipes, ore_prices, industry_settings, manual_prices)
+
+    # Prices come from the fresh pricing pass; the cache supplies database ids
+    # and prices for anything the recipes can't resolve
+    table = build_price_table(cache)
+    for item, price in graph['prices'].items():
+        if price is None:
+            continue
+        record = table['by_name'].setdefault(item, {'item': item, 'price': None, 'id': None})
+        record['price'] = price
+
+    return {
+        'ore_prices': ore_prices,
+        'manual_prices': manual_prices,
+        'industry_settings': industry_settings,
+        'recipe_index': build_recipe_index(recipes),
+        'recipes_by_id': {r.get('id'): r for r in recipes},
+        'graph': graph,
+        'table': table,
+        'mtimes': mtimes,
+        'loaded_at': time.time()
+    }
+
+def resolve_item(state, key):
+    """Find an item name by name or database id"""
+    record = find_record(state['table'], key)
+    return record['item'] if record else None
+
+def lookup_price(state, key):
+    """Price and id of one item, or None if unknown"""
+    record = find_record(state['table'], key)
+    return dict(record) if record else None
+
+def lookup_prices(state, keys):
+    """Prices for many items, with unknown keys reported together"""
+    result = batch_lookup(keys, state['table'])
+    result['prices'] = {str(k): v for k, v in result['prices'].items()}
+    return result
+
+def price_breakdown(state, key):
+    """Chosen recipe, industry and input costs behind an item's price"""
+    item = resolve_item(state, key)
+    if item is None:
+        return None
+
+    node = state['graph']['nodes'].get(item)
+    result = lookup_price(state, item)
+    if node is None:
+        result['source'] = 'ore' if item in state['ore_prices'] else 'manual'
+        return result
+
+    recipe = state['recipes_by_id'][node['recipe']]
+    prices = state['graph']['prices']
+    inputs = []
+    input_total = 0
+    for name, qty in node['inputs']:
+        unit_price = prices.get(name) or 0
+        inputs.append({'item': name, 'quantity': qty, 'unit_price': unit_price, 'total': unit_price * qty})
+        input_total += unit_price * qty
+
+    first_output = recipe.get('out', [])[0]
+    main_product_quantity = list(first_output.values())[0]
+    time_cost, industry = calculate_time_cost(recipe, state['industry_settings'])
+
+    result.update({
+        'source': 'recipe',
+        'recipe': node['recipe'],
+        'industry': industry,
+        'time': recipe.get('time', 0),
+        'output_quantity': main_product_quantity,
+        'inputs': inputs,
+        'catalysts': node['catalysts'],
+        'byproducts': [{'item': name, 'quantity': qty} for name, qty in node['byproducts']],
+        'input_cost_per_unit': input_total / main_product_quantity,
+        'time_cost': time_cost
+    })
+    return result
+
+def reprice_scenario(state, ore_overrides, items=None):
+    """Reprice items with changed ore prices, without touching the loaded state"""
+    ore_prices = dict(state['ore_prices'])
+    ore_prices.update(ore_overrides or {})
+    cache = dict(state['manual_prices'])
+
+    if items is None:
+        items = [item for item in state['graph']['nodes']]
+
+    prices = {}
+    unknown = []
+    for key in items:
+        item = resolve_item(state, key) or key
+        if item not in state['recipe_index'] and item not in ore_prices and item not in cache:
+            unknown.append(key)
+            continue
+        new_price = calculate_cost(item, ore_prices, state['recipe_index'], cache,
+                                   industry_settings=state['industry_settings'])
+        old_record = state['table']['by_name'].get(item, {})
+        prices[item] = {'price': new_price, 'base_price': old_record.get('price')}
+
+    return {'ore_prices': ore_overrides or {}, 'prices': prices, 'unknown': unknown}
+
+def request_problem(payload):
+    """Why a POST body can't be served, or None if it is valid
+
+    items must be a list of names or ids and ore_prices map ore names to
+    finite numbers.
+    """
+    if not isinstance(payload, dict):
+        return "request body must be a JSON object"
+    items = payload.get('items')
+    if items is not None:
+        if not isinstance(items, list):
+            return "'items' must be a list"
+        for key in items:
+            if isinstance(key, bool) or not isinstance(key, (str, int)):
+                return f"item {key!r} is not a name or id"
+    ore_prices = payload.get('ore_prices')
+    if ore_prices is not None:
+        if not isinstance(ore_prices, dict):
+            return "'ore_prices' must be an object"
+        for ore, price in ore_prices.items():
+            if isinstance(price, bool) or not isinstance(price, (int, float)) or not math.isfinite(price):
+                return f"price of {ore} is not a finite number: {price!r}"
+    return None
+
+class PriceService:
+    """Holds the current price state and swaps it when source files change"""
+
+    def __init__(self):
+        self.state = load_price_state()
+        self.lock = threading.Lock()
+
+    def reload_if_changed(self):
+        """Rebuild the state if any watched file changed; returns True on reload"""
+        if get_file_mtimes() == self.state['mtimes']:
+            return False
+        with self.lock:
+            new_state = load_price_state()
+            # Single reference swap: requests in flight keep the old state
+            self.state = new_state
+        print(f"Reloaded price data ({len(new_state['table']['by_name'])} items)")
+        return True
+
+    def watch(self, interval=RELOAD_INTERVAL):
+        """Poll the watched files forever (run in a daemon thread)"""
+        while True:
+            time.sleep(interval)
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                print(f"⚠️ Reload failed, keeping previous data: {e}")
+
+def make_handler(service):
+    """Build a request handler bound to a PriceService"""
+
+    class PriceRequestHandler(http_server.BaseHTTPRequestHandler):
+
+        def send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def read_json(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            if not length:
+                return {}
+            return json.loads(self.rfile.read(length))
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            state = service.state
+
+            if url.path == '/health':
+                self.send_json(200, {'status': 'ok', 'items': len(state['table']['by_name']), 'loaded_at': state['loaded_at']})
+            elif url.path == '/price':
+                result = lookup_price(state, query.get('item', [''])[0])
+                if result is None:
+                    self.send_json(404, {'error': 'unknown item'})
+                else:
+                    self.send_json(200, result)
+            elif url.path == '/prices':
+                keys = [k for value in query.get('items', []) for k in value.split(',') if k]
+                self.send_json(200, lookup_prices(state, keys))
+            elif url.path == '/breakdown':
+                result = price_breakdown(state, query.get('item', [''])[0])
+                if result is None:
+                    self.send_json(404, {'error': 'unknown item'})
+                else:
+                    self.send_json(200, result)
+            else:
+                self.send_json(404, {'error': 'unknown endpoint'})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            try:
+                payload = self.read_json()
+            except ValueError:
+                self.send_json(400, {'error': 'invalid JSON'})
+                return
+            problem = request_problem(payload)
+            if problem:
+                self.send_json(400, {'error': problem})
+                return
+            state = service.state
+
+            if url.path == '/prices':
+                self.send_json(200, lookup_prices(state, payload.get('items', [])))
+            elif url.path == '/scenario':
+                self.send_json(200, reprice_scenario(state, payload.get('ore_prices'), payload.get('items')))
+            else:
+                self.send_json(404, {'error': 'unknown endpoint'})
+
+        def log_message(self, format, *args):
+            if calculate_prices.DEBUG:
+                super().log_message(format, *args)
+
+    return PriceRequestHandler
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Dual Universe price service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    calculate_prices.DEBUG = False
+
+    start = time.perf_counter()
+    try:
+        service = PriceService()
+    except RecipeSchemaError as e:
+        print_recipe_errors(e.errors)
+        sys.exit(1)
+    print(f"Loaded {len(service.state['table']['by_name'])} items in {time.perf_counter() - start:.2f}s")
+
+    threading.Thread(target=service.watch, daemon=True).start()
+
+    server = http_server.ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"Price service listening on http://{args.host}:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down")
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Production planner: raw materials, intermediates and machine time for a build order
+
+Usage:
+    python production_planner.py "50 WarpDriveSmall + 200 CoreUnitDynamic32"
+"""
+
+import math
+import sys
+import time
+from collections import defaultdict
+
+import calculate_prices
+from calculate_prices import *
+from lazy_imports import lazy_import
+
+yaml = lazy_import('yaml')
+
+def build_production_graph(recipes, ore_prices, industry_settings=None, manual_prices=None):
+    """Price every item once and precompute the dependency graph of the chosen recipes"""
+    recipe_index = build_recipe_index(recipes)
+    recipes_by_id = {r.get('id'): r for r in recipes}
+
+    # Run the normal pricing pass and record which recipe/industry wins per item
+    cache = dict(manual_prices or {})
+    choices = {}
+    for item in recipe_index:
+        if item not in ore_prices:
+            calculate_cost(item, ore_prices, recipe_index, cache,
+                           industry_settings=industry_settings, choices=choices)
+
+    # One node per crafted item, holding everything needed to expand a batch
+    nodes = {}
+    for item, choice in choices.items():
+        recipe = recipes_by_id[choice['recipe']]
+        industry = choice['industry']
+        speed = 1.0
+        if industry_settings:
+            speed = industry_settings.get(industry, industry_settings.get('default', {})).get('speed', 1.0)
+
+        output_qty = 0
+        byproducts = []
+        for out in recipe.get('out', []):
+            for name, qty in out.items():
+                if name == item:
+                    output_qty += qty
+                elif name not in CATALYSTS:
+                    byproducts.append((name, qty))
+
+        inputs = []
+        catalysts = []
+        for inp in recipe.get('in', []):
+            for name, qty in inp.items():
+                if name in CATALYSTS:
+                    catalysts.append(name)
+                else:
+                    inputs.append((name, qty))
+
+        nodes[item] = {
+            'recipe': choice['recipe'],
+            'industry': industry,
+            'output_qty': output_qty,
+            'minutes': recipe.get('time', 0) / speed,
+            'time_cost': calculate_time_cost(recipe, industry_settings)[0],
+            'inputs': inputs,
+            'catalysts': catalysts,
+            'byproducts': byproducts
+        }
+
+    return {
+        'nodes': nodes,
+        'order': topological_order(nodes),
+        'prices': cache,
+        'ore_prices': ore_prices
+    }
+
+def topological_order(nodes):
+    """Order crafted items so every product comes before the items it consumes"""
+    postorder = []
+    state = {}  # 1 = in progress, 2 = done
+
+    for root in nodes:
+        if root in state:
+            continue
+        state[root] = 1
+        stack = [(root, iter(nodes[root]['inputs']))]
+        while stack:
+            item, children = stack[-1]
+            for name, _ in children:
+                # Back edges (cycles) are ignored; they can't appear in a priced plan
+                if name in nodes and name not in state:
+                    state[name] = 1
+                    stack.append((name, iter(nodes[name]['inputs'])))
+                    break
+            else:
+                stack.pop()
+                state[item] = 2
+                postorder.append(item)
+
+    postorder.reverse()
+    return postorder
+
+def parse_order(text, errors=None):
+    """Parse an order like '50 WarpDriveSmall + 200 CoreUnitDynamic32'
+
+    A part with a bad quantity (or extra words) is skipped; the problem is
+    appended to `errors`, or printed without an errors list.
+    """
+    orders = defaultdict(float)
+    for part in text.replace(',', '+').split('+'):
+        tokens = part.split()
+        if not tokens:
+            continue
+        if len(tokens) == 1:
+            orders[tokens[0]] += 1
+            continue
+
+        problem = None
+        if len(tokens) > 2:
+            problem = "expected '<quantity> <item>'"
+        else:
+            try:
+                qty = float(tokens[0].rstrip('x'))
+            except ValueError:
+                problem = f"quantity {tokens[0]!r} is not a number"
+            else:
+                if not 0 < qty < math.inf:
+                    problem = f"quantity {tokens[0]!r} is not a positive number"
+        if problem:
+            message = f"'{part.strip()}': {problem}"
+            if errors is None:
+                print(f"⚠️ Skipping {message}")
+            else:
+                errors.append(message)
+            continue
+        orders[tokens[1]] += qty
+    return dict(orders)
+
+def plan_production(orders, graph):
+    """Expand a build order into aggregated materials and machine time
+
+    Demand is accumulated along the topological order, so every shared
+    intermediate is expanded exactly once, rounded up to whole batches.
+    """
+    nodes = graph['nodes']
+    ore_prices = graph['ore_prices']
+    prices = graph['prices']
+
+    demand = defaultdict(float)
+    for item, qty in orders.items():
+        demand[item] += qty
+
+    crafted = {}
+    machine_minutes = defaultdict(float)
+    byproducts = defaultdict(float)
+    catalysts = set()
+
+    for item in graph['order']:
+        qty = demand.get(item)
+        if not qty:
+            continue
+        node = nodes[item]
+        batches = math.ceil(qty / node['output_qty'])
+        crafted[item] = {
+            'needed': qty,
+            'batches': batches,
+            'produced': batches * node['output_qty'],
+            'recipe': node['recipe'],
+            'industry': node['industry']
+        }
+        machine_minutes[node['industry']] += batches * node['minutes']
+        for name, input_qty in node['inputs']:
+            demand[name] += input_qty * batches
+        for name, out_qty in node['byproducts']:
+            byproducts[name] += out_qty * batches
+        catalysts.update(node['catalysts'])
+
+    ores = {}
+    purchased = {}
+    unresolved = {}
+    ore_cost = 0
+    for item, qty in demand.items():
+        if item in nodes:
+            continue
+        if item in ore_prices:
+            ores[item] = qty
+            ore_cost += qty * (ore_prices[item] or 0)
+        elif prices.get(item) is not None:
+            purchased[item] = qty
+        else:
+            unresolved[item] = qty
+
+    return {
+        'orders': dict(orders),
+        'ores': ores,
+        'ore_cost': ore_cost,
+        'purchased': purchased,
+        'unresolved': unresolved,
+        'crafted': crafted,
+        'machine_minutes': dict(machine_minutes),
+        'byproducts': dict(byproducts),
+        'catalysts': sorted(catalysts)
+    }
+
+def print_plan(plan):
+    """Print a production plan"""
+    print("\n=== Build Order ===")
+    for item, qty in plan['orders'].items():
+        print(f"{item:30} {qty:>12,.0f}")
+
+    print("\n=== Ore Requirements ===")
+    for item, qty in sorted(plan['ores'].items()):
+        print(f"{item:30} {qty:>12,.0f}")
+    print(f"{'Total ore cost':30} {plan['ore_cost']:>12,.2f}")
+
+    if plan['purchased']:
+        print("\n=== Purchased Items (manual prices) ===")
+        for item, qty in sorted(plan['purchased'].items()):
+            print(f"{item:30} {qty:>12,.0f}")
+
+    print("\n=== Intermediates ===")
+    for item, info in sorted(plan['crafted'].items()):
+        print(f"{item:30} {info['produced']:>12,.0f}  ({info['batches']:,} batches, {info['industry']})")
+
+    print("\n=== Machine Time (minutes) ===")
+    for industry, minutes in sorted(plan['machine_minutes'].items(), key=lambda x: str(x[0])):
+        print(f"{str(industry):30} {minutes:>12,.1f}")
+
+    if plan['catalysts']:
+        print(f"\nCatalysts required (reusable): {', '.join(plan['catalysts'])}")
+
+    if plan['unresolved']:
+        print(f"\n⚠️ No recipe or price for {len(plan['unresolved'])} items:")
+        for item, qty in sorted(plan['unresolved'].items()):
+            print(f"  {item} x {qty:,.0f}")
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+
+    # Pricing debug output is noise for a planner
+    calculate_prices.DEBUG = False
+
+    with open("ore_prices.yaml", "r") as f:
+        ore_prices = yaml.safe_load(f)
+    recipes = load_recipes_or_exit("recipes.yaml")
+
+    start = time.perf_counter()
+    graph = build_production_graph(recipes, ore_prices, load_industry_settings(), load_manual_prices())
+    print(f"Built production graph for {len(graph['nodes'])} items in {time.perf_counter() - start:.2f}s")
+
+    orders = parse_order(" ".join(sys.argv[1:]))
+    if not orders:
+        print("❌ Nothing to plan")
+        sys.exit(1)
+    start = time.perf_counter()
+    plan = plan_production(orders, graph)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    print_plan(plan)
+    print(f"\nPlanned in {elapsed_ms:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Balanced placement of plasma and ultra-rare items across planets
+
+Greedy assignment over a min-heap of planet loads (rare items already placed):
+- every planet holds at most `max_rare_per_planet` rare items
+- a planet carries at most one plasma type
+- every seller/buyer pair of an ultra-rare item is at least `min_trade_distance`
+  apart (planet_distances.yaml, see trade_route_optimizer.py)
+
+Items are placed most valuable first, each taking the least loaded planets that
+satisfy the constraints, so the cost is O(placements * log(planets)) and no
+planet ends up with all the rare goods. When no planet satisfies a constraint,
+it is relaxed for that placement and counted in the stats.
+"""
+
+import heapq
+import math
+import zlib
+
+from trade_route_optimizer import load_travel_table
+
+# Default placement settings (generate_all_markets.py RARE_PLACEMENT overrides these)
+PLACEMENT_DEFAULTS = {
+    'max_rare_per_planet': None,    # None = even share of all placements, rounded up, plus 25%
+    'min_trade_distance': 0,        # Minimum distance between a seller and a buyer planet
+    'plasma_planets': (1, 2),       # Planets per plasma type
+    'ultra_rare_planets': (2, 4)    # Planets per ultra-rare item (split into sellers and buyers)
+}
+
+def stable_count(item, low, high):
+    """Deterministic count in [low, high] per item (the same on every run)"""
+    return low + zlib.crc32(item.encode()) % (high - low + 1)
+
+class PlanetLoads:
+    """Min-heap of planets by rare-item load, with lazy deletion of stale entries"""
+
+    def __init__(self, planet_ids):
+        self.load = {planet_id: 0 for planet_id in planet_ids}
+        self.heap = [(0, i, planet_id) for i, planet_id in enumerate(planet_ids)]
+        self.order = {planet_id: i for i, planet_id in enumerate(planet_ids)}
+
+    def take(self, accept, limit):
+        """Least loaded planet with load < limit for which accept(planet) holds, or None"""
+        skipped = []
+        found = None
+        while self.heap:
+            load, order, planet_id = heapq.heappop(self.heap)
+            if load != self.load[planet_id]:
+                continue  # Stale entry
+            if load >= limit:
+                skipped.append((load, order, planet_id))
+                break  # Everything after is at least as loaded
+            if accept(planet_id):
+                found = planet_id
+                break
+            skipped.append((load, order, planet_id))
+        for entry in skipped:
+            heapq.heappush(self.heap, entry)
+        if found is not None:
+            self.load[found] += 1
+            heapq.heappush(self.heap, (self.load[found], self.order[found], found))
+        return found
+
+def place_rare_items(plasma_items, ultra_rare_items, planet_ids, prices, settings=None, travel_table=None):
+    """Assign plasma and ultra-rare items to planets
+
+    Returns (strategies, stats): strategies maps item -> strategy dict in the
+    format create_global_trading_strategy uses; stats has per-planet loads and
+    the number of relaxed constraints.
+    """
+    settings = dict(PLACEMENT_DEFAULTS, **(settings or {}))
+    if travel_table is None:
+        travel_table = load_travel_table()
+    distances = travel_table['distances']
+    default_distance = travel_table['default_distance']
+    min_distance = settings['min_trade_distance']
+
+    def far_enough(planet_id, others):
+        if not min_distance:
+            return True
+        return all(distances.get((planet_id, other), default_distance) >= min_distance for other in others)
+
+    def by_value(items):
+        return sorted(items, key=lambda item: (-(prices.get(item) or 0), item))
+
+    plasma_items = by_value(plasma_items)
+    ultra_rare_items = by_value(ultra_rare_items)
+    planned = {item: stable_count(item, *settings['plasma_planets']) for item in plasma_items}
+    planned.update({item: stable_count(item, *settings['ultra_rare_planets']) for item in ultra_rare_items})
+
+    cap = settings['max_rare_per_planet']
+    if cap is None:
+        cap = math.ceil(math.ceil(sum(planned.values()) / max(1, len(planet_ids))) * 1.25)
+
+    loads = PlanetLoads(planet_ids)
+    has_plasma = set()
+    strategies = {}
+    relaxed = {'plasma_per_planet': 0, 'cap': 0, 'distance': 0}
+
+    def take(unused, preferred, relax_key):
+        """Least loaded unused planet, preferring ones that meet the item's constraint"""
+        planet_id = loads.take(lambda p: unused(p) and preferred(p), cap)
+        if planet_id is None:
+            planet_id = loads.take(unused, cap)
+            if planet_id is not None:
+                relaxed[relax_key] += 1
+        if planet_id is None:
+            # Every usable planet is at the cap: the least loaded one takes it anyway
+            planet_id = loads.take(unused, float('inf'))
+            if planet_id is not None:
+                relaxed['cap'] += 1
+        return planet_id
+
+    # Plasma first: the one-type-per-planet rule is the tightest constraint
+    for item in plasma_items:
+        planets = []
+        for _ in range(min(planned[item], len(planet_ids))):
+            planet_id = take(lambda p: p not in planets, lambda p: p not in has_plasma, 'plasma_per_planet')
+            if planet_id is None:
+                break
+            planets.append(planet_id)
+            has_plasma.add(planet_id)
+        strategies[item] = {'type': 'ultra_rare_plasma', 'planets': planets}
+
+    for item in ultra_rare_items:
+        num_planets = min(planned[item], len(planet_ids))
+        num_sellers = max(1, num_planets // 2)
+        num_buyers = max(1, num_planets - num_sellers)
+
+        sellers = []
+        buyers = []
+        for _ in range(num_sellers):
+            planet_id = take(lambda p: p not in sellers, lambda p: True, 'cap')
+            if planet_id is not None:
+                sellers.append(planet_id)
+        for _ in range(num_buyers):
+            planet_id = take(lambda p: p not in sellers and p not in buyers,
+                             lambda p: far_enough(p, sellers), 'distance')
+            if planet_id is not None:
+                buyers.append(planet_id)
+
+        strategies[item] = {
+            'type': 'ultra_rare_trade',
+            'seller_planets': sellers,
+            'buyer_planets': buyers
+        }
+
+    stats = {
+        'cap': cap,
+        'loads': dict(loads.load),
+        'relaxed': relaxed,
+        'placements': sum(loads.load.values())
+    }
+    return strategies, stats
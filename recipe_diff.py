@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Recipe diff between two recipes.yaml versions with targeted repricing
+
+Compares recipes by id (added, removed, changed fields), then reprices only the
+items whose dependency closure touches a changed recipe. Every other price is
+reused from the previous prices, so a game patch costs a fraction of a full run.
+
+Usage:
+    python recipe_diff.py [--old recipes.yaml.old] [--new recipes.yaml] [--old-prices item_cache.yaml] [--write]
+"""
+
+import argparse
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import calculate_prices
+from calculate_prices import *
+from lazy_imports import lazy_import
+
+yaml = lazy_import('yaml')
+
+def diff_recipes(old_recipes, new_recipes):
+    """Added, removed and changed recipes by id
+
+    Returns {'added': [recipe], 'removed': [recipe], 'changed': [(old, new, fields)]}.
+    """
+    old_by_id = {r.get('id'): r for r in old_recipes}
+    new_by_id = {r.get('id'): r for r in new_recipes}
+
+    added = [r for rid, r in new_by_id.items() if rid not in old_by_id]
+    removed = [r for rid, r in old_by_id.items() if rid not in new_by_id]
+    changed = []
+    for rid, new in new_by_id.items():
+        old = old_by_id.get(rid)
+        if old is not None and old != new:
+            fields = sorted(key for key in set(old) | set(new) if old.get(key) != new.get(key))
+            changed.append((old, new, fields))
+
+    return {'added': added, 'removed': removed, 'changed': changed}
+
+def recipe_outputs(recipe):
+    """Every item a recipe produces"""
+    return [name for out in recipe.get('out', []) for name in out.keys()]
+
+def affected_items(diff, new_recipes):
+    """Items whose price may change: outputs of touched recipes and everything built from them"""
+    dirty = set()
+    for recipe in diff['added'] + diff['removed']:
+        dirty.update(recipe_outputs(recipe))
+    for old, new, _ in diff['changed']:
+        dirty.update(recipe_outputs(old))
+        dirty.update(recipe_outputs(new))
+
+    # Reverse edges: input -> items produced from it
+    consumers = defaultdict(set)
+    for recipe in new_recipes:
+        outputs = recipe_outputs(recipe)
+        for inp in recipe.get('in', []):
+            for name in inp.keys():
+                consumers[name].update(outputs)
+
+    stack = list(dirty)
+    while stack:
+        item = stack.pop()
+        for consumer in consumers.get(item, ()):
+            if consumer not in dirty:
+                dirty.add(consumer)
+                stack.append(consumer)
+    return dirty
+
+def full_prices(recipes, ore_prices, manual_prices, industry_settings=None):
+    """Price every output item from scratch, as calculate_prices.py does"""
+    recipe_index = build_recipe_index(recipes)
+    cache = dict(manual_prices)
+    for item in recipe_index:
+        if item not in ore_prices:
+            calculate_cost(item, ore_prices, recipe_index, cache, industry_settings=industry_settings)
+    return cache
+
+def reprice(dirty, old_prices, new_recipes, ore_prices, manual_prices, industry_settings=None):
+    """Reprice only the dirty items, reusing every other previous price
+
+    A repriced item that had a {'price', 'id'} entry keeps it with only the
+    price replaced, so database ids survive --write.
+    """
+    cache = {item: price for item, price in old_prices.items() if item not in dirty}
+    cache.update(manual_prices)
+    recipe_index = build_recipe_index(new_recipes)
+    for item in dirty:
+        if item not in ore_prices:
+            calculate_cost(item, ore_prices, recipe_index, cache, industry_settings=industry_settings)
+    for item in dirty:
+        old = old_prices.get(item)
+        if isinstance(old, dict) and item in cache and not isinstance(cache[item], dict):
+            cache[item] = {**old, 'price': cache[item]}
+    return cache
+
+def price_value(value):
+    """Cached prices may be plain numbers or {'price': ...} dicts"""
+    if isinstance(value, dict):
+        return value.get('price')
+    return value
+
+def price_impact(dirty, old_prices, new_prices):
+    """[(item, old, new, change)] for every dirty item whose price moved, largest change first"""
+    impact = []
+    for item in dirty:
+        old = price_value(old_prices.get(item))
+        new = price_value(new_prices.get(item))
+        if old == new:
+            continue
+        if old and new is not None:
+            change = (new - old) / old
+        else:
+            change = float('inf')
+        impact.append((item, old, new, change))
+    impact.sort(key=lambda row: (abs(row[3]), row[0]), reverse=True)
+    return impact
+
+def write_report(diff, dirty, impact, filename="recipe_diff_report.md", top=50):
+    """Write the recipe changes and price impact as markdown"""
+    def fmt(price):
+        return f"{price:,.2f}" if price is not None else "-"
+
+    lines = []
+    lines.append("# Recipe Diff Report")
+    lines.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    lines.append("")
+    lines.append(f"- **Added Recipes**: {len(diff['added'])}")
+    lines.append(f"- **Removed Recipes**: {len(diff['removed'])}")
+    lines.append(f"- **Changed Recipes**: {len(diff['changed'])}")
+    lines.append(f"- **Items Repriced**: {len(dirty)}")
+    lines.append(f"- **Prices Changed**: {len(impact)}")
+    lines.append("")
+
+    lines.append("## Recipe Changes")
+    lines.append("")
+    for recipe in diff['added']:
+        lines.append(f"- ➕ {recipe.get('id')}: {', '.join(recipe_outputs(recipe))}")
+    for recipe in diff['removed']:
+        lines.append(f"- ➖ {recipe.get('id')}: {', '.join(recipe_outputs(recipe))}")
+    for old, new, fields in diff['changed']:
+        lines.append(f"- ✏️ {new.get('id')}: {', '.join(recipe_outputs(new))} ({', '.join(fields)})")
+    lines.append("")
+
+    lines.append("## Price Impact")
+    lines.append("")
+    lines.append("| Item | Old Price | New Price | Change |")
+    lines.append("|------|-----------|-----------|--------|")
+    for item, old, new, change in impact[:top]:
+        change_text = f"{change * 100:+.1f}%" if change != float('inf') else "new/lost"
+        lines.append(f"| {item} | {fmt(old)} | {fmt(new)} | {change_text} |")
+    if len(impact) > top:
+        lines.append(f"| ... and {len(impact) - top} more | | | |")
+    lines.append("")
+
+    with open(filename, "w") as f:
+        f.write("\n".join(lines))
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff two recipe files and reprice only what changed")
+    parser.add_argument('--old', default="recipes.yaml.old")
+    parser.add_argument('--new', default="recipes.yaml")
+    parser.add_argument('--old-prices', default="item_cache.yaml",
+                        help="prices computed from the old recipes (priced from scratch if missing)")
+    parser.add_argument('--write', action='store_true', help="save the repriced cache to item_cache.yaml")
+    parser.add_argument('--verify', action='store_true', help="compare against a full repricing")
+    args = parser.parse_args()
+
+    # Pricing debug output is noise for a diff
+    calculate_prices.DEBUG = False
+
+    with open("ore_prices.yaml", "r") as f:
+        ore_prices = yaml.safe_load(f)
+    manual_prices = load_manual_prices()
+    industry_settings = load_industry_settings()
+
+    start = time.perf_counter()
+    old_recipes = load_recipes_or_exit(args.old)
+    new_recipes = load_recipes_or_exit(args.new)
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    diff = diff_recipes(old_recipes, new_recipes)
+    dirty = affected_items(diff, new_recipes)
+    diff_seconds = time.perf_counter() - start
+
+    if os.path.exists(args.old_prices):
+        old_prices = load_cache_from_file(args.old_prices)
+    else:
+        print(f"⚠️ {args.old_prices} not found, pricing {args.old} from scratch")
+        old_prices = full_prices(old_recipes, ore_prices, manual_prices, industry_settings)
+
+    start = time.perf_counter()
+    new_prices = reprice(dirty, old_prices, new_recipes, ore_prices, manual_prices, industry_settings)
+    reprice_seconds = time.perf_counter() - start
+
+    impact = price_impact(dirty, old_prices, new_prices)
+    write_report(diff, dirty, impact)
+
+    print(f"Loaded {len(old_recipes)} → {len(new_recipes)} recipes in {load_seconds:.2f}s")
+    print(f"   Added: {len(diff['added'])}, removed: {len(diff['removed'])}, changed: {len(diff['changed'])}"
+          f" ({diff_seconds * 1000:.0f} ms)")
+    print(f"   Repriced {len(dirty)} affected items in {reprice_seconds:.2f}s, {len(impact)} prices moved")
+    for item, old, new, change in impact[:10]:
+        old_text = f"{old:,.2f}" if old is not None else "-"
+        new_text = f"{new:,.2f}" if new is not None else "-"
+        change_text = f"{change * 100:+.1f}%" if change != float('inf') else "new/lost"
+        print(f"   {item:30} {old_text:>14} → {new_text:>14}  {change_text}")
+    print("Report saved to: recipe_diff_report.md")
+
+    if args.verify:
+        start = time.perf_counter()
+        expected = full_prices(new_recipes, ore_prices, manual_prices, industry_settings)
+        full_seconds = time.perf_counter() - start
+        mismatches = [item for item, price in expected.items()
+                      if price_value(new_prices.get(item)) != price_value(price)]
+        if mismatches:
+            print(f"❌ {len(mismatches)} prices differ from a full repricing, e.g. {', '.join(sorted(mismatches)[:5])}")
+        else:
+            print(f"✅ Matches a full repricing ({full_seconds:.2f}s)")
+
+    if args.write:
+        save_cache_to_file(new_prices)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Compact recipe model: interned integer item ids and __slots__ recipes
+
+The YAML recipes are lists of single-key dicts ({name: qty}) per input and output.
+Compiling them once gives every item an integer id and every recipe flat tuples
+of (item id, qty), with catalysts split out and the main product quantity and
+time cost precomputed, so the pricing pass is plain list indexing.
+
+Usage:
+    python recipe_model.py    # memory and pricing-pass comparison against the raw recipes
+"""
+
+import sys
+import time
+import tracemalloc
+
+import calculate_prices
+from calculate_prices import CATALYSTS, calculate_time_cost
+from lazy_imports import lazy_import
+
+yaml = lazy_import('yaml')
+
+MISSING = object()  # Price slot not computed yet
+PENDING = object()  # Item pushed on the pricing stack, price not known yet
+
+class Recipe:
+    """One compiled recipe"""
+    __slots__ = ('id', 'input_ids', 'input_qtys', 'catalyst_ids', 'output_ids', 'output_qtys',
+                 'main_qty', 'time', 'entries', 'time_cost', 'industry')
+
+class RecipeBook:
+    """Interned item names, compiled recipes and the recipes producing each item id"""
+    __slots__ = ('names', 'ids', 'recipes', 'by_output')
+
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+        self.recipes = []
+        self.by_output = []
+
+    def intern(self, name):
+        """Integer id of an item name, assigning a new one if needed"""
+        item_id = self.ids.get(name)
+        if item_id is None:
+            item_id = len(self.names)
+            name = sys.intern(name) if isinstance(name, str) else name
+            self.names.append(name)
+            self.ids[name] = item_id
+            self.by_output.append(())
+        return item_id
+
+def compile_recipes(recipes, industry_settings=None):
+    """Compile raw YAML recipes into a RecipeBook (recipe order is preserved)"""
+    book = RecipeBook()
+    by_output = {}
+
+    for raw in recipes:
+        recipe = Recipe()
+        recipe.id = raw.get('id')
+        recipe.time = raw.get('time', 0)
+        recipe.entries = len(raw.get('in', []))
+        recipe.time_cost, recipe.industry = calculate_time_cost(raw, industry_settings)
+
+        input_ids, input_qtys, catalyst_ids = [], [], []
+        for inp in raw.get('in', []):
+            for name, qty in inp.items():
+                if name in CATALYSTS:
+                    catalyst_ids.append(book.intern(name))
+                else:
+                    input_ids.append(book.intern(name))
+                    input_qtys.append(qty)
+
+        output_ids, output_qtys = [], []
+        for out in raw.get('out', []):
+            for name, qty in out.items():
+                output_ids.append(book.intern(name))
+                output_qtys.append(qty)
+
+        recipe.input_ids = tuple(input_ids)
+        recipe.input_qtys = tuple(input_qtys)
+        recipe.catalyst_ids = tuple(catalyst_ids)
+        recipe.output_ids = tuple(output_ids)
+        recipe.output_qtys = tuple(output_qtys)
+        # calculate_cost prices per unit of the first output
+        recipe.main_qty = output_qtys[0] if output_qtys else 0
+        book.recipes.append(recipe)
+
+        for item_id in output_ids:
+            producers = by_output.setdefault(item_id, [])
+            # An item listed twice in one recipe only needs the recipe once
+            if not producers or producers[-1] is not recipe:
+                producers.append(recipe)
+
+    for item_id, producers in by_output.items():
+        book.by_output[item_id] = tuple(producers)
+    return book
+
+def price_items(book, items, ore_prices, cache, time_scale=1.0):
+    """Price item names with the same rules (and results) as calculate_cost
+
+    cache is the usual name -> price dict; it is read once and every price
+    computed here is written back to it. time_scale multiplies every recipe's
+    time cost (scenarios with a different TIME_COST_FACTOR).
+    """
+    names = book.names
+    by_output = book.by_output
+    prices = [MISSING] * len(names)
+    for name, value in cache.items():
+        item_id = book.ids.get(name)
+        if item_id is not None:
+            prices[item_id] = value.get('price') if isinstance(value, dict) else value
+    preloaded = [value is not MISSING for value in prices]
+
+    catalyst = [name in CATALYSTS for name in names]
+    ore = [ore_prices.get(name, MISSING) for name in names]
+    debug = calculate_prices.DEBUG
+    # Shared path set: calculate_cost's per-call copies always equal the current path
+    visited = set()
+    # Explicit stack of items being priced (no recursion limit on deep recipe chains)
+    # Frame: [item id, recipe index, input index, input cost, missing input, value, best cost]
+    stack = []
+
+    def enter(item_id):
+        """Price of an item that needs no recipe walk, or PENDING after pushing its frame"""
+        value = prices[item_id]
+        if value is not MISSING:
+            return value
+        if item_id in visited:
+            if debug:
+                print(f"⚠️ Circular dependency detected for {names[item_id]}")
+            prices[item_id] = None
+            return None
+        if catalyst[item_id]:
+            prices[item_id] = 0
+            return 0
+        if ore[item_id] is not MISSING:
+            prices[item_id] = ore[item_id]
+            return prices[item_id]
+        visited.add(item_id)
+        stack.append([item_id, 0, 0, 0, False, None, float('inf')])
+        return PENDING
+
+    def cost(root):
+        value = enter(root)
+        if value is not PENDING:
+            return value
+
+        while stack:
+            frame = stack[-1]
+            item_id, recipe_index, input_index = frame[0], frame[1], frame[2]
+            producers = by_output[item_id]
+
+            if recipe_index < len(producers):
+                recipe = producers[recipe_index]
+                if input_index < len(recipe.input_ids):
+                    frame[2] = input_index + 1
+                    sub_cost = enter(recipe.input_ids[input_index])
+                    if sub_cost is PENDING:
+                        continue  # Added to this frame when the input's frame finishes
+                    if sub_cost is None:
+                        frame[4] = True
+                    else:
+                        frame[3] += sub_cost * recipe.input_qtys[input_index]
+                    continue
+
+                # Every input priced: keep the cheapest complete recipe
+                if not frame[4]:
+                    final_cost = frame[3] / recipe.main_qty + recipe.time_cost * time_scale
+                    if final_cost < frame[6]:
+                        frame[6] = final_cost
+                        frame[5] = final_cost
+                frame[1] = recipe_index + 1
+                frame[2] = 0
+                frame[3] = 0
+                frame[4] = False
+                continue
+
+            value = frame[5]
+            if value is None and debug:
+                reason = "No valid recipe" if producers else "No recipe"
+                print(f"⚠️ {reason} found for {names[item_id]}")
+            prices[item_id] = value
+            visited.remove(item_id)
+            stack.pop()
+
+            if stack:
+                parent = stack[-1]
+                parent_recipe = by_output[parent[0]][parent[1]]
+                if value is None:
+                    parent[4] = True
+                else:
+                    parent[3] += value * parent_recipe.input_qtys[parent[2] - 1]
+        return value
+
+    results = {}
+    for name in items:
+        item_id = book.ids.get(name)
+        results[name] = cost(item_id) if item_id is not None else None
+
+    for item_id, value in enumerate(prices):
+        if value is not MISSING and not preloaded[item_id]:
+            cache[names[item_id]] = value
+    return results
+
+def recipe_choices(book, cache, ore_prices, time_scale=1.0):
+    """{item: {'recipe': id, 'industry': name}} for every recipe-priced item in cache
+
+    The same entries calculate_cost records in its `choices` dict: each
+    item's recipes are compared at the cache's input prices, in recipe order,
+    and the cheapest complete one wins. Items priced from the cache before a
+    run get their choice too, so the result covers the whole catalog.
+    """
+    prices = [MISSING] * len(book.names)
+    for name, value in cache.items():
+        item_id = book.ids.get(name)
+        if item_id is not None:
+            prices[item_id] = value.get('price') if isinstance(value, dict) else value
+
+    choices = {}
+    for item_id, producers in enumerate(book.by_output):
+        name = book.names[item_id]
+        if not producers or name in CATALYSTS or name in ore_prices or prices[item_id] is None:
+            continue
+        best, best_cost = None, float('inf')
+        for recipe in producers:
+            input_cost = 0
+            for input_id, qty in zip(recipe.input_ids, recipe.input_qtys):
+                price = prices[input_id]
+                if price is MISSING or price is None:
+                    break
+                input_cost += price * qty
+            else:
+                final_cost = input_cost / recipe.main_qty + recipe.time_cost * time_scale
+                if final_cost < best_cost:
+                    best, best_cost = recipe, final_cost
+        if best is not None:
+            choices[name] = {'recipe': best.id, 'industry': best.industry}
+    return choices
+
+def recipe_info(book, name):
+    """(time, input entries) of the first recipe producing an item, or (0, 1)"""
+    item_id = book.ids.get(name)
+    if item_id is not None and book.by_output[item_id]:
+        recipe = book.by_output[item_id][0]
+        return recipe.time, recipe.entries
+    return 0, 1
+
+def measure(function, *args):
+    """(result, bytes still allocated by the call)"""
+    tracemalloc.start()
+    result = function(*args)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+def main():
+    calculate_prices.DEBUG = False
+
+    with open("ore_prices.yaml", "r") as f:
+        ore_prices = yaml.safe_load(f)
+    manual_prices = calculate_prices.load_manual_prices()
+
+    raw, raw_bytes = measure(calculate_prices.load_recipes_or_exit, "recipes.yaml")
+    book, book_bytes = measure(compile_recipes, raw)
+    print(f"Recipes: {len(raw)}, items: {len(book.names)}")
+    print(f"   Raw YAML recipes:  {raw_bytes / 1024 / 1024:8.2f} MiB")
+    print(f"   Compiled book:     {book_bytes / 1024 / 1024:8.2f} MiB (names shared with the raw data)")
+
+    items = [name for name in calculate_prices.build_recipe_index(raw) if name not in ore_prices]
+
+    runs = 5
+    start = time.perf_counter()
+    for _ in range(runs):
+        index = calculate_prices.build_recipe_index(raw)
+        cache = dict(manual_prices)
+        for item in items:
+            calculate_prices.calculate_cost(item, ore_prices, index, cache)
+    raw_seconds = (time.perf_counter() - start) / runs
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        compact_cache = dict(manual_prices)
+        price_items(book, items, ore_prices, compact_cache)
+    compact_seconds = (time.perf_counter() - start) / runs
+
+    same = compact_cache == cache
+    print(f"Pricing pass ({len(items)} items):")
+    print(f"   Raw recipes:       {raw_seconds * 1000:8.1f} ms")
+    print(f"   Compiled book:     {compact_seconds * 1000:8.1f} ms ({raw_seconds / compact_seconds:.1f}x)")
+    print("✅ Identical prices" if same else "❌ Prices differ")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Scaling check: price a large synthetic catalog and generate its markets
+
+Builds a modded-economy sized catalog (100k items by default, including one
+recipe chain far deeper than Python's recursion limit) as JSONL, then runs the
+scaling path against SCALE_BUDGET:
+- recipes are streamed and validated (load_recipes) straight into the compiled recipe model,
+  never materialized as a list of dicts
+- every item is priced with the iterative price_items
+- markets for 500 planets are generated with the shared strategy, the role
+  matrix and array quotes, one planet's quotes in memory at a time
+A smaller catalog is also priced with calculate_cost to check that the
+scaling path gives exactly the same prices.
+
+Usage:
+    python scale_check.py [--items 100000] [--planets 500] [--chain-depth 20000]
+Exits with status 1 when a check fails or a stage is over budget.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+import calculate_prices
+from calculate_prices import build_recipe_index, calculate_cost, load_recipes
+from recipe_model import compile_recipes, price_items
+
+
+# Seconds per stage and peak resident memory for the default sizes on a single core
+# (about 45M market rows; writing the CSVs dominates the markets stage)
+SCALE_BUDGET = {
+    'load_seconds': 10,
+    'price_seconds': 5,
+    'markets_seconds': 400,
+    'peak_memory_mb': 1000
+}
+
+SCALE_DEFAULTS = {
+    'items': 100000,
+    'planets': 500,
+    'chain_depth': 20000,  # Longest recipe chain (recursion limit is 1000)
+    'ores': 40,
+    'seed': 42
+}
+
+def peak_memory_mb():
+    """Peak resident memory of this process so far (ru_maxrss is KiB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def synthetic_ore_prices(ores):
+    return {f"ScaleOre{k}": 5 + 45 * k / max(1, ores - 1) for k in range(ores)}
+
+def write_synthetic_catalog(filename, items, chain_depth, ore_prices, seed=SCALE_DEFAULTS['seed']):
+    """Write `items` recipe outputs as JSONL (one recipe per line)
+
+    Parts take 1-3 inputs from ores and earlier parts, one in ten has an
+    alternative recipe and one in a thousand is a Warp item (ultra rare);
+    chain_depth items form a single chain where each needs the previous one.
+    """
+    rng = random.Random(seed)
+    ores = list(ore_prices)
+    parts = []
+    count = 0
+    with open(filename, 'w') as f:
+        def write(recipe):
+            nonlocal count
+            count += 1
+            recipe['id'] = f"scale_{count}"
+            f.write(json.dumps(recipe, separators=(',', ':')) + "\n")
+
+        for i in range(max(0, items - chain_depth)):
+            name = f"WarpPart{i}" if i % 1000 == 999 else f"Part{i}"
+            for _ in range(2 if i % 10 == 0 else 1):
+                inputs = {}
+                for _ in range(rng.randint(1, 3)):
+                    source = parts if parts and rng.random() < 0.7 else ores
+                    inputs[rng.choice(source)] = rng.randint(1, 3)
+                if rng.random() < 0.05:
+                    inputs['Catalyst1'] = 1
+                # Output quantity = input units, so a part costs about the average of its inputs plus time
+                out_qty = sum(qty for input_name, qty in inputs.items() if input_name != 'Catalyst1')
+                write({'in': [{input_name: qty} for input_name, qty in inputs.items()],
+                       'out': [{name: out_qty}], 'time': rng.randint(1, 60), 'industries': ['IndustryAssemblyM']})
+            parts.append(name)
+
+        previous = ores[0]
+        for j in range(chain_depth):
+            name = f"Chain{j}"
+            write({'in': [{previous: 1}], 'out': [{name: 1}], 'time': 1, 'industries': ['IndustryRefiner']})
+            previous = name
+    return count
+
+def output_names(book, ore_prices):
+    """Every recipe output that is not a base material"""
+    return [name for item_id, name in enumerate(book.names) if book.by_output[item_id] and name not in ore_prices]
+
+def check_prices_match(directory, ore_prices):
+    """price_items against calculate_cost on a catalog calculate_cost can recurse through"""
+    filename = os.path.join(directory, 'small.jsonl')
+    write_synthetic_catalog(filename, 3000, 300, ore_prices, seed=7)
+    raw = list(load_recipes(filename))
+    book = compile_recipes(raw)
+    items = output_names(book, ore_prices)
+
+    index = build_recipe_index(raw)
+    cache = {}
+    for item in items:
+        calculate_cost(item, ore_prices, index, cache)
+    compact_cache = {}
+    price_items(book, items, ore_prices, compact_cache)
+    return compact_cache == cache, len(items)
+
+def run_scale_check(items, planets, chain_depth, ores=SCALE_DEFAULTS['ores']):
+    """Run every stage; returns (results, failures)"""
+    from generate_all_markets import RARE_PLACEMENT, generate_markets, prices_from_cache
+
+    calculate_prices.DEBUG = False
+    ore_prices = synthetic_ore_prices(ores)
+    results = {}
+    failures = []
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory(prefix='scale_check_') as directory:
+        catalog = os.path.join(directory, 'recipes.jsonl')
+        recipe_count = write_synthetic_catalog(catalog, items, chain_depth, ore_prices)
+        print(f"Synthetic catalog: {recipe_count} recipes for {items} items "
+              f"({os.path.getsize(catalog) / 1024 / 1024:.1f} MiB JSONL), chain depth {chain_depth}")
+
+        same, checked = check_prices_match(directory, ore_prices)
+        print(f"{'✅' if same else '❌'} price_items matches calculate_cost on {checked} items")
+        if not same:
+            failures.append('prices differ from calculate_cost')
+
+        start = time.perf_counter()
+        book = compile_recipes(load_recipes(catalog))
+        results['load_seconds'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cache = {}
+        costs = price_items(book, output_names(book, ore_prices), ore_prices, cache)
+        results['price_seconds'] = time.perf_counter() - start
+        priced = sum(1 for cost in costs.values() if cost)
+        print(f"Priced {priced} of {len(costs)} items")
+        if priced != len(costs):
+            failures.append(f"{len(costs) - priced} items could not be priced")
+
+        prices = prices_from_cache(cache, ore_prices)
+        planet_ids = [str(100 + i) for i in range(planets)]
+        os.chdir(directory)
+        try:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = generate_markets(prices, planet_ids, book, 'markets', RARE_PLACEMENT,
+                                          keep_quotes=False, save_artifact=False)
+            results['markets_seconds'] = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+        print(f"Generated {result['rows']:,} market rows for {planets} planets")
+
+    results['peak_memory_mb'] = peak_memory_mb()
+    return results, failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Price a large synthetic catalog and generate its markets")
+    parser.add_argument('--items', type=int, default=SCALE_DEFAULTS['items'])
+    parser.add_argument('--planets', type=int, default=SCALE_DEFAULTS['planets'])
+    parser.add_argument('--chain-depth', type=int, default=SCALE_DEFAULTS['chain_depth'])
+    args = parser.parse_args()
+
+    results, failures = run_scale_check(args.items, args.planets, args.chain_depth)
+
+    print(f"\n{'Stage':18} {'Result':>10} {'Budget':>10}")
+    for name, budget in SCALE_BUDGET.items():
+        value = results[name]
+        status = "✅" if value <= budget else "❌"
+        if value > budget:
+            failures.append(f"{name} over budget")
+        print(f"{name:18} {value:>10.1f} {budget:>10}  {status}")
+
+    if failures:
+        print(f"\n❌ Scale check failed: {', '.join(failures)}")
+        sys.exit(1)
+    print("\n✅ Scale check within budget")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Parallel scenario pricing: many ore-price / time-cost variants across all cores
+
+The compiled recipe book is built once in the parent. Workers are forked after
+that, so they inherit it read-only and each task only carries its small scenario
+dict. Results are streamed to a JSON-lines file as scenarios finish.
+
+Scenario file (YAML, one document per scenario or a list):
+    name: iron_shortage
+    ore_prices: {IronOre: 60}
+    time_cost_factor: 3.0
+
+Usage:
+    python scenario_runner.py scenarios.yaml [--workers 4] [--items WarpDriveSmall ...]
+    python scenario_runner.py --benchmark 200
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import time
+
+import calculate_prices
+from calculate_prices import TIME_COST_FACTOR, load_recipes_or_exit, load_industry_settings, load_manual_prices
+from recipe_model import compile_recipes, price_items
+from lazy_imports import lazy_import
+
+yaml = lazy_import('yaml')
+
+# Read-only pricing state: set in the parent before forking, or once per worker otherwise
+_SHARED = {}
+
+def load_shared_state():
+    """Everything a worker needs to price a scenario"""
+    with open("ore_prices.yaml", "r") as f:
+        ore_prices = yaml.safe_load(f)
+    recipes = load_recipes_or_exit("recipes.yaml")
+    book = compile_recipes(recipes, load_industry_settings())
+    items = sorted(name for name in book.names if book.by_output[book.ids[name]] and name not in ore_prices)
+    return {
+        'book': book,
+        'ore_prices': ore_prices,
+        'manual_prices': load_manual_prices(),
+        'items': items
+    }
+
+def _init_worker(state):
+    """Pool initializer for platforms without fork: state is pickled once per worker"""
+    _SHARED.update(state)
+    calculate_prices.DEBUG = False
+
+def price_scenario(scenario):
+    """Price every item (or scenario['items']) under one scenario"""
+    ore_prices = dict(_SHARED['ore_prices'])
+    ore_prices.update(scenario.get('ore_prices') or {})
+    time_scale = scenario.get('time_cost_factor', TIME_COST_FACTOR) / TIME_COST_FACTOR
+
+    start = time.perf_counter()
+    cache = dict(_SHARED['manual_prices'])
+    prices = price_items(_SHARED['book'], _SHARED['items'], ore_prices, cache, time_scale)
+    if scenario.get('items'):
+        prices = {item: prices.get(item, cache.get(item)) for item in scenario['items']}
+
+    return {
+        'scenario': scenario.get('name'),
+        'ore_prices': scenario.get('ore_prices') or {},
+        'time_cost_factor': scenario.get('time_cost_factor', TIME_COST_FACTOR),
+        'seconds': round(time.perf_counter() - start, 4),
+        'prices': {item: round(price, 2) if price is not None else None for item, price in prices.items()}
+    }
+
+def load_scenarios(filename):
+    """Scenarios from a YAML file with one document per scenario or a single list"""
+    with open(filename, 'r') as f:
+        documents = [doc for doc in yaml.safe_load_all(f) if doc]
+    if len(documents) == 1 and isinstance(documents[0], list):
+        documents = documents[0]
+    for i, scenario in enumerate(documents):
+        scenario.setdefault('name', f"scenario_{i + 1}")
+    return documents
+
+def random_scenarios(count, ore_prices, spread=0.3, seed=42):
+    """Random ore price and time cost variants, for benchmarking"""
+    rng = random.Random(seed)
+    ores = [ore for ore, price in ore_prices.items() if price]
+    scenarios = []
+    for i in range(count):
+        changed = rng.sample(ores, min(3, len(ores)))
+        scenarios.append({
+            'name': f"random_{i + 1}",
+            'ore_prices': {ore: round(ore_prices[ore] * rng.uniform(1 - spread, 1 + spread), 2) for ore in changed},
+            'time_cost_factor': round(TIME_COST_FACTOR * rng.uniform(0.5, 1.5), 3)
+        })
+    return scenarios
+
+def make_pool(workers, state):
+    """Process pool whose workers share the pricing state without per-task pickling"""
+    if 'fork' in multiprocessing.get_all_start_methods():
+        # Forked workers inherit _SHARED copy-on-write
+        _SHARED.update(state)
+        calculate_prices.DEBUG = False
+        return multiprocessing.get_context('fork').Pool(workers)
+    return multiprocessing.Pool(workers, initializer=_init_worker, initargs=(state,))
+
+def run_scenarios(scenarios, state, workers, output=None, chunksize=None):
+    """Price scenarios on `workers` processes, streaming JSON lines to `output`
+
+    Returns (scenario count, elapsed seconds).
+    """
+    start = time.perf_counter()
+    out = open(output, 'w') if output else None
+    count = 0
+    pool = None
+    try:
+        if workers <= 1:
+            _init_worker(state)
+            results = map(price_scenario, scenarios)
+        else:
+            pool = make_pool(workers, state)
+            # A few chunks per worker: fewer round trips, still balanced
+            chunksize = chunksize or max(1, len(scenarios) // (workers * 4))
+            results = pool.imap_unordered(price_scenario, scenarios, chunksize)
+        for result in results:
+            count += 1
+            if out:
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+        if pool:
+            pool.close()
+            pool.join()
+    finally:
+        if pool:
+            # No-op after a clean join; stops the workers if a scenario raised
+            pool.terminate()
+        if out:
+            out.close()
+    return count, time.perf_counter() - start
+
+def benchmark(state, count, max_workers):
+    """Scenarios per second from 1 worker up to max_workers"""
+    scenarios = random_scenarios(count, state['ore_prices'])
+    counts = sorted({1, max_workers} | {n for n in (2, 4, 8, 16, 32) if n < max_workers})
+
+    print(f"{'Workers':>8} {'Seconds':>9} {'Scenarios/s':>12} {'Speedup':>8}")
+    baseline = None
+    for workers in counts:
+        _, elapsed = run_scenarios(scenarios, state, workers)
+        rate = count / elapsed
+        baseline = baseline or rate
+        print(f"{workers:>8} {elapsed:>9.2f} {rate:>12.1f} {rate / baseline:>7.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Price many scenarios in parallel")
+    parser.add_argument('scenarios', nargs='?', help="YAML scenario file")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--items', nargs='*', help="only record these items")
+    parser.add_argument('--output', default="scenario_results.jsonl")
+    parser.add_argument('--benchmark', type=int, metavar='N', help="time N random scenarios on 1..--workers workers")
+    args = parser.parse_args()
+
+    calculate_prices.DEBUG = False
+
+    start = time.perf_counter()
+    state = load_shared_state()
+    print(f"Compiled {len(state['book'].recipes)} recipes, {len(state['items'])} items "
+          f"in {time.perf_counter() - start:.2f}s")
+
+    if args.benchmark:
+        benchmark(state, args.benchmark, args.workers)
+        return
+
+    if not args.scenarios:
+        parser.print_help()
+        return
+
+    scenarios = load_scenarios(args.scenarios)
+    if args.items:
+        for scenario in scenarios:
+            scenario.setdefault('items', args.items)
+
+    count, elapsed = run_scenarios(scenarios, state, args.workers, args.output)
+    print(f"Priced {count} scenarios on {args.workers} workers in {elapsed:.2f}s "
+          f"({count / elapsed:.1f} scenarios/s)")
+    print(f"Results streamed to: {args.output}")
+
+if __name__ == "__main__":
+    main()
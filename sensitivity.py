@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Sensitivity of every item price to every ore price
+
+With the chosen recipes fixed, an item's price is linear in the ore prices:
+price = ores_per_unit · ore_prices + constant (time cost and manual prices).
+ores_per_unit is the item's row of the bill-of-materials matrix and is built in
+one pass over the production graph, inputs before products.
+
+Alternative recipes are linear too, so for every item with more than one recipe
+the report also shows the smallest single-ore price move that would make another
+recipe cheaper (other items' recipe choices held fixed).
+
+Usage:
+    python sensitivity.py [--item Warp] [--ore IronOre] [--top 20]
+"""
+
+import argparse
+import time
+
+import calculate_prices
+from calculate_prices import *
+from market_writer import write_csv_atomic
+from production_planner import build_production_graph
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+yaml = lazy_import('yaml')
+
+def main_output_quantity(recipe):
+    """Quantity of a recipe's first output, the unit calculate_cost prices by"""
+    outputs = recipe.get('out') or [{}]
+    return next(iter(outputs[0].values()), 0)
+
+def linear_recipe_cost(recipe, ore_index, gradients, constants, prices, industry_settings=None):
+    """(ores_per_unit, constant) of one recipe given its inputs' linear costs, or None if unpriceable"""
+    quantity = main_output_quantity(recipe)
+    if not quantity:
+        return None
+    gradient = np.zeros(len(ore_index))
+    constant = 0.0
+    for inp in recipe.get('in', []):
+        for name, qty in inp.items():
+            if name in CATALYSTS:
+                continue
+            if name in ore_index:
+                gradient[ore_index[name]] += qty
+            elif name in gradients:
+                gradient += qty * gradients[name]
+                constant += qty * constants[name]
+            elif prices.get(name) is not None:
+                # Manually priced items don't depend on ores
+                constant += qty * prices[name]
+            else:
+                return None
+    time_cost, _ = calculate_time_cost(recipe, industry_settings)
+    return gradient / quantity, constant / quantity + time_cost
+
+def build_sensitivity(graph, recipes, industry_settings=None):
+    """Item x ore sensitivity matrix plus the cost lines of alternative recipes
+
+    Returns {'items', 'ores', 'matrix' (d item price / d ore price), 'constant',
+    'alternatives': {item: [(recipe_id, gradient, constant)]}}.
+    """
+    ore_prices = graph['ore_prices']
+    ores = list(ore_prices.keys())
+    ore_index = {ore: i for i, ore in enumerate(ores)}
+    recipes_by_id = {r.get('id'): r for r in recipes}
+    recipe_index = build_recipe_index(recipes)
+
+    gradients = {}
+    constants = {}
+    # graph['order'] lists products before their inputs
+    for item in reversed(graph['order']):
+        node = graph['nodes'][item]
+        line = linear_recipe_cost(recipes_by_id[node['recipe']], ore_index, gradients, constants,
+                                  graph['prices'], industry_settings)
+        if line is not None:
+            gradients[item], constants[item] = line
+
+    items = sorted(gradients)
+    alternatives = {}
+    for item in items:
+        chosen = graph['nodes'][item]['recipe']
+        lines = []
+        for recipe in recipe_index.get(item, []):
+            if recipe.get('id') == chosen:
+                continue
+            line = linear_recipe_cost(recipe, ore_index, gradients, constants,
+                                      graph['prices'], industry_settings)
+            if line is not None:
+                lines.append((recipe.get('id'), line[0], line[1]))
+        if lines:
+            alternatives[item] = lines
+
+    return {
+        'items': items,
+        'ores': ores,
+        'ore_prices': np.array([ore_prices[ore] or 0.0 for ore in ores], dtype=float),
+        'matrix': np.array([gradients[item] for item in items]).reshape(len(items), len(ores)),
+        'constant': np.array([constants[item] for item in items]),
+        'alternatives': alternatives
+    }
+
+def flip_points(sensitivity):
+    """Smallest single-ore price move that makes an alternative recipe cheapest, per item
+
+    Returns {item: (ore, new_ore_price, recipe_id)}. Only moves that keep the ore
+    price non-negative count.
+    """
+    ores = sensitivity['ores']
+    ore_prices = sensitivity['ore_prices']
+    row_of = {item: i for i, item in enumerate(sensitivity['items'])}
+    flips = {}
+
+    for item, lines in sensitivity['alternatives'].items():
+        row = row_of[item]
+        chosen_gradient = sensitivity['matrix'][row]
+        chosen_cost = chosen_gradient @ ore_prices + sensitivity['constant'][row]
+        best = None
+        for recipe_id, gradient, constant in lines:
+            gap = gradient @ ore_prices + constant - chosen_cost
+            slope = gradient - chosen_gradient
+            with np.errstate(divide='ignore', invalid='ignore'):
+                move = np.where(slope != 0, -gap / slope, np.inf)
+            # The move must point the right way and keep the ore price valid
+            move = np.where(ore_prices + move >= 0, move, np.inf)
+            k = int(np.argmin(np.abs(move)))
+            if np.isfinite(move[k]) and (best is None or abs(move[k]) < abs(best[0])):
+                best = (move[k], ores[k], recipe_id)
+        if best is not None:
+            move, ore, recipe_id = best
+            flips[item] = (ore, ore_prices[ores.index(ore)] + move, recipe_id)
+    return flips
+
+def write_matrix(sensitivity, filename="sensitivity_matrix.csv"):
+    """Full item x ore matrix as CSV (ore units consumed per item unit)"""
+    rows = [['item'] + sensitivity['ores']]
+    for item, gradient in zip(sensitivity['items'], sensitivity['matrix']):
+        rows.append([item] + [f"{value:.6g}" if value else "0" for value in gradient])
+    write_csv_atomic(filename, rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Item x ore price sensitivity")
+    parser.add_argument('--item', help="only items whose name contains this text")
+    parser.add_argument('--ore', help="list the items this ore moves most")
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--output', default="sensitivity_matrix.csv")
+    args = parser.parse_args()
+
+    # Pricing debug output is noise for an analysis
+    calculate_prices.DEBUG = False
+
+    with open("ore_prices.yaml", "r") as f:
+        ore_prices = yaml.safe_load(f)
+    recipes = load_recipes_or_exit("recipes.yaml")
+    industry_settings = load_industry_settings()
+    graph = build_production_graph(recipes, ore_prices, industry_settings, load_manual_prices())
+
+    start = time.perf_counter()
+    sensitivity = build_sensitivity(graph, recipes, industry_settings)
+    flips = flip_points(sensitivity)
+    elapsed = time.perf_counter() - start
+
+    matrix = sensitivity['matrix']
+    prices = matrix @ sensitivity['ore_prices'] + sensitivity['constant']
+    expected = np.array([graph['prices'][item] for item in sensitivity['items']])
+    error = np.max(np.abs(prices - expected) / np.maximum(expected, 1.0)) if len(expected) else 0.0
+
+    write_matrix(sensitivity, args.output)
+    print(f"Sensitivity of {len(sensitivity['items'])} items to {len(sensitivity['ores'])} ores "
+          f"in {elapsed:.2f}s (max reconstruction error {error:.1e})")
+    print(f"Full matrix saved to: {args.output}")
+
+    # Share of each item's price that comes from each ore
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shares = np.where(prices[:, None] > 0, matrix * sensitivity['ore_prices'] / prices[:, None], 0.0)
+
+    if args.ore:
+        k = sensitivity['ores'].index(args.ore)
+        print(f"\n=== Items most exposed to {args.ore} ===")
+        print(f"{'Item':30} {'Price':>12} {'Ore/unit':>10} {'Share':>7}")
+        for row in np.argsort(-shares[:, k], kind='stable')[:args.top]:
+            print(f"{sensitivity['items'][row]:30} {prices[row]:>12,.2f} {matrix[row, k]:>10.3g} "
+                  f"{shares[row, k] * 100:>6.1f}%")
+        return
+
+    rows = range(len(sensitivity['items']))
+    if args.item:
+        needle = args.item.lower()
+        rows = [row for row in rows if needle in sensitivity['items'][row].lower()]
+
+    print(f"\n{'Item':30} {'Price':>12}  {'Top ores (share of price)':44} Recipe flip")
+    for row in list(rows)[:args.top]:
+        item = sensitivity['items'][row]
+        top = [k for k in np.argsort(-shares[row], kind='stable')[:3] if shares[row, k] > 0]
+        ores_text = ", ".join(f"{sensitivity['ores'][k]} {shares[row, k] * 100:.0f}%" for k in top)
+        flip = flips.get(item)
+        flip_text = f"{flip[0]} @ {flip[1]:,.2f} → {flip[2]}" if flip else "-"
+        print(f"{item:30} {prices[row]:>12,.2f}  {ores_text:44} {flip_text}")
+
+    print(f"\n{len(flips)} items would switch recipe on a single ore price move")
+
+if __name__ == "__main__":
+    main()
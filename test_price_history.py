@@ -0,0 +1,45 @@
+"""Tests for price_history.py (run with python -m pytest)"""
+
+import sys
+
+import price_history
+from price_history import breakdown_hash, diff_runs, open_history, record_run
+
+def record(tmp_path, prices, choices=None):
+    return record_run(prices, {'IronOre': 5.0}, choices, recipes_file=str(tmp_path / 'none.yaml'),
+                      filename=str(tmp_path / 'history.sqlite'))
+
+def test_record_run_accepts_cache_with_item_ids(tmp_path):
+    cache = {'IronPure': 40.11, 'WarpDriveSmall': {'price': 125000.0, 'id': 4152}, 'Unpriced': {'id': 7}}
+    run_id = record(tmp_path, cache)
+
+    conn = open_history(str(tmp_path / 'history.sqlite'))
+    stored = dict(conn.execute("SELECT item, price FROM prices WHERE run_id = ?", (run_id,)).fetchall())
+    conn.close()
+    assert stored == {'IronPure': 40.11, 'WarpDriveSmall': 125000.0, 'Unpriced': None}
+
+def test_breakdown_hash_covers_recipe_and_industry():
+    prices = {'IronPure': 40.11}
+    base = breakdown_hash(prices, {'IronPure': {'recipe': 1, 'industry': 'IndustryRefiner'}})
+    assert base == breakdown_hash(prices, {'IronPure': {'recipe': 1, 'industry': 'IndustryRefiner'}})
+    assert base != breakdown_hash(prices, {'IronPure': {'recipe': 2, 'industry': 'IndustryRefiner'}})
+    assert base != breakdown_hash(prices, {'IronPure': {'recipe': 1, 'industry': 'IndustryRefiner2'}})
+    assert base != breakdown_hash({'IronPure': 40.12}, {'IronPure': {'recipe': 1, 'industry': 'IndustryRefiner'}})
+
+def test_diff_lists_missing_prices_and_one_sided_items(tmp_path, monkeypatch, capsys):
+    old = record(tmp_path, {'IronPure': 40.0, 'Gone': 3.0, 'Lost': 10.0})
+    new = record(tmp_path, {'IronPure': None, 'Lost': 12.0, 'Fresh': 7.5})
+
+    conn = open_history(str(tmp_path / 'history.sqlite'))
+    diff = diff_runs(conn, old, new)
+    conn.close()
+    assert [row[:3] for row in diff['changed']] == [('IronPure', 40.0, None), ('Lost', 10.0, 12.0)]
+    assert diff['added'] == [('Fresh', 7.5)]
+    assert diff['removed'] == [('Gone', 3.0)]
+
+    monkeypatch.setattr(sys, 'argv', ['price_history.py', '--db', str(tmp_path / 'history.sqlite'), 'diff'])
+    price_history.main()
+    output = capsys.readouterr().out
+    assert "IronPure" in output and "40.00 →            -" in output
+    assert "added   Fresh" in output
+    assert "removed Gone" in output
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Trade route optimizer: best cargo per planet pair and best multi-hop loops
+
+For every ordered pair of planets, the items one planet sells below another
+planet's buy price are packed into a ship with limited cargo volume and budget.
+Travel cost comes from a local distance table (planet_distances.yaml).
+
+Usage:
+    python trade_route_optimizer.py --cargo-volume 5000 --budget 2000000 [--max-hops 3]
+"""
+
+import argparse
+import heapq
+import itertools
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from market_snapshot import DEFAULT_MARKET_DIR, load_market_snapshot, index_quotes_by_item
+from lazy_imports import lazy_import
+
+yaml = lazy_import('yaml')
+
+DISTANCES_FILE = "planet_distances.yaml"
+
+# Used when planet_distances.yaml is missing or leaves a value out
+DEFAULT_TRAVEL = {
+    'default_distance': 50.0,    # Distance between planets without an entry
+    'cost_per_distance': 100.0,  # Travel cost per unit of distance
+    'unit_volume': 1.0,          # Cargo volume per item unit without an entry
+    'distances': {},             # planet -> planet -> distance (symmetric)
+    'item_volumes': {}           # item -> cargo volume per unit
+}
+
+def load_travel_table(filename=DISTANCES_FILE):
+    """Load the distance/travel-cost table, filling gaps with DEFAULT_TRAVEL
+
+    Raises ValueError for a negative unit or item volume; a volume of 0 means
+    the item takes no cargo space.
+    """
+    table = dict(DEFAULT_TRAVEL)
+    try:
+        with open(filename, 'r') as f:
+            table.update(yaml.safe_load(f) or {})
+    except FileNotFoundError:
+        pass
+
+    # Normalize to symmetric (str, str) keys
+    distances = {}
+    for origin, targets in (table.get('distances') or {}).items():
+        for target, distance in (targets or {}).items():
+            distances[(str(origin), str(target))] = float(distance)
+            distances[(str(target), str(origin))] = float(distance)
+    table['distances'] = distances
+    table['item_volumes'] = table.get('item_volumes') or {}
+    if float(table['unit_volume']) < 0:
+        raise ValueError(f"{filename}: unit_volume must not be negative")
+    negative = sorted(item for item, volume in table['item_volumes'].items() if float(volume) < 0)
+    if negative:
+        raise ValueError(f"{filename}: negative item volumes for {', '.join(negative)}")
+    return table
+
+def travel_cost(table, origin, target):
+    """Cost of flying from one planet to another"""
+    distance = table['distances'].get((origin, target), table['default_distance'])
+    return distance * table['cost_per_distance']
+
+def build_route_candidates(snapshot):
+    """Index every profitable (seller planet, buyer planet) item quote once
+
+    Returns {(origin, target): [(item, ask, bid, max_units)]} where max_units is
+    limited by the order depth on both sides.
+    """
+    candidates = defaultdict(list)
+    for item, quotes in index_quotes_by_item(snapshot).items():
+        buys = quotes['buy']
+        if not buys:
+            continue
+        for origin, ask, sell_orders in quotes['sell']:
+            # Buy quotes are sorted highest first: stop at the first unprofitable one
+            for target, bid, buy_orders in buys:
+                if bid <= ask:
+                    break
+                if target != origin:
+                    candidates[(origin, target)].append((item, ask, bid, min(sell_orders, buy_orders)))
+    return candidates
+
+def solve_cargo(candidates, cargo_volume, budget, table):
+    """Pack the most profitable cargo for one route
+
+    Greedy knapsack over both limits: items are taken in order of profit per
+    unit of combined resource use (share of cargo volume plus share of budget),
+    each up to its order depth. A fast heuristic, not an exact solver: with
+    two limits and per-item depths it can miss the best packing.
+    Items with zero volume are limited by budget and order depth only.
+    """
+    if cargo_volume <= 0 or budget <= 0:
+        raise ValueError("cargo volume and budget must be positive")
+    item_volumes = table['item_volumes']
+    default_volume = table['unit_volume']
+
+    def density(candidate):
+        item, ask, bid, _ = candidate
+        volume = item_volumes.get(item, default_volume)
+        return (bid - ask) / (volume / cargo_volume + ask / budget)
+
+    volume_left = cargo_volume
+    budget_left = budget
+    cargo = []
+    profit = 0.0
+
+    for candidate in sorted(candidates, key=density, reverse=True):
+        item, ask, bid, max_units = candidate
+        volume = item_volumes.get(item, default_volume)
+        units = min(max_units, int(budget_left // ask))
+        if volume > 0:
+            units = min(units, int(volume_left // volume))
+        if units <= 0:
+            continue
+        cargo.append((item, units, ask, bid))
+        volume_left -= units * volume
+        budget_left -= units * ask
+        profit += units * (bid - ask)
+        if budget_left < 1e-9:
+            break  # A full hold can still take zero-volume items
+
+    return {
+        'cargo': cargo,
+        'profit': profit,
+        'volume': cargo_volume - volume_left,
+        'cost': budget - budget_left
+    }
+
+def optimize_routes(snapshot, table, cargo_volume, budget):
+    """Best cargo and net profit for every ordered planet pair with a trade"""
+    routes = {}
+    for (origin, target), candidates in build_route_candidates(snapshot).items():
+        route = solve_cargo(candidates, cargo_volume, budget, table)
+        route['origin'] = origin
+        route['target'] = target
+        route['travel_cost'] = travel_cost(table, origin, target)
+        route['net_profit'] = route['profit'] - route['travel_cost']
+        routes[(origin, target)] = route
+    return routes
+
+def best_loops(routes, planets, table, max_hops=3, top=10):
+    """Best closed loops of 2..max_hops legs, trading on every leg
+
+    A leg without a profitable cargo is flown empty and only costs travel.
+    Each loop is reported once, starting from its lowest planet id.
+    """
+    def leg_value(origin, target):
+        route = routes.get((origin, target))
+        if route is not None:
+            return max(route['net_profit'], -route['travel_cost'])
+        return -travel_cost(table, origin, target)
+
+    # Dense leg value matrix so loop enumeration is plain lookups
+    value = {(a, b): leg_value(a, b) for a in planets for b in planets if a != b}
+
+    def loops():
+        for hops in range(2, max_hops + 1):
+            for start in planets:
+                for rest in itertools.permutations([p for p in planets if p > start], hops - 1):
+                    path = (start,) + rest + (start,)
+                    total = 0.0
+                    for a, b in zip(path, path[1:]):
+                        total += value[(a, b)]
+                    yield total, path
+
+    # Only the best `top` loops are kept in memory
+    return heapq.nlargest(top, loops(), key=lambda loop: loop[0])
+
+def write_report(routes, loops, cargo_volume, budget, filename="trade_routes_report.md", top=20):
+    """Write the best routes and loops as markdown"""
+    lines = []
+    lines.append("# Trade Route Optimization Report")
+    lines.append(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    lines.append("")
+    lines.append(f"- **Cargo Volume**: {cargo_volume:,.0f}")
+    lines.append(f"- **Budget**: {budget:,.0f}")
+    lines.append(f"- **Routes with Trades**: {len(routes)}")
+    lines.append("")
+
+    lines.append("## Best Single Routes")
+    lines.append("")
+    ranked = sorted(routes.values(), key=lambda r: r['net_profit'], reverse=True)
+    for i, route in enumerate(ranked[:top], 1):
+        lines.append(f"### {i}. {route['origin']} → {route['target']}")
+        lines.append(f"- **Net Profit**: {route['net_profit']:,.2f} (trade {route['profit']:,.2f}, travel {route['travel_cost']:,.2f})")
+        lines.append(f"- **Cargo**: {route['volume']:,.0f} volume, {route['cost']:,.2f} spent")
+        for item, units, ask, bid in route['cargo'][:5]:
+            lines.append(f"  - {item}: {units:,} @ {ask:.2f} → {bid:.2f}")
+        if len(route['cargo']) > 5:
+            lines.append(f"  - ... and {len(route['cargo']) - 5} more items")
+        lines.append("")
+
+    lines.append("## Best Loops")
+    lines.append("")
+    for i, (total, path) in enumerate(loops, 1):
+        lines.append(f"{i}. {' → '.join(path)}: {total:,.2f}")
+    lines.append("")
+
+    with open(filename, "w") as f:
+        f.write("\n".join(lines))
+
+def positive_float(text):
+    """argparse type for limits that must be above zero"""
+    value = float(text)
+    if not value > 0:
+        raise argparse.ArgumentTypeError(f"must be a positive number, got {text}")
+    return value
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the best trade routes and loops")
+    parser.add_argument('--cargo-volume', type=positive_float, default=5000)
+    parser.add_argument('--budget', type=positive_float, default=2000000)
+    parser.add_argument('--max-hops', type=int, default=3)
+    parser.add_argument('--market-dir', default=DEFAULT_MARKET_DIR)
+    parser.add_argument('--distances', default=DISTANCES_FILE)
+    args = parser.parse_args()
+
+    snapshot = load_market_snapshot(args.market_dir)
+    if not snapshot:
+        print(f"❌ No market files found in {args.market_dir}. Run generate_all_markets.py first.")
+        return
+    try:
+        table = load_travel_table(args.distances)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    routes = optimize_routes(snapshot, table, args.cargo_volume, args.budget)
+    route_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    loops = best_loops(routes, list(snapshot.keys()), table, args.max_hops)
+    loop_seconds = time.perf_counter() - start
+
+    write_report(routes, loops, args.cargo_volume, args.budget)
+
+    print(f"Optimized {len(routes)} routes across {len(snapshot)} planets in {route_seconds:.2f}s")
+    print(f"Searched loops up to {args.max_hops} hops in {loop_seconds:.2f}s")
+    print("Report saved to: trade_routes_report.md")
+
+    best = sorted(routes.values(), key=lambda r: r['net_profit'], reverse=True)[:5]
+    if best:
+        print("\nTop 5 Routes:")
+        for i, route in enumerate(best, 1):
+            print(f"   {i}. {route['origin']:>6} → {route['target']:<6} {route['net_profit']:>14,.2f} ({len(route['cargo'])} items)")
+    if loops:
+        total, path = loops[0]
+        print(f"\nBest loop: {' → '.join(path)} ({total:,.2f})")
+
+if __name__ == "__main__":
+    main()
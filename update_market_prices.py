@@ -4,9 +4,15 @@ Update market prices in CSV file based on calculated prices from calculate_price
 """
 
 import csv
-import yaml
 import json
 from calculate_prices import *
+from market_writer import write_csv_atomic, format_market_row
+from item_classification import get_classification_table
+from market_rules import load_market_rules, order_counts, spread_prices
+from recipe_model import RecipeBook, compile_recipes, recipe_info
+from lazy_imports import lazy_import
+
+yaml = lazy_import('yaml')
 
 def load_calculated_prices():
     """Load calculated prices from the output file"""
@@ -57,57 +63,11 @@ def load_calculated_prices():
         print("❌ No price data found. Run calculate_prices.py first.")
         return {}
 
-def calculate_order_counts(item, calculated_price, recipe_time=0, recipe_complexity=1):
-    """Calculate realistic order counts based on item characteristics"""
-    
-    # Base factors
-    base_sell_orders = 1000
-    base_buy_orders = 10000
-    
-    # Adjust based on price tier
-    if calculated_price < 100:
-        price_tier = 1.0
-    elif calculated_price < 1000:
-        price_tier = 0.8
-    elif calculated_price < 10000:
-        price_tier = 0.6
-    elif calculated_price < 100000:
-        price_tier = 0.4
-    else:
-        price_tier = 0.2
-    
-    # Adjust based on production time (longer = rarer)
-    time_factor = max(0.1, 1.0 / (1.0 + recipe_time / 1000))
-    
-    # Adjust based on complexity (more complex = rarer)
-    complexity_factor = max(0.1, 1.0 / recipe_complexity)
-    
-    # Special cases for high-end items
-    if 'WarpBeacon' in item:
-        # WarpBeacon should be very rare
-        sell_orders = max(1, int(base_sell_orders * 0.01 * price_tier))
-        buy_orders = max(10, int(base_buy_orders * 0.1 * price_tier))
-    elif 'WarpDrive' in item or 'WarpCell' in item:
-        # Other warp items should be rare but not as rare as beacon
-        sell_orders = max(5, int(base_sell_orders * 0.05 * price_tier))
-        buy_orders = max(50, int(base_buy_orders * 0.3 * price_tier))
-    elif 'CoreUnit' in item:
-        # Core units should be moderately rare
-        sell_orders = max(10, int(base_sell_orders * 0.1 * price_tier))
-        buy_orders = max(100, int(base_buy_orders * 0.5 * price_tier))
-    else:
-        # Regular items
-        sell_orders = max(10, int(base_sell_orders * price_tier * time_factor * complexity_factor))
-        buy_orders = max(100, int(base_buy_orders * price_tier * time_factor * complexity_factor))
-    
-    # Cap at maximum
-    sell_orders = min(sell_orders, 200000000)
-    buy_orders = min(buy_orders, 200000000)
-    
-    return sell_orders, buy_orders
-
 def get_recipe_info(item, recipes):
     """Get recipe information for an item"""
+    # recipes may be the raw list or a compiled RecipeBook
+    if isinstance(recipes, RecipeBook):
+        return recipe_info(recipes, item)
     for r in recipes:
         for out in r.get('out', []):
             if item in out:
@@ -120,19 +80,24 @@ def get_recipe_info(item, recipes):
 def update_market_prices(input_csv, output_csv, calculated_prices):
     """Update market prices in CSV file"""
     
-    # Load recipes for complexity analysis
-    recipes = load_yaml_file('recipes.yaml')
+    # Load recipes for complexity analysis, compiled so per-item lookups are a dict hit
+    recipes = compile_recipes(load_recipes_or_exit('recipes.yaml'))
+    
+    # Order counts and spreads come from market_rules.yaml
+    rules = load_market_rules()
+    categories = get_classification_table(calculated_prices)['category']
     
     updated_count = 0
     not_found_count = 0
     
-    with open(input_csv, 'r') as infile, open(output_csv, 'w', newline='') as outfile:
+    output_rows = []
+    
+    with open(input_csv, 'r') as infile:
         reader = csv.reader(infile)
-        writer = csv.writer(outfile)
         
         for row in reader:
             if len(row) < 5:
-                writer.writerow(row)
+                output_rows.append(row)
                 continue
                 
             item, sell_orders, sell_price, buy_orders, buy_price = row
@@ -144,30 +109,28 @@ def update_market_prices(input_csv, output_csv, calculated_prices):
                 recipe_time, complexity = get_recipe_info(item, recipes)
                 
                 # Calculate new order counts
-                new_sell_orders, new_buy_orders = calculate_order_counts(
-                    item, calculated_price, recipe_time, complexity
+                new_sell_orders, new_buy_orders = order_counts(
+                    rules, item, calculated_price, recipe_time, complexity, category=categories[item]
                 )
                 
                 # Set prices with some market spread
                 # Sell price should be higher than calculated (seller profit)
                 # Buy price should be lower than calculated (buyer savings)
-                sell_price = calculated_price * 1.1  # 10% markup
-                buy_price = calculated_price * 0.9   # 10% discount
+                sell_price, buy_price = spread_prices(rules, calculated_price)
                 
-                # Write updated row
-                writer.writerow([
-                    item,
-                    int(new_sell_orders),
-                    f"{sell_price:.2f}",
-                    int(new_buy_orders),
-                    f"{buy_price:.2f}"
-                ])
+                # Updated row
+                output_rows.append(format_market_row(
+                    item, new_sell_orders, sell_price, new_buy_orders, buy_price
+                ))
                 updated_count += 1
             else:
                 # Keep original values for items not in our calculations
-                writer.writerow(row)
+                output_rows.append(row)
                 not_found_count += 1
     
+    # Write everything at once and atomically replace the output file
+    write_csv_atomic(output_csv, output_rows)
+    
     return updated_count, not_found_count
 
 def main():
@@ -5,18 +5,18 @@ Creates realistic interplanetary trade opportunities
 """
 
 import csv
-import yaml
 import os
-import random
 import math
+import time
 from calculate_prices import *
+from market_writer import WriteStats, format_market_row
+from item_classification import get_classification_table
+from market_rules import load_market_rules, order_counts, planet_factor, spread_prices
+from recipe_model import RecipeBook, compile_recipes, recipe_info
+from generate_all_markets import REGIONAL_VARIATION, calculate_regional_variation
+from lazy_imports import lazy_import
 
-# Regional price variation settings
-REGIONAL_VARIATION = {
-    'min_variation': 0.85,  # 15% below base price
-    'max_variation': 1.25,  # 25% above base price
-    'trade_profit_range': (0.05, 0.15)  # 5-15% profit potential between planets
-}
+yaml = lazy_import('yaml')
 
 def load_calculated_prices():
     """Load calculated prices from cache"""
@@ -40,85 +40,11 @@ def load_calculated_prices():
         print("❌ No price data found. Run calculate_prices.py first.")
         return {}
 
-def calculate_regional_variation(base_price, planet_id, item_name):
-    """Calculate regional price variation for a specific planet and item"""
-    
-    # Create a deterministic but varied seed based on planet and item
-    seed = hash(f"{planet_id}_{item_name}") % 10000
-    random.seed(seed)
-    
-    # Base variation
-    variation = random.uniform(REGIONAL_VARIATION['min_variation'], REGIONAL_VARIATION['max_variation'])
-    
-    # Adjust for item type (some items are more/less affected by regional differences)
-    if any(ore in item_name.lower() for ore in ['ore', 'pure']):
-        # Raw materials have less variation
-        variation = 1.0 + (variation - 1.0) * 0.5
-    elif any(high_end in item_name for high_end in ['Warp', 'CoreUnit', 'Antimatter']):
-        # High-end items have more variation
-        variation = 1.0 + (variation - 1.0) * 1.5
-    
-    # Ensure variation stays within reasonable bounds
-    variation = max(0.7, min(1.5, variation))
-    
-    return base_price * variation
-
-def calculate_order_counts(item, calculated_price, recipe_time=0, recipe_complexity=1, planet_id=None):
-    """Calculate realistic order counts with regional adjustments"""
-    
-    # Base factors
-    base_sell_orders = 1000
-    base_buy_orders = 10000
-    
-    # Adjust based on price tier
-    if calculated_price < 100:
-        price_tier = 1.0
-    elif calculated_price < 1000:
-        price_tier = 0.8
-    elif calculated_price < 10000:
-        price_tier = 0.6
-    elif calculated_price < 100000:
-        price_tier = 0.4
-    else:
-        price_tier = 0.2
-    
-    # Adjust based on production time (longer = rarer)
-    time_factor = max(0.1, 1.0 / (1.0 + recipe_time / 1000))
-    
-    # Adjust based on complexity (more complex = rarer)
-    complexity_factor = max(0.1, 1.0 / recipe_complexity)
-    
-    # Regional adjustments based on planet
-    if planet_id:
-        # Create deterministic but varied regional factors
-        seed = hash(str(planet_id)) % 1000
-        random.seed(seed)
-        regional_factor = random.uniform(0.5, 1.5)
-    else:
-        regional_factor = 1.0
-    
-    # Special cases for high-end items
-    if 'WarpBeacon' in item:
-        sell_orders = max(1, int(base_sell_orders * 0.01 * price_tier * regional_factor))
-        buy_orders = max(10, int(base_buy_orders * 0.1 * price_tier * regional_factor))
-    elif 'WarpDrive' in item or 'WarpCell' in item:
-        sell_orders = max(5, int(base_sell_orders * 0.05 * price_tier * regional_factor))
-        buy_orders = max(50, int(base_buy_orders * 0.3 * price_tier * regional_factor))
-    elif 'CoreUnit' in item:
-        sell_orders = max(10, int(base_sell_orders * 0.1 * price_tier * regional_factor))
-        buy_orders = max(100, int(base_buy_orders * 0.5 * price_tier * regional_factor))
-    else:
-        sell_orders = max(10, int(base_sell_orders * price_tier * time_factor * complexity_factor * regional_factor))
-        buy_orders = max(100, int(base_buy_orders * price_tier * time_factor * complexity_factor * regional_factor))
-    
-    # Cap at maximum
-    sell_orders = min(sell_orders, 200000000)
-    buy_orders = min(buy_orders, 200000000)
-    
-    return sell_orders, buy_orders
-
 def get_recipe_info(item, recipes):
     """Get recipe information for an item"""
+    # recipes may be the raw list or a compiled RecipeBook
+    if isinstance(recipes, RecipeBook):
+        return recipe_info(recipes, item)
     for r in recipes:
         for out in r.get('out', []):
             if item in out:
@@ -127,20 +53,32 @@ def get_recipe_info(item, recipes):
                 return time_val, complexity
     return 0, 1
 
-def update_planet_market(input_file, output_file, calculated_prices, planet_id):
-    """Update market prices for a single planet"""
+def update_planet_market(input_file, output_file, calculated_prices, planet_id, write_stats=None, recipes=None):
+    """Update market prices for a single planet
+
+    recipes: a compiled RecipeBook shared by all planets (loaded if not given)
+    """
+    
+    if recipes is None:
+        recipes = compile_recipes(load_recipes('recipes.yaml'))
+    classes = get_classification_table(calculated_prices)
+    item_flags = classes['flags']
+    categories = classes['category']
+    
+    # Order counts and spreads come from market_rules.yaml
+    rules = load_market_rules()
+    factor = planet_factor(rules, planet_id)
     
-    recipes = load_yaml_file('recipes.yaml')
     updated_count = 0
     not_found_count = 0
+    output_rows = []
     
-    with open(input_file, 'r') as infile, open(output_file, 'w', newline='') as outfile:
+    with open(input_file, 'r') as infile:
         reader = csv.reader(infile)
-        writer = csv.writer(outfile)
         
         for row in reader:
             if len(row) < 5:
-                writer.writerow(row)
+                output_rows.append(row)
                 continue
                 
             item, sell_orders, sell_price, buy_orders, buy_price = row
@@ -149,40 +87,41 @@ def update_planet_market(input_file, output_file, calculated_prices, planet_id):
                 base_price = calculated_prices[item]
                 
                 # Calculate regional variation
-                regional_price = calculate_regional_variation(base_price, planet_id, item)
+                regional_price = calculate_regional_variation(base_price, planet_id, item, item_flags[item])
                 
                 # Get recipe info for order count calculation
                 recipe_time, complexity = get_recipe_info(item, recipes)
                 
                 # Calculate new order counts with regional adjustments
-                new_sell_orders, new_buy_orders = calculate_order_counts(
-                    item, regional_price, recipe_time, complexity, planet_id
+                new_sell_orders, new_buy_orders = order_counts(
+                    rules, item, regional_price, recipe_time, complexity, factor, categories[item]
                 )
                 
                 # Set prices with market spread and regional variation
-                sell_price = regional_price * 1.1  # 10% markup
-                buy_price = regional_price * 0.9   # 10% discount
+                sell_price, buy_price = spread_prices(rules, regional_price)
                 
-                # Write updated row
-                writer.writerow([
-                    item,
-                    int(new_sell_orders),
-                    f"{sell_price:.2f}",
-                    int(new_buy_orders),
-                    f"{buy_price:.2f}"
-                ])
+                # Updated row
+                output_rows.append(format_market_row(
+                    item, new_sell_orders, sell_price, new_buy_orders, buy_price
+                ))
                 updated_count += 1
             else:
                 # Keep original values for items not in our calculations
-                writer.writerow(row)
+                output_rows.append(row)
                 not_found_count += 1
     
+    # Write all rows at once to a temp file, then atomically replace the output
+    if write_stats is None:
+        write_stats = WriteStats()
+    write_stats.write(output_file, output_rows)
+    
     return updated_count, not_found_count
 
 def analyze_trade_opportunities(calculated_prices, planet_files):
     """Analyze potential trade opportunities between planets"""
     
     trade_opportunities = []
+    rules = load_market_rules()
     
     # Sample a few items to check for trade opportunities
     sample_items = ['AluminiumPure', 'IronPure', 'CarbonPure', 'SiliconPure', 'WarpDriveSmall']
@@ -209,8 +148,8 @@ def analyze_trade_opportunities(calculated_prices, planet_files):
                     'item': item,
                     'buy_from': min_price[0],
                     'sell_to': max_price[0],
-                    'buy_price': min_price[1] * 0.9,
-                    'sell_price': max_price[1] * 1.1,
+                    'buy_price': spread_prices(rules, min_price[1])[1],
+                    'sell_price': spread_prices(rules, max_price[1])[0],
                     'profit_percent': profit_potential * 100
                 })
     
@@ -244,9 +183,14 @@ def main():
     
     print(f"Found {len(planet_files)} planet market files")
     
+    # Load recipes once, compiled so per-item recipe lookups are a dict hit
+    recipes = compile_recipes(load_recipes_or_exit('recipes.yaml'))
+    
     # Process each planet
     total_updated = 0
     total_not_found = 0
+    write_stats = WriteStats()
+    run_start = time.perf_counter()
     
     for planet_file in planet_files:
         planet_id = os.path.splitext(os.path.basename(planet_file))[0]
@@ -255,7 +199,7 @@ def main():
         print(f"Processing planet {planet_id}...")
         
         updated_count, not_found_count = update_planet_market(
-            planet_file, output_file, calculated_prices, planet_id
+            planet_file, output_file, calculated_prices, planet_id, write_stats, recipes
         )
         
         total_updated += updated_count
@@ -267,6 +211,9 @@ def main():
     print(f"    Total updated: {total_updated} items")
     print(f"    Total not found: {total_not_found} items")
     print(f"    Output saved to: {output_dir}/")
+    print(f"    {write_stats.summary()}")
+    run_seconds = time.perf_counter() - run_start
+    print(f"    Full run: {write_stats.rows / run_seconds:,.0f} rows/s ({run_seconds:.2f}s)")
     
     # Analyze trade opportunities
     print(f"\nTrade Opportunities:")
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Verify that a generated market snapshot is arbitrage-free within configured bounds
+
+Checks:
+- Same-planet spread: no planet buys an item above its own sell price
+- Cross-planet margin: the best buy price anywhere over the cheapest sell price
+  on another planet stays within trade_profit_range. Every hop of a multi-hop
+  path re-prices the same item, so the best direct pair also bounds any cycle.
+- Craft arbitrage: buying a recipe's inputs at the cheapest sell quotes and
+  crafting (including time cost) must not beat the product's best buy price
+
+Every check is a single pass over quotes or recipes.
+
+Usage:
+    python verify_markets.py [--market-dir market_orders_generated] [--max-margin 0.15]
+Exits with status 1 when violations are found.
+"""
+
+import argparse
+import sys
+import time
+
+from calculate_prices import CATALYSTS, calculate_time_cost, load_industry_settings, load_recipes_or_exit
+from generate_all_markets import REGIONAL_VARIATION
+from market_snapshot import DEFAULT_MARKET_DIR, load_market_snapshot
+
+# Same bounds the market generator promises
+TRADE_PROFIT_RANGE = REGIONAL_VARIATION['trade_profit_range']
+CRAFT_TOLERANCE = 0.0  # Allowed craft profit as a fraction of the product buy price
+
+def keep_best(best, quote, highest=False):
+    """Add (price, planet) to a list holding the two best quotes, best first"""
+    best.append(quote)
+    best.sort(reverse=highest)
+    if len(best) > 2:
+        best.pop()
+
+def best_item_quotes(snapshot):
+    """Two best asks and two best bids per item, each with its planet
+
+    Keeping the runner-ups lets the cross-planet check skip same-planet
+    pairs without a second pass.
+    """
+    asks = {}  # item -> [(price, planet), (price, planet)], cheapest first
+    bids = {}  # item -> [(price, planet), (price, planet)], highest first
+    for planet_id, quotes in snapshot.items():
+        for item, (sell_orders, sell_price, buy_orders, buy_price) in quotes.items():
+            if sell_orders > 0 and sell_price > 0:
+                keep_best(asks.setdefault(item, []), (sell_price, planet_id))
+            if buy_orders > 0 and buy_price > 0:
+                keep_best(bids.setdefault(item, []), (buy_price, planet_id), highest=True)
+    return asks, bids
+
+def check_same_planet_spreads(snapshot):
+    """Planets that buy an item above their own sell price"""
+    violations = []
+    for planet_id, quotes in snapshot.items():
+        for item, (sell_orders, sell_price, buy_orders, buy_price) in quotes.items():
+            if sell_orders > 0 and buy_orders > 0 and buy_price > sell_price:
+                violations.append({
+                    'check': 'same_planet_spread',
+                    'item': item,
+                    'planet': planet_id,
+                    'margin': buy_price / sell_price - 1.0,
+                    'detail': f"buys @ {buy_price:.2f} > sells @ {sell_price:.2f}"
+                })
+    return violations
+
+def check_cross_planet_margins(asks, bids, max_margin):
+    """Items whose best cross-planet trade beats max_margin"""
+    violations = []
+    for item, item_bids in bids.items():
+        item_asks = asks.get(item)
+        if not item_asks:
+            continue
+        # The best pair on different planets uses the best ask or the best bid
+        pairs = [(bid / ask - 1.0, ask, sell_planet, bid, buy_planet)
+                 for ask, sell_planet in item_asks for bid, buy_planet in item_bids if sell_planet != buy_planet]
+        if not pairs:
+            continue
+        margin, ask, sell_planet, bid, buy_planet = max(pairs)
+        if margin > max_margin:
+            violations.append({
+                'check': 'cross_planet_margin',
+                'item': item,
+                'planet': f"{sell_planet}->{buy_planet}",
+                'margin': margin,
+                'detail': f"buy @ {ask:.2f}, sell @ {bid:.2f}"
+            })
+    return violations
+
+def check_craft_arbitrage(recipes, asks, bids, tolerance=CRAFT_TOLERANCE, industry_settings=None):
+    """Recipes whose inputs, bought at the cheapest asks, undercut the product's best bid
+
+    Time is priced with calculate_time_cost, as the market generator does.
+    """
+    violations = []
+    for recipe in recipes:
+        outputs = recipe.get('out') or []
+        if not outputs:
+            continue
+        product, product_qty = next(iter(outputs[0].items()))
+        if product not in bids or not product_qty:
+            continue
+
+        input_cost = 0.0
+        for input_item in recipe.get('in', []):
+            for name, qty in input_item.items():
+                if name in CATALYSTS:
+                    continue
+                item_asks = asks.get(name)
+                if not item_asks:
+                    input_cost = None
+                    break
+                input_cost += item_asks[0][0] * qty
+            if input_cost is None:
+                break
+        if input_cost is None:
+            continue
+
+        unit_cost = input_cost / product_qty + calculate_time_cost(recipe, industry_settings)[0]
+        bid, buy_planet = bids[product][0]
+        if bid > unit_cost * (1.0 + tolerance):
+            violations.append({
+                'check': 'craft_arbitrage',
+                'item': product,
+                'planet': buy_planet,
+                'margin': bid / unit_cost - 1.0 if unit_cost > 0 else float('inf'),
+                'detail': f"recipe {recipe.get('id')} costs {unit_cost:.2f}, sells @ {bid:.2f}"
+            })
+    return violations
+
+def verify_snapshot(snapshot, recipes=None, max_margin=TRADE_PROFIT_RANGE[1], craft_tolerance=CRAFT_TOLERANCE,
+                    industry_settings=None):
+    """Run every check and return the list of violations
+
+    industry_settings defaults to industries.yaml when recipes are checked.
+    """
+    asks, bids = best_item_quotes(snapshot)
+    violations = check_same_planet_spreads(snapshot)
+    violations += check_cross_planet_margins(asks, bids, max_margin)
+    if recipes:
+        if industry_settings is None:
+            industry_settings = load_industry_settings()
+        violations += check_craft_arbitrage(recipes, asks, bids, craft_tolerance, industry_settings)
+    return violations
+
+def print_violations(violations, limit=10):
+    """Concise summary: counts per check and the worst examples of each"""
+    by_check = {}
+    for violation in violations:
+        by_check.setdefault(violation['check'], []).append(violation)
+
+    for check, items in sorted(by_check.items()):
+        items.sort(key=lambda v: v['margin'], reverse=True)
+        print(f"\n❌ {check}: {len(items)} violations")
+        for v in items[:limit]:
+            print(f"   {v['item']:30} {v['planet']:>16} {v['margin'] * 100:>7.1f}%  {v['detail']}")
+        if len(items) > limit:
+            print(f"   ... and {len(items) - limit} more")
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify a generated market is arbitrage-free")
+    parser.add_argument('--market-dir', default=DEFAULT_MARKET_DIR)
+    parser.add_argument('--max-margin', type=float, default=TRADE_PROFIT_RANGE[1],
+                        help="largest allowed cross-planet margin (fraction)")
+    parser.add_argument('--craft-tolerance', type=float, default=CRAFT_TOLERANCE)
+    parser.add_argument('--no-recipes', action='store_true', help="skip the craft arbitrage check")
+    args = parser.parse_args()
+
+    snapshot = load_market_snapshot(args.market_dir)
+    if not snapshot:
+        print(f"❌ No market files found in {args.market_dir}")
+        sys.exit(1)
+
+    recipes = None if args.no_recipes else load_recipes_or_exit('recipes.yaml')
+
+    start = time.perf_counter()
+    violations = verify_snapshot(snapshot, recipes, args.max_margin, args.craft_tolerance)
+    elapsed = time.perf_counter() - start
+
+    quotes = sum(len(q) for q in snapshot.values())
+    print(f"Checked {quotes} quotes on {len(snapshot)} planets in {elapsed:.2f}s")
+
+    if violations:
+        print_violations(violations)
+        sys.exit(1)
+
+    print("✅ Market is arbitrage-free within the configured bounds")
+
+if __name__ == "__main__":
+    main()